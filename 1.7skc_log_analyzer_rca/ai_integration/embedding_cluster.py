@@ -1 +1,250 @@
 # Cluster log entries using vector similarity
+# ai_integration/embedding_cluster.py
+#
+# Entries are masked, hashed into a fixed-width sparse TF-IDF space (no
+# vocabulary is fitted or kept) and grouped with MiniBatchKMeans. Both the
+# document frequencies and the centroids update batch by batch, so the model
+# can be trained on millions of lines and kept up to date across runs.
+
+import os
+import re
+from itertools import islice
+
+import joblib
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+from feedback.cluster_stub import mask_template_line
+
+# Hashed feature space; centroids are dense, so memory is about
+# n_clusters * N_FEATURES * 4 bytes (13 MB for 50 clusters)
+N_FEATURES = 2 ** 16
+DEFAULT_CLUSTERS = 50
+
+# Entries vectorized per step; bounds the sparse matrix held at once
+BATCH_SIZE = 10_000
+
+# Placeholders from masking count as tokens, as do identifier-like words
+TOKEN_PATTERN = re.compile(r"<[A-Z*]+>|[A-Za-z_][A-Za-z0-9_.]*")
+
+def tokenize(entry):
+    """
+    Splits a log entry into masked tokens for vectorization.
+
+    Args:
+        entry (str): Log line or merged entry.
+
+    Returns:
+        List[str]: Lowercased tokens with dynamic values masked.
+    """
+    return [token.lower() for token in TOKEN_PATTERN.findall(mask_template_line(entry))]
+
+def _batches(entries, size):
+    iterator = iter(entries)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+class LogClusterer:
+    """
+    Incremental sparse-vector clustering of log entries.
+
+    Vectors are term counts hashed into N_FEATURES columns, weighted by an
+    IDF that is accumulated batch by batch, and L2-normalized. Clustering is
+    MiniBatchKMeans fitted with partial_fit(), so training data is never held
+    in memory as a whole and new data refines an existing model.
+
+    KMeans needs at least `n_clusters` samples to initialize, so smaller
+    early batches are buffered (and saved with the model) until enough have
+    been seen. Until then entries get provisional labels: the index of the
+    nearest buffered sample.
+
+    Args:
+        n_clusters (int): Number of clusters.
+        n_features (int): Hashed feature width.
+        batch_size (int): Entries vectorized per step.
+        random_state (int): Seed for reproducible clustering.
+    """
+
+    def __init__(self, n_clusters=DEFAULT_CLUSTERS, n_features=N_FEATURES,
+                 batch_size=BATCH_SIZE, random_state=0):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.vectorizer = HashingVectorizer(
+            n_features=n_features,
+            analyzer=tokenize,
+            alternate_sign=False,
+            norm=None,
+            dtype=np.float32,
+        )
+        self.kmeans = MiniBatchKMeans(
+            n_clusters=n_clusters,
+            batch_size=batch_size,
+            random_state=random_state,
+            n_init=3,
+        )
+        self.doc_freq = np.zeros(n_features, dtype=np.int64)
+        self.n_docs = 0
+        self.fitted = False
+        self.pending = None   # Vectors buffered until KMeans can initialize
+
+    def _vectorize(self, batch, update_idf):
+        counts = self.vectorizer.transform(batch)
+        if update_idf:
+            # Column indices present per row: each is one document occurrence
+            self.doc_freq += np.bincount(counts.indices, minlength=counts.shape[1])
+            self.n_docs += counts.shape[0]
+        idf = np.log((1 + self.n_docs) / (1 + self.doc_freq)).astype(np.float32) + 1
+        weighted = counts.multiply(idf).tocsr()
+        return normalize(weighted, copy=False)
+
+    def _fit_vectors(self, vectors):
+        if not self.fitted:
+            # The first fit must hold at least one sample per cluster
+            if self.pending is not None:
+                vectors = sp.vstack([self.pending, vectors], format="csr")
+            if vectors.shape[0] < self.n_clusters:
+                self.pending = vectors
+                return
+            self.pending = None
+        self.kmeans.partial_fit(vectors)
+        self.fitted = True
+
+    def _nearest(self, vectors):
+        # Squared distances via one sparse-dense product:
+        # |x - c|^2 = |x|^2 + |c|^2 - 2 x.c
+        if self.fitted:
+            centers = self.kmeans.cluster_centers_
+        elif self.pending is not None:
+            centers = self.pending.toarray()
+        else:
+            centers = vectors[:1].toarray()
+        row_norms = np.asarray(vectors.multiply(vectors).sum(axis=1)).ravel()
+        distances = (vectors @ centers.T) * -2
+        distances += (centers * centers).sum(axis=1)
+        distances += row_norms[:, None]
+        labels = distances.argmin(axis=1)
+        nearest = np.sqrt(np.maximum(distances[np.arange(len(labels)), labels], 0))
+        return labels, nearest
+
+    def partial_fit(self, batch):
+        """
+        Updates IDF statistics and centroids with one batch of entries.
+
+        Args:
+            batch (List[str]): Log entries.
+
+        Returns:
+            LogClusterer: self, for chaining.
+        """
+        if batch:
+            self._fit_vectors(self._vectorize(batch, update_idf=True))
+        return self
+
+    def fit(self, entries):
+        """
+        Trains on a stream of entries, one batch at a time.
+
+        Args:
+            entries (Iterable[str]): Log entries.
+
+        Returns:
+            LogClusterer: self, for chaining.
+        """
+        for batch in _batches(entries, self.batch_size):
+            self.partial_fit(batch)
+        return self
+
+    def assign(self, entries, update=False):
+        """
+        Streams cluster assignments for entries.
+
+        Args:
+            entries (Iterable[str]): Log entries.
+            update (bool): Also fold each batch into the model before assigning
+                (incremental training on new data).
+
+        Yields:
+            Tuple[int, float]: Cluster id and distance to its centroid, per entry.
+        """
+        for batch in _batches(entries, self.batch_size):
+            if update or not self.fitted:
+                vectors = self._vectorize(batch, update_idf=True)
+                self._fit_vectors(vectors)
+            else:
+                vectors = self._vectorize(batch, update_idf=False)
+            labels, distances = self._nearest(vectors)
+            yield from zip(labels.tolist(), distances.tolist())
+
+    def save(self, path):
+        """
+        Persists the model (IDF statistics and centroids).
+
+        Args:
+            path (str): Target file.
+        """
+        tmp_path = path + ".tmp"
+        joblib.dump(self, tmp_path, compress=3)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path):
+        """
+        Loads a model written by save().
+
+        Args:
+            path (str): Model file.
+
+        Returns:
+            LogClusterer: The restored model.
+        """
+        return joblib.load(path)
+
+def cluster_entries(entries, model_path=None, n_clusters=DEFAULT_CLUSTERS, update=True):
+    """
+    Groups log entries by vector similarity and summarizes each cluster.
+
+    Loads the model at `model_path` when present (otherwise starts a new
+    one), assigns every entry in a single streaming pass, optionally
+    training on the way, and saves the model back for the next run.
+
+    Args:
+        entries (Iterable[str]): Log entries (e.g. unmatched lines).
+        model_path (str, optional): Persisted model to reuse and update.
+        n_clusters (int): Cluster count for a new model.
+        update (bool): Refine the model with these entries.
+
+    Returns:
+        List[dict]: cluster, size, example (closest entry seen) and template,
+        largest clusters first.
+    """
+    if model_path and os.path.exists(model_path):
+        model = LogClusterer.load(model_path)
+    else:
+        model = LogClusterer(n_clusters=n_clusters)
+
+    summary = {}
+    for batch in _batches(entries, model.batch_size):
+        for entry, (label, distance) in zip(batch, model.assign(batch, update=update)):
+            cluster = summary.get(label)
+            if cluster is None:
+                summary[label] = {"cluster": label, "size": 1, "example": entry, "distance": distance}
+            else:
+                cluster["size"] += 1
+                if distance < cluster["distance"]:
+                    cluster["example"] = entry
+                    cluster["distance"] = distance
+
+    if model_path:
+        model.save(model_path)
+
+    results = sorted(summary.values(), key=lambda c: c["size"], reverse=True)
+    for cluster in results:
+        cluster["template"] = mask_template_line(cluster["example"])
+        del cluster["distance"]
+    return results
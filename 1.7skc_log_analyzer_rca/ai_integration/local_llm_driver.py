@@ -1 +1,312 @@
 # Offline LLM wrapper for RCA reasoning
+# ai_integration/local_llm_driver.py
+#
+# Findings are collapsed to unique (signature, category, masked template)
+# keys before any prompt is built, answers are cached on disk by (key hash,
+# model id, prompt version), and the remaining prompts are sent in batches
+# on a worker pool.
+# Any object with a `model_id` and a batched `generate(prompts)` works as
+# the model; StubModel returns canned answers for tests.
+
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from feedback.cluster_stub import mask_template_line
+
+# Bump when PROMPT_TEMPLATE changes so cached answers are not reused
+PROMPT_VERSION = "1"
+
+PROMPT_TEMPLATE = (
+    "You are assisting with root cause analysis of system logs.\n"
+    "Signature: {pattern}\n"
+    "Heuristic category: {rca}\n"
+    "Log template (dynamic values masked): {template}\n"
+    "Example: {example}\n"
+    "Explain the most likely root cause in two sentences and suggest one next step."
+)
+
+DEFAULT_BATCH_SIZE = 8
+DEFAULT_WORKERS = 4
+DEFAULT_CACHE_ENTRIES = 50_000
+
+# Rough token estimate used for reporting
+CHARS_PER_TOKEN = 4
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+def finding_template(finding):
+    """
+    Returns the masked template that identifies a finding for prompting.
+
+    Args:
+        finding (dict): RCA finding with "content" (and optionally "pattern").
+
+    Returns:
+        str: Masked first line of the finding's content.
+    """
+    return mask_template_line(finding.get("content", ""))
+
+def finding_key(finding):
+    """
+    Returns the prompt fields that decide a finding's answer.
+
+    Every field that reaches the prompt is part of the key, except the
+    example line, which the masked template stands for.
+
+    Args:
+        finding (dict): RCA finding with "content", "pattern" and "rca".
+
+    Returns:
+        Tuple[str, str, str]: Pattern, RCA category and masked template.
+    """
+    return (str(finding.get("pattern", "")), str(finding.get("rca", "")), finding_template(finding))
+
+def template_key(key, model_id, prompt_version=PROMPT_VERSION):
+    """
+    Builds the cache key for a finding_key() answered by a given model and prompt.
+    """
+    raw = "\x1f".join((*key, model_id, prompt_version))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class StubModel:
+    """
+    Local stand-in for an offline model, returning canned answers.
+
+    Args:
+        answers (dict, optional): Substring → answer; the first substring
+            found in a prompt decides the answer.
+        default (str): Answer when no substring matches.
+        model_id (str): Identifier used in cache keys.
+    """
+
+    def __init__(self, answers=None, default="No explanation available.", model_id="stub-model"):
+        self.answers = answers or {}
+        self.default = default
+        self.model_id = model_id
+        self.calls = 0
+        self.prompts_seen = 0
+
+    def generate(self, prompts):
+        """
+        Answers a batch of prompts.
+
+        Args:
+            prompts (List[str]): Prompts to answer.
+
+        Returns:
+            List[str]: One answer per prompt.
+        """
+        self.calls += 1
+        self.prompts_seen += len(prompts)
+        results = []
+        for prompt in prompts:
+            answer = next((a for key, a in self.answers.items() if key in prompt), self.default)
+            results.append(answer)
+        return results
+
+class ResponseCache:
+    """
+    SQLite-backed answer cache with least-recently-used eviction.
+
+    Args:
+        path (str): Database file.
+        max_entries (int): Answers kept before the oldest-used are evicted.
+    """
+
+    def __init__(self, path, max_entries=DEFAULT_CACHE_ENTRIES):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.max_entries = max_entries
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model_id TEXT, response TEXT, created REAL, last_used REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+
+    def get_many(self, keys):
+        """
+        Looks up several keys at once, refreshing their LRU position.
+
+        Args:
+            keys (List[str]): Cache keys.
+
+        Returns:
+            dict: key → cached response, for keys present.
+        """
+        found = {}
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ",".join("?" * len(chunk))
+            found.update(self.conn.execute(
+                f"SELECT key, response FROM responses WHERE key IN ({marks})", chunk
+            ).fetchall())
+        if found:
+            now = time.time()
+            self.conn.executemany("UPDATE responses SET last_used = ? WHERE key = ?", [(now, k) for k in found])
+        return found
+
+    def put_many(self, items, model_id):
+        """
+        Stores answers and evicts the least recently used beyond the cap.
+
+        Args:
+            items (dict): key → response.
+            model_id (str): Model that produced the answers.
+        """
+        now = time.time()
+        self.conn.execute("BEGIN")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+            [(key, model_id, response, now, now) for key, response in items.items()],
+        )
+        self.conn.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.conn.execute("COMMIT")
+
+    def close(self):
+        self.conn.close()
+
+class LLMDriver:
+    """
+    Batched, cached and deduplicated RCA explanations from a local model.
+
+    Args:
+        model: Object with `model_id` and `generate(prompts) -> answers`.
+        cache_path (str, optional): SQLite answer cache (None = no disk cache).
+        max_workers (int): Concurrent generate() calls.
+        batch_size (int): Prompts per generate() call.
+        max_cache_entries (int): Answers kept in the cache.
+    """
+
+    def __init__(self, model, cache_path=None, max_workers=DEFAULT_WORKERS,
+                 batch_size=DEFAULT_BATCH_SIZE, max_cache_entries=DEFAULT_CACHE_ENTRIES):
+        self.model = model
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.cache = ResponseCache(cache_path, max_cache_entries) if cache_path else None
+        self.stats = {
+            "findings": 0,
+            "unique_templates": 0,
+            "cache_hits": 0,
+            "cache_misses": 0,
+            "batches": 0,
+            "prompt_tokens_sent": 0,
+            "tokens_saved_dedup": 0,
+            "tokens_saved_cache": 0,
+        }
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def build_prompt(self, template, finding):
+        return PROMPT_TEMPLATE.format(
+            pattern=finding.get("pattern", ""),
+            rca=finding.get("rca", ""),
+            template=template,
+            example=finding.get("content", ""),
+        )
+
+    def _generate(self, prompts):
+        batches = [prompts[i:i + self.batch_size] for i in range(0, len(prompts), self.batch_size)]
+        self.stats["batches"] += len(batches)
+        if self.max_workers <= 1 or len(batches) <= 1:
+            results = [self.model.generate(batch) for batch in batches]
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                results = list(pool.map(self.model.generate, batches))
+        for batch, answers in zip(batches, results):
+            if len(answers) != len(batch):
+                raise ValueError(f"Model returned {len(answers)} answers for {len(batch)} prompts")
+        return [answer for batch in results for answer in batch]
+
+    def explain(self, findings):
+        """
+        Adds an "llm_explanation" to every finding.
+
+        Findings sharing a finding_key() (pattern, RCA category and masked
+        template) share one prompt and one answer; cached answers are reused
+        and only the rest reach the model.
+
+        Args:
+            findings (List[dict]): RCA findings ("content", "pattern", "rca").
+
+        Returns:
+            List[dict]: Copies of the findings with "llm_explanation" set.
+
+        Raises:
+            ValueError: If the model returns a different number of answers
+                than it was sent prompts.
+        """
+        # One representative finding per key, in first-seen order
+        templates = {}
+        finding_templates = []
+        for finding in findings:
+            template = finding_key(finding)
+            finding_templates.append(template)
+            templates.setdefault(template, finding)
+
+        prompts = {t: self.build_prompt(t[2], f) for t, f in templates.items()}
+        keys = {t: template_key(t, self.model.model_id) for t in templates}
+
+        self.stats["findings"] += len(findings)
+        self.stats["unique_templates"] += len(templates)
+        self.stats["tokens_saved_dedup"] += sum(
+            estimate_tokens(prompts[t]) for t in finding_templates
+        ) - sum(estimate_tokens(p) for p in prompts.values())
+
+        cached = self.cache.get_many(list(keys.values())) if self.cache is not None else {}
+        answers = {t: cached[keys[t]] for t in templates if keys[t] in cached}
+        missing = [t for t in templates if t not in answers]
+
+        self.stats["cache_hits"] += len(answers)
+        self.stats["cache_misses"] += len(missing)
+        self.stats["tokens_saved_cache"] += sum(
+            estimate_tokens(prompts[t]) + estimate_tokens(answers[t]) for t in answers
+        )
+
+        if missing:
+            missing_prompts = [prompts[t] for t in missing]
+            self.stats["prompt_tokens_sent"] += sum(estimate_tokens(p) for p in missing_prompts)
+            generated = dict(zip(missing, self._generate(missing_prompts)))
+            answers.update(generated)
+            if self.cache is not None:
+                self.cache.put_many({keys[t]: a for t, a in generated.items()}, self.model.model_id)
+
+        return [
+            dict(finding, llm_explanation=answers[template])
+            for finding, template in zip(findings, finding_templates)
+        ]
+
+    def report(self):
+        """
+        Summarizes driver efficiency.
+
+        Returns:
+            str: Cache hit rate, deduplication and estimated tokens saved.
+        """
+        stats = self.stats
+        lookups = stats["cache_hits"] + stats["cache_misses"]
+        hit_rate = stats["cache_hits"] / lookups if lookups else 0.0
+        saved = stats["tokens_saved_dedup"] + stats["tokens_saved_cache"]
+        return (
+            f"LLM driver: {stats['findings']} findings -> {stats['unique_templates']} templates, "
+            f"cache hit rate {hit_rate:.0%} ({stats['cache_hits']}/{lookups}), "
+            f"{stats['batches']} batches, ~{stats['prompt_tokens_sent']} prompt tokens sent, "
+            f"~{saved} tokens saved ({stats['tokens_saved_dedup']} dedup, {stats['tokens_saved_cache']} cache)"
+        )
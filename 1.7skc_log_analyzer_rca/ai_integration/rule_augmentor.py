@@ -1 +1,85 @@
 # Learn new parsing rules from unmatched logs
+# ai_integration/rule_augmentor.py
+#
+# Generated rule candidates (e.g. TemplateMiner.candidates()) are screened
+# before they reach rules.yml: each must compile, must not duplicate an
+# existing label or pattern, and must pass the backtracking cost check.
+
+import os
+
+import yaml
+
+from analyzer.rule_profiler import check_rule_cost
+
+def load_rules(rules_path="config/rules.yml"):
+    """
+    Loads the current signature rules.
+
+    Args:
+        rules_path (str): Path to the rules YAML file.
+
+    Returns:
+        dict: Label-pattern pairs (empty if the file does not exist).
+    """
+    if not os.path.exists(rules_path):
+        return {}
+    with open(rules_path, "r") as f:
+        return yaml.safe_load(f) or {}
+
+def validate_rule(label, pattern, existing_rules):
+    """
+    Checks whether a generated rule may be added.
+
+    Args:
+        label (str): Proposed rule name.
+        pattern (str): Proposed regex.
+        existing_rules (dict): Rules already in rules.yml.
+
+    Returns:
+        str or None: Rejection reason, or None if the rule is acceptable.
+    """
+    if label in existing_rules:
+        return "duplicate label"
+    if pattern in existing_rules.values():
+        return f"duplicate pattern (same as {next(k for k, v in existing_rules.items() if v == pattern)})"
+    cost = check_rule_cost(pattern)
+    if not cost["ok"]:
+        return cost["reason"]
+    return None
+
+def augment_rules(candidates, rules_path="config/rules.yml", write=True):
+    """
+    Validates generated rules and appends the accepted ones to rules.yml.
+
+    Args:
+        candidates (List[dict]): Candidates with "label" and "regex"
+            (optionally "template" and "occurrences").
+        rules_path (str): Path to the rules YAML file.
+        write (bool): Append accepted rules to the file (False = dry run).
+
+    Returns:
+        Tuple[List[dict], List[dict]]: Accepted candidates, and rejected
+        candidates with a "reason" key.
+    """
+    rules = dict(load_rules(rules_path))
+    accepted, rejected = [], []
+    for candidate in candidates:
+        reason = validate_rule(candidate["label"], candidate["regex"], rules)
+        if reason:
+            rejected.append(dict(candidate, reason=reason))
+            continue
+        rules[candidate["label"]] = candidate["regex"]
+        accepted.append(candidate)
+
+    if write and accepted:
+        lines = ["", "# === LEARNED FROM UNMATCHED LOGS ==="]
+        for candidate in accepted:
+            if "template" in candidate:
+                lines.append(f"# {candidate.get('occurrences', '?')}x: {candidate['template']}")
+            # Single-quoted YAML scalars keep backslashes literal
+            regex = candidate["regex"].replace("'", "''")
+            lines.append(f"{candidate['label']}: '{regex}'")
+        with open(rules_path, "a") as f:
+            f.write("\n".join(lines) + "\n")
+
+    return accepted, rejected
@@ -12,7 +12,8 @@ def summarize_anomalies(sequence_result, spike_result, diff_lines):
     Args:
         sequence_result (dict): Output from check_sequence()
         spike_result (dict): Output from detect_spike()
-        diff_lines (List[str]): Output from compare_logs()
+        diff_lines (List[str] or dict): Output from compare_logs(), either
+            diff lines (ordered modes) or template deltas ("templates" mode)
 
     Returns:
         dict: Summary of anomaly status including:
@@ -23,12 +24,18 @@ def summarize_anomalies(sequence_result, spike_result, diff_lines):
                 - line_count: Total number of differing lines
                 - has_diff: Boolean flag for whether any diff exists
     """
+    if isinstance(diff_lines, dict):
+        # Template deltas: every added or removed occurrence is one differing line
+        line_count = sum(abs(delta) for delta in diff_lines.values())
+    else:
+        line_count = len(diff_lines)
+
     return {
         "sequence_status": sequence_result.get("status"),
         "missing_steps": sequence_result.get("missing"),
         "spike_times": list(spike_result.keys()),
         "diff_summary": {
-            "line_count": len(diff_lines),
+            "line_count": line_count,
             "has_diff": bool(diff_lines)
         }
     }
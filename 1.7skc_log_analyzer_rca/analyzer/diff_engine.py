@@ -3,6 +3,42 @@
 
 import difflib
 import re
+import time
+from bisect import bisect_left
+from collections import Counter
+
+from utils.timestamp_utils import TIMESTAMP_MASK_PATTERN
+
+# Dynamic fields masked before comparison, compiled once
+MASK_PATTERNS = [
+    # Mask timestamps (ISO with fraction/offset, EVTX SystemTime, MSI clock)
+    (TIMESTAMP_MASK_PATTERN, "[TIMESTAMP]"),
+    # Mask standard UUID/GUIDs
+    (re.compile(r"[a-fA-F0-9\-]{36}"), "[GUID]"),
+    # Mask Windows file paths
+    (re.compile(r"[A-Z]:\\\\[^\s]+"), "[PATH]"),
+]
+
+# Diff modes accepted by compare_logs()
+DIFF_MODES = ("unified", "fast", "templates")
+
+# Regions without unique anchors are handed to difflib only below this
+# many line-pair comparisons; larger ones are reported as a full replace
+MAX_FALLBACK_CELLS = 1_000_000
+
+def mask_line(line):
+    """
+    Masks dynamic fields in a single log line.
+
+    Args:
+        line (str): Log line.
+
+    Returns:
+        str: Line with dynamic fields replaced by static tokens.
+    """
+    for pattern, token in MASK_PATTERNS:
+        line = pattern.sub(token, line)
+    return line
 
 def mask_dynamic_fields(lines):
     """
@@ -19,35 +55,184 @@ def mask_dynamic_fields(lines):
     Returns:
         List[str]: Lines with dynamic fields replaced by static tokens.
     """
-    masked = []
+    return [mask_line(line) for line in lines]
+
+def _unique_anchors(a, b, alo, ahi, blo, bhi):
+    """
+    Patience step: lines occurring exactly once on both sides, reduced to
+    the longest run that is increasing on both sides.
+    """
+    a_slice = a[alo:ahi]
+    b_slice = b[blo:bhi]
+    a_counts = Counter(a_slice)
+    b_counts = Counter(b_slice)
+    # Last position wins, which is the only position for unique lines
+    a_pos = dict(zip(a_slice, range(alo, ahi)))
+    b_pos = dict(zip(b_slice, range(blo, bhi)))
+
+    pairs = sorted(
+        (a_pos[h], b_pos[h]) for h, n in a_counts.items()
+        if n == 1 and b_counts.get(h) == 1
+    )
+    if not pairs:
+        return []
+
+    # Similar logs usually keep unique lines in the same order
+    if all(j0 < j1 for (_, j0), (_, j1) in zip(pairs, pairs[1:])):
+        return pairs
+
+    # Longest increasing subsequence over the B indexes (patience sorting)
+    tails, tail_idx, prev = [], [], [None] * len(pairs)
+    for k, (_, j) in enumerate(pairs):
+        pos = bisect_left(tails, j)
+        if pos == len(tails):
+            tails.append(j)
+            tail_idx.append(k)
+        else:
+            tails[pos] = j
+            tail_idx[pos] = k
+        prev[k] = tail_idx[pos - 1] if pos else None
+
+    anchors = []
+    k = tail_idx[-1]
+    while k is not None:
+        anchors.append(pairs[k])
+        k = prev[k]
+    anchors.reverse()
+    return anchors
+
+def match_hashes(a, b, deadline=None):
+    """
+    Finds matching line pairs between two hash sequences.
+
+    Uses patience diff: common prefixes/suffixes are peeled off, lines
+    unique to both sides anchor the alignment, and the gaps between anchors
+    are refined the same way. Gaps without unique lines fall back to
+    difflib when small. Once `deadline` passes, remaining gaps are left
+    unmatched so the call always returns within budget.
+
+    Args:
+        a (List[int]): Baseline line hashes.
+        b (List[int]): Target line hashes.
+        deadline (float, optional): time.monotonic() value after which refinement stops.
+
+    Returns:
+        List[Tuple[int, int]]: Matched (baseline index, target index) pairs in order.
+    """
+    matches = []
+    regions = [(0, len(a), 0, len(b))]
+
+    while regions:
+        alo, ahi, blo, bhi = regions.pop()
+
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            matches.append((alo, blo))
+            alo += 1
+            blo += 1
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+            matches.append((ahi, bhi))
+
+        if alo == ahi or blo == bhi:
+            continue
+        if deadline is not None and time.monotonic() > deadline:
+            continue
+
+        anchors = _unique_anchors(a, b, alo, ahi, blo, bhi)
+        if anchors:
+            matches.extend(anchors)
+            bounds = [(alo - 1, blo - 1)] + anchors + [(ahi, bhi)]
+            for (i0, j0), (i1, j1) in zip(bounds, bounds[1:]):
+                regions.append((i0 + 1, i1, j0 + 1, j1))
+        elif (ahi - alo) * (bhi - blo) <= MAX_FALLBACK_CELLS:
+            matcher = difflib.SequenceMatcher(None, a[alo:ahi], b[blo:bhi], autojunk=False)
+            for i, j, size in matcher.get_matching_blocks():
+                matches.extend((alo + i + k, blo + j + k) for k in range(size))
+
+    matches.sort()
+    return matches
+
+def fast_diff(baseline_lines, target_lines, time_budget=None):
+    """
+    Ordered diff over hashed, masked lines.
+
+    Each masked line is reduced to an integer hash so alignment compares
+    ints instead of strings, and the patience-based matcher keeps the cost
+    near-linear on large, mostly similar logs.
+
+    Args:
+        baseline_lines (List[str]): Reference log content.
+        target_lines (List[str]): New log content to compare.
+        time_budget (float, optional): Seconds allowed for alignment refinement.
+
+    Returns:
+        List[str]: Masked lines prefixed with '-' (removed) or '+' (added).
+    """
+    baseline = mask_dynamic_fields(baseline_lines)
+    target = mask_dynamic_fields(target_lines)
+    a = [hash(line) for line in baseline]
+    b = [hash(line) for line in target]
 
-    for line in lines:
-        # Mask ISO-like timestamp patterns
-        line = re.sub(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}", "[TIMESTAMP]", line)
+    deadline = time.monotonic() + time_budget if time_budget is not None else None
 
-        # Mask standard UUID/GUIDs
-        line = re.sub(r"[a-fA-F0-9\-]{36}", "[GUID]", line)
+    diff = []
+    i = j = 0
+    for mi, mj in match_hashes(a, b, deadline) + [(len(a), len(b))]:
+        diff.extend("-" + line for line in baseline[i:mi])
+        diff.extend("+" + line for line in target[j:mj])
+        i, j = mi + 1, mj + 1
+    return diff
 
-        # Mask Windows file paths
-        line = re.sub(r"[A-Z]:\\\\[^\s]+", "[PATH]", line)
+def template_delta(baseline_lines, target_lines):
+    """
+    Order-insensitive comparison of masked line templates.
 
-        masked.append(line)
+    Counts how often each masked template occurs on each side and reports
+    the change. Runs in linear time with memory bounded by distinct templates.
 
-    return masked
+    Args:
+        baseline_lines (Iterable[str]): Reference log content.
+        target_lines (Iterable[str]): New log content to compare.
 
-def compare_logs(baseline_lines, target_lines):
+    Returns:
+        dict: Template → count change (positive = more in target, negative = fewer).
+    """
+    counts = Counter(mask_line(line) for line in target_lines)
+    counts.subtract(mask_line(line) for line in baseline_lines)
+    return {template: delta for template, delta in counts.items() if delta}
+
+def compare_logs(baseline_lines, target_lines, mode="unified", max_lines=None, time_budget=None):
     """
     Compares two sets of log lines after masking dynamic data.
 
-    Uses unified diff to highlight changes while ignoring non-deterministic fields.
+    Modes:
+    - "unified": difflib unified diff (exact, but super-linear on large logs)
+    - "fast": hash-based patience diff, '-'/'+' lines without context
+    - "templates": per-template count delta, ignoring line order
 
     Args:
         baseline_lines (List[str]): Reference log content.
         target_lines (List[str]): New log content to compare.
+        mode (str): One of DIFF_MODES.
+        max_lines (int, optional): Size budget; ordered modes switch to
+            "templates" when the two inputs together exceed it.
+        time_budget (float, optional): Seconds allowed for "fast" alignment.
 
     Returns:
-        List[str]: List of diff lines (added/removed/changed).
+        List[str] or dict: Diff lines for ordered modes, template deltas for "templates".
     """
+    if mode not in DIFF_MODES:
+        raise ValueError(f"Unknown diff mode: {mode}")
+
+    if max_lines is not None and len(baseline_lines) + len(target_lines) > max_lines:
+        mode = "templates"
+
+    if mode == "templates":
+        return template_delta(baseline_lines, target_lines)
+    if mode == "fast":
+        return fast_diff(baseline_lines, target_lines, time_budget)
+
     # Normalize dynamic content
     baseline = mask_dynamic_fields(baseline_lines)
     target = mask_dynamic_fields(target_lines)
@@ -1,6 +1,9 @@
 # analyzer/event_expectations.py
 
+from analyzer.keyword_scanner import KeywordScanner
+
 # Define a list of critical events expected to appear in healthy logs
+# (default when no list is loaded from config/markers.yml)
 EXPECTED_EVENTS = [
     "System Ready",
     "Driver Initialized",
@@ -8,7 +11,7 @@ EXPECTED_EVENTS = [
     "Install Success"
 ]
 
-def find_missing_events(log_lines):
+def find_missing_events(log_lines, expected=None, scan=None):
     """
     Checks whether expected event markers are missing from the logs.
 
@@ -18,13 +21,16 @@ def find_missing_events(log_lines):
 
     Args:
         log_lines (List[str]): Full list of cleaned log lines.
+        expected (List[str], optional): Events to look for (defaults to EXPECTED_EVENTS).
+        scan (dict, optional): Precomputed scan_markers() result covering the
+            events; avoids rescanning the log.
 
     Returns:
         List[str]: List of expected events that were not found in the logs.
     """
-    missing = [
-        event
-        for event in EXPECTED_EVENTS
-        if not any(event in line for line in log_lines)
-    ]
+    expected = expected or EXPECTED_EVENTS
+    if scan is None:
+        scan = KeywordScanner(expected).scan(log_lines)
+
+    missing = [event for event in expected if event not in scan]
     return missing
@@ -0,0 +1,269 @@
+# Multi-keyword scanning shared by the marker checkers
+# analyzer/keyword_scanner.py
+
+import re
+from bisect import bisect_right
+
+import yaml
+
+try:
+    import ahocorasick
+except ImportError:  # Optional; the trie regex is used instead
+    ahocorasick = None
+
+from utils.timestamp_utils import TimestampParser
+
+# Joins texts for find_many(); texts are scanned as one string
+BATCH_SEPARATOR = "\x00"
+
+def load_markers(yaml_path="config/markers.yml"):
+    """
+    Loads marker lists (expected sequence steps, expected events) from YAML.
+
+    Expected structure:
+    ---
+    sequence:
+      - Initialize
+      - Load Config
+    expected_events:
+      - System Ready
+
+    Args:
+        yaml_path (str): Path to the markers YAML file.
+
+    Returns:
+        dict: Marker list name → list of marker strings.
+    """
+    with open(yaml_path, 'r') as f:
+        return yaml.safe_load(f) or {}
+
+def trie_pattern(words):
+    """
+    Builds a regex matching any of `words`, factored into a prefix trie.
+
+    A plain alternation tries every word at each position. The trie form
+    shares prefixes, so each position tries only the distinct first
+    characters, then the distinct next characters, and so on. Cost still
+    grows with the branching of the trie, which rises as words are added.
+    Where a word ends inside a longer one, the longer continuation is tried
+    first (greedy), so each position reports its longest word.
+
+    Args:
+        words (Iterable[str]): Literal words.
+
+    Returns:
+        str: Regex source (no groups).
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def emit(node):
+        branches = [re.escape(char) + emit(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" not in node:
+            return body
+        return (body if len(branches) > 1 or len(body) == 1 else "(?:" + body + ")") + "?"
+
+    return emit(trie)
+
+class KeywordScanner:
+    """
+    Finds every configured keyword in a text with a single scan.
+
+    With pyahocorasick installed, keywords are compiled into an Aho-Corasick
+    automaton: a text is scanned once, in time linear in its length plus
+    the hits, whatever the keyword count.
+
+    Otherwise all keywords are compiled into one prefix-trie regex inside a
+    lookahead, so each start position is tested once in C and overlapping
+    hits are still reported. Its cost grows with the trie's branching as
+    keywords are added (see trie_pattern()). A shorter keyword that starts
+    where a longer one matched is a substring of it, so it is added from a
+    precomputed containment table instead of a second scan.
+
+    Matching is plain substring search, the same as `keyword in line`.
+    """
+
+    def __init__(self, keywords, ignore_case=False, timestamp_parser=None):
+        """
+        Args:
+            keywords (Iterable[str]): Keywords to search for.
+            ignore_case (bool): Match case-insensitively.
+            timestamp_parser (TimestampParser, optional): Parser for hit
+                times (defaults to a sniffing parser of its own).
+        """
+        self.keywords = list(dict.fromkeys(k for k in keywords if k))
+        self.ignore_case = ignore_case
+
+        fold = str.lower if ignore_case else (lambda k: k)
+        folded = {k: fold(k) for k in self.keywords}
+
+        # The trie reports the longest keyword at each position
+        flags = re.IGNORECASE if ignore_case else 0
+        self.pattern = re.compile(
+            "(?=(" + trie_pattern(set(folded.values())) + "))", flags
+        ) if self.keywords else None
+
+        self._lookup = {folded[k]: k for k in self.keywords}
+        self._contained = {
+            k: [o for o in self.keywords if o != k and folded[o] in folded[k]]
+            for k in self.keywords
+        }
+        self._fold = fold
+
+        # Folded keyword -> every keyword spelled that way
+        self.automaton = None
+        if ahocorasick is not None and self.keywords:
+            spellings = {}
+            for keyword in self.keywords:
+                spellings.setdefault(folded[keyword], []).append(keyword)
+            self.automaton = ahocorasick.Automaton()
+            for key, keywords in spellings.items():
+                self.automaton.add_word(key, tuple(keywords))
+            self.automaton.make_automaton()
+        self._batchable = not any(BATCH_SEPARATOR in k for k in self.keywords)
+        self.timestamp_parser = timestamp_parser or TimestampParser()
+
+    def find(self, text):
+        """
+        Returns the keywords occurring in a text.
+
+        Args:
+            text (str): Text to scan.
+
+        Returns:
+            set: Keywords found (original spelling).
+        """
+        found = set()
+        if self.pattern is None:
+            return found
+        if self.automaton is not None:
+            for _, keywords in self.automaton.iter(self._fold(text)):
+                found.update(keywords)
+            return found
+        for match in self.pattern.finditer(text):
+            keyword = self._lookup.get(self._fold(match.group(1)))
+            if keyword is not None and keyword not in found:
+                found.add(keyword)
+                found.update(self._contained[keyword])
+        return found
+
+    def find_many(self, texts):
+        """
+        Returns the keywords occurring in each of several texts.
+
+        The texts are joined and scanned as one string, and every hit is
+        mapped back to its text by offset, so the per-call overhead of a
+        scan is paid once per batch instead of once per text.
+
+        Args:
+            texts (List[str]): Texts to scan.
+
+        Returns:
+            List[set]: Keywords found (original spelling), one set per text.
+        """
+        if not self._batchable:
+            return [self.find(text) for text in texts]
+        found = [set() for _ in texts]
+        if self.pattern is None or not texts:
+            return found
+
+        folded = [self._fold(text) for text in texts] if self.automaton is not None else texts
+        starts = []
+        pos = 0
+        for text in folded:
+            starts.append(pos)
+            pos += len(text) + len(BATCH_SEPARATOR)
+        joined = BATCH_SEPARATOR.join(folded)
+
+        if self.automaton is not None:
+            # Hits report their end offset; keywords never span a separator
+            for end, keywords in self.automaton.iter(joined):
+                found[bisect_right(starts, end) - 1].update(keywords)
+            return found
+        for match in self.pattern.finditer(joined):
+            keyword = self._lookup.get(self._fold(match.group(1)))
+            if keyword is not None:
+                hits = found[bisect_right(starts, match.start()) - 1]
+                hits.add(keyword)
+                hits.update(self._contained[keyword])
+        return found
+
+    def observe(self, hits, line_no, line, timestamp=None):
+        """
+        Folds one line into a running hits dict (see scan()).
+
+        Lets streaming callers track markers without a separate pass.
+
+        Args:
+            hits (dict): Accumulator returned by a previous scan()/observe().
+            line_no (int): 1-based line number.
+            line (str): Log line or merged entry.
+            timestamp (int, optional): Epoch seconds of the line, when the
+                caller has already parsed it.
+        """
+        found = self.find(line)
+        if not found:
+            return
+        ts = timestamp if timestamp is not None else self.timestamp_parser.parse(line)
+        for keyword in found:
+            hit = hits.get(keyword)
+            if hit is None:
+                hits[keyword] = {
+                    "count": 1,
+                    "first_line": line_no,
+                    "last_line": line_no,
+                    "first_time": ts,
+                    "last_time": ts,
+                }
+            else:
+                hit["count"] += 1
+                hit["last_line"] = line_no
+                if ts is not None:
+                    hit["last_time"] = ts
+                    if hit["first_time"] is None:
+                        hit["first_time"] = ts
+
+    def scan(self, log_lines):
+        """
+        Scans a log once, recording where each keyword first and last occurs.
+
+        Timestamps are only parsed on lines that contain a keyword, with
+        the scanner's TimestampParser (any supported format, MSI included).
+
+        Args:
+            log_lines (Iterable[str]): Cleaned log lines.
+
+        Returns:
+            dict: Keyword → {"count", "first_line", "last_line", "first_time",
+            "last_time"} for every keyword seen (1-based lines, epoch seconds or None).
+        """
+        hits = {}
+        for idx, line in enumerate(log_lines, start=1):
+            self.observe(hits, idx, line)
+        return hits
+
+def scan_markers(log_lines, *marker_lists, timestamp_parser=None):
+    """
+    Scans a log once for the union of several marker lists.
+
+    The result can be handed to check_sequence() and find_missing_events()
+    so both checks share a single pass over the log.
+
+    Args:
+        log_lines (Iterable[str]): Cleaned log lines.
+        *marker_lists (List[str]): Marker lists to combine.
+        timestamp_parser (TimestampParser, optional): Parser for the log's
+            timestamps (e.g. TimestampParser(path)).
+
+    Returns:
+        dict: Output of KeywordScanner.scan().
+    """
+    keywords = [marker for markers in marker_lists for marker in markers]
+    return KeywordScanner(keywords, timestamp_parser=timestamp_parser).scan(log_lines)
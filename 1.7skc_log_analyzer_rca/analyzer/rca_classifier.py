@@ -1,11 +1,140 @@
 # Rule-based RCA classification
 # analyzer/rca_classifier.py
 
-def classify_root_cause(event):
+import yaml
+
+from analyzer.keyword_scanner import KeywordScanner
+
+DEFAULT_LABEL = "Unclassified"
+
+# Built-in categories, used when no categories YAML is given; mirrors
+# config/rca_categories.yml. Highest priority wins when several match.
+DEFAULT_CATEGORIES = [
+    {"label": "Network Issue", "priority": 50, "keywords": ["timeout", "unreachable"]},
+    {"label": "Security/Permission", "priority": 40, "keywords": ["permission denied", "access is denied"]},
+    {"label": "Storage I/O", "priority": 30, "keywords": ["disk", "io error"]},
+    {"label": "Code Defect", "priority": 20, "keywords": ["nullreference", "undefined"]},
+    {"label": "Resource Exhaustion", "priority": 10, "keywords": ["outofmemory"]},
+]
+
+def load_categories(yaml_path="config/rca_categories.yml"):
+    """
+    Loads RCA categories from YAML.
+
+    Expected structure:
+    ---
+    default: Unclassified
+    categories:
+      - label: Network Issue
+        priority: 50
+        keywords: [timeout, unreachable]
+
+    Args:
+        yaml_path (str): Path to the categories YAML file.
+
+    Returns:
+        dict: "categories" (list of label/priority/keywords) and "default".
+    """
+    with open(yaml_path, "r") as f:
+        config = yaml.safe_load(f) or {}
+    return {
+        "categories": config.get("categories") or [],
+        "default": config.get("default") or DEFAULT_LABEL,
+    }
+
+class RootCauseClassifier:
+    """
+    Keyword-based root cause classifier compiled into one scanner.
+
+    Every keyword of every category goes into a single KeywordScanner
+    (an Aho-Corasick automaton when pyahocorasick is installed), so a
+    message is scanned once regardless of how many categories exist, and
+    with the automaton scan cost does not depend on the keyword count
+    either. Each keyword is pre-ranked by its category's
+    priority, then category order, then keyword order; the best-ranked
+    keyword found decides the label.
+
+    Args:
+        categories (List[dict]): label, priority (default 0) and keywords.
+        default (str): Label when no keyword matches.
+    """
+
+    def __init__(self, categories=None, default=DEFAULT_LABEL):
+        self.categories = DEFAULT_CATEGORIES if categories is None else categories
+        self.default = default
+
+        # Folded keyword -> (rank, label, keyword); higher rank wins
+        self._ranks = {}
+        for cat_idx, category in enumerate(self.categories):
+            keywords = category.get("keywords") or []
+            for kw_idx, keyword in enumerate(keywords):
+                rank = (category.get("priority", 0), -cat_idx, -kw_idx)
+                folded = keyword.lower()
+                if folded not in self._ranks or rank > self._ranks[folded][0]:
+                    self._ranks[folded] = (rank, category["label"], keyword)
+        self.scanner = KeywordScanner(list(self._ranks), ignore_case=True)
+
+    @classmethod
+    def from_yaml(cls, yaml_path="config/rca_categories.yml"):
+        """
+        Builds a classifier from a categories YAML file.
+
+        Args:
+            yaml_path (str): Path to the categories YAML file.
+
+        Returns:
+            RootCauseClassifier: Compiled classifier.
+        """
+        config = load_categories(yaml_path)
+        return cls(config["categories"], config["default"])
+
+    def _best(self, keywords):
+        ranks = self._ranks
+        best = max((ranks[k] for k in keywords), default=None)
+        if best is None:
+            return self.default, None
+        return best[1], best[2]
+
+    def classify(self, message):
+        """
+        Classifies one message.
+
+        Args:
+            message (str): Log message.
+
+        Returns:
+            Tuple[str, str or None]: Label and the keyword that decided it.
+        """
+        return self._best(self.scanner.find(message))
+
+    def classify_batch(self, events):
+        """
+        Classifies many events with a single scan.
+
+        See KeywordScanner.find_many().
+
+        Args:
+            events (Iterable[dict or str]): Events with a "message" field, or messages.
+
+        Returns:
+            List[Tuple[str, str or None]]: Label and deciding keyword per event.
+        """
+        messages = [e if isinstance(e, str) else e.get("message", "") for e in events]
+        return [self._best(hits) for hits in self.scanner.find_many(messages)]
+
+_DEFAULT_CLASSIFIER = None
+
+def _default_classifier():
+    global _DEFAULT_CLASSIFIER
+    if _DEFAULT_CLASSIFIER is None:
+        _DEFAULT_CLASSIFIER = RootCauseClassifier()
+    return _DEFAULT_CLASSIFIER
+
+def classify_root_cause(event, classifier=None):
     """
     Classifies the root cause category of a log event based on message content.
 
-    Categories include:
+    Categories include (built-in defaults, see config/rca_categories.yml):
     - Network Issue
     - Security/Permission
     - Storage I/O
@@ -15,32 +144,26 @@ def classify_root_cause(event):
 
     Args:
         event (dict): A parsed log event with at least a 'message' field.
+        classifier (RootCauseClassifier, optional): Configured categories
+            (defaults to the built-in ones).
 
     Returns:
         str: Root cause classification label.
     """
-    message = event.get("message", "").lower()
-
-    # Identify common network-related errors
-    if "timeout" in message or "unreachable" in message:
-        return "Network Issue"
-
-    # Identify permission/security issues
-    elif "permission denied" in message or "access is denied" in message:
-        return "Security/Permission"
+    classifier = classifier or _default_classifier()
+    return classifier.classify(event.get("message", ""))[0]
 
-    # Identify storage-related errors
-    elif "disk" in message or "io error" in message:
-        return "Storage I/O"
-
-    # Identify null/undefined or exception triggers
-    elif "nullreference" in message or "undefined" in message:
-        return "Code Defect"
+def classify_root_causes(events, classifier=None):
+    """
+    Batch form of classify_root_cause() that also reports the matched keyword.
 
-    # Identify memory/resource exhaustion
-    elif "outofmemory" in message:
-        return "Resource Exhaustion"
+    Args:
+        events (Iterable[dict or str]): Parsed log events with a 'message'
+            field, or messages.
+        classifier (RootCauseClassifier, optional): Configured categories.
 
-    # Fallback when no known pattern matches
-    else:
-        return "Unclassified"
+    Returns:
+        List[Tuple[str, str or None]]: Label and deciding keyword per event.
+    """
+    classifier = classifier or _default_classifier()
+    return classifier.classify_batch(events)
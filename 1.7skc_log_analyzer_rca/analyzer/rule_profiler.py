@@ -0,0 +1,435 @@
+# Rule cost profiling and backtracking guard
+# analyzer/rule_profiler.py
+#
+# Two tools for keeping rules.yml cheap:
+# - ProfiledRuleSet: a drop-in SignatureRuleSet that records per-rule
+#   evaluations, hits and cumulative time on real input.
+# - check_rule_cost(): times a pattern on synthetic adversarial inputs of
+#   growing size and flags super-linear growth (e.g. `.*?` restarted at every
+#   occurrence of a prefix), nested quantifiers or overlapping alternatives
+#   under a repeat (exponential backtracking).
+
+import math
+import multiprocessing
+import re
+import string
+import time
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+from analyzer.signature_matcher import SignatureRuleSet
+
+# Input lengths for the growth measurement
+COST_SIZES = (1_000, 2_000, 4_000, 8_000)
+
+# Log-log slope above which runtime counts as super-linear (quadratic ~ 2)
+MAX_GROWTH_EXPONENT = 1.5
+
+# Slopes are only trusted once a search takes this long; faster rules are
+# cheap regardless of their measured shape
+MIN_SIGNIFICANT_SECONDS = 0.002
+
+# A single search slower than this fails the check outright
+MAX_SEARCH_SECONDS = 0.05
+
+# Searches run in a child process; one still running after this long is
+# killed, so a pathological rule cannot hang the check
+SEARCH_KILL_SECONDS = 1.0
+
+# Time allowed for the child process to start before its first search
+WORKER_START_SECONDS = 10.0
+
+# Characters tried when testing whether two alternatives can start alike;
+# the literals of the alternatives themselves are always tried as well
+PROBE_CHARS = string.printable + "\x00\xa0\xe9\u0663\u2003"
+
+# Patterns for the character categories sre_parse emits inside IN
+CATEGORY_PATTERNS = {
+    sre_parse.CATEGORY_DIGIT: re.compile(r"\d"),
+    sre_parse.CATEGORY_NOT_DIGIT: re.compile(r"\D"),
+    sre_parse.CATEGORY_SPACE: re.compile(r"\s"),
+    sre_parse.CATEGORY_NOT_SPACE: re.compile(r"\S"),
+    sre_parse.CATEGORY_WORD: re.compile(r"\w"),
+    sre_parse.CATEGORY_NOT_WORD: re.compile(r"\W"),
+}
+
+class ProfiledRuleSet(SignatureRuleSet):
+    """
+    SignatureRuleSet that measures what each rule costs.
+
+    The combined prefilter is bypassed so every rule is evaluated (and
+    timed) on every line; matching results are identical to the normal
+    rule set. Meant for profiling runs, not production scans.
+    """
+
+    def __init__(self, rules):
+        super().__init__(rules)
+        self.stats = {label: {"evaluations": 0, "hits": 0, "seconds": 0.0} for label in self.rules}
+        self.lines = 0
+        self.chars = 0
+
+    def match_line(self, line):
+        self.lines += 1
+        self.chars += len(line)
+        clock = time.perf_counter
+        labels = []
+        for label, regex in self.compiled:
+            stat = self.stats[label]
+            start = clock()
+            hit = regex.search(line)
+            stat["seconds"] += clock() - start
+            stat["evaluations"] += 1
+            if hit:
+                stat["hits"] += 1
+                labels.append(label)
+        return labels
+
+    def report(self, top=None):
+        """
+        Returns per-rule costs, most expensive first.
+
+        Args:
+            top (int, optional): Limit to the `top` most expensive rules.
+
+        Returns:
+            List[dict]: label, pattern, evaluations, hits, seconds and
+            microseconds per evaluation.
+        """
+        rows = []
+        for label, stat in self.stats.items():
+            evaluations = stat["evaluations"]
+            rows.append({
+                "label": label,
+                "pattern": self.rules[label],
+                "evaluations": evaluations,
+                "hits": stat["hits"],
+                "seconds": stat["seconds"],
+                "us_per_eval": stat["seconds"] / evaluations * 1e6 if evaluations else 0.0,
+            })
+        rows.sort(key=lambda row: row["seconds"], reverse=True)
+        return rows[:top] if top else rows
+
+    def format_report(self, top=None):
+        """
+        Renders report() as a text table.
+
+        Args:
+            top (int, optional): Limit to the `top` most expensive rules.
+
+        Returns:
+            str: One line per rule.
+        """
+        lines = [f"Rule cost over {self.lines} lines ({self.chars} chars):"]
+        for row in self.report(top):
+            lines.append(
+                f"  {row['label']:<28} {row['seconds']:9.4f}s  {row['us_per_eval']:8.2f}us/eval  "
+                f"{row['hits']:>8} hits / {row['evaluations']} evals"
+            )
+        return "\n".join(lines)
+
+def _walk(parsed, in_repeat=False):
+    # Yields (op, av, inside_another_repeat) for every node of a parsed pattern
+    for op, av in parsed:
+        yield op, av, in_repeat
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            low, high, sub = av
+            yield from _walk(sub, in_repeat or high == sre_parse.MAXREPEAT)
+        elif op == sre_parse.SUBPATTERN:
+            yield from _walk(av[-1], in_repeat)
+        elif op == sre_parse.BRANCH:
+            for branch in av[1]:
+                yield from _walk(branch, in_repeat)
+
+def _char_matches(op, av, char):
+    # Whether a single-character node matches `char`; unknown nodes match anything
+    if op == sre_parse.LITERAL:
+        return char == chr(av)
+    if op == sre_parse.NOT_LITERAL:
+        return char != chr(av)
+    if op == sre_parse.RANGE:
+        return av[0] <= ord(char) <= av[1]
+    if op == sre_parse.CATEGORY and av in CATEGORY_PATTERNS:
+        return CATEGORY_PATTERNS[av].match(char) is not None
+    if op == sre_parse.IN:
+        negate = bool(av) and av[0][0] == sre_parse.NEGATE
+        items = av[1:] if negate else av
+        return any(_char_matches(o, a, char) for o, a in items) != negate
+    if op == sre_parse.ANY:
+        return char != "\n"
+    return True
+
+def _probe_chars(nodes):
+    # PROBE_CHARS plus every literal and range bound the nodes mention
+    chars = set(PROBE_CHARS)
+    for op, av in nodes:
+        if op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL):
+            chars.add(chr(av))
+        elif op == sre_parse.RANGE:
+            chars.update((chr(av[0]), chr(av[1])))
+        elif op == sre_parse.IN:
+            chars |= _probe_chars(av)
+    return chars
+
+def _nodes_overlap(first, second):
+    # Whether two lists of single-character nodes share a character
+    if not first or not second:
+        return False
+    for char in _probe_chars(first + second):
+        if any(_char_matches(op, av, char) for op, av in first) \
+                and any(_char_matches(op, av, char) for op, av in second):
+            return True
+    return False
+
+def _first_chars(parsed):
+    """
+    Approximates the characters a sequence can start with.
+
+    Args:
+        parsed (list): Parsed sequence (one alternative).
+
+    Returns:
+        tuple: (list of single-character nodes, whether the sequence can
+        match the empty string).
+    """
+    nodes = []
+    for op, av in parsed:
+        if op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            continue  # zero-width
+        if op == sre_parse.SUBPATTERN:
+            sub, nullable = _first_chars(av[-1])
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            sub, nullable = _first_chars(av[2])
+            nullable = nullable or av[0] == 0
+        elif op == sre_parse.BRANCH:
+            sub, nullable = [], False
+            for branch in av[1]:
+                branch_nodes, branch_nullable = _first_chars(branch)
+                sub += branch_nodes
+                nullable = nullable or branch_nullable
+        elif op in (sre_parse.LITERAL, sre_parse.NOT_LITERAL, sre_parse.IN, sre_parse.ANY):
+            sub, nullable = [(op, av)], False
+        else:
+            sub, nullable = [(sre_parse.ANY, None)], False  # e.g. a backreference
+        nodes += sub
+        if not nullable:
+            return nodes, False
+    return nodes, True
+
+def _ambiguous_alternation(op, av):
+    # A BRANCH whose alternatives can start alike (or both match nothing),
+    # or an IN whose items overlap
+    if op == sre_parse.BRANCH:
+        firsts = [_first_chars(branch) for branch in av[1]]
+        for i, (nodes, nullable) in enumerate(firsts):
+            for other_nodes, other_nullable in firsts[i + 1:]:
+                if (nullable and other_nullable) or _nodes_overlap(nodes, other_nodes):
+                    return True
+    elif op == sre_parse.IN:
+        if av and av[0][0] == sre_parse.NEGATE:
+            return False
+        for i, item in enumerate(av):
+            if any(_nodes_overlap([item], [other]) for other in av[i + 1:]):
+                return True
+    return False
+
+def has_nested_quantifier(pattern):
+    """
+    Detects an unbounded quantifier inside another unbounded repeat, e.g.
+    (a+)+ or (\\w*)*, and ambiguous alternation inside one, e.g. (a|a)*,
+    (a|\\w)* or (?:\\w|\\d)*. Bounded repeats such as (\\d{1,3}\\.){3}
+    and alternatives with distinct first characters such as (foo|bar)*
+    are allowed.
+
+    Such patterns can backtrack exponentially and are rejected without
+    being run.
+
+    Args:
+        pattern (str): Regex source.
+
+    Returns:
+        bool: True if a nested unbounded repeat or an ambiguous
+        alternation under one exists.
+    """
+    for op, av, in_repeat in _walk(sre_parse.parse(pattern)):
+        if not in_repeat:
+            continue
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT) and av[1] == sre_parse.MAXREPEAT:
+            return True
+        if _ambiguous_alternation(op, av):
+            return True
+    return False
+
+def _literal_runs(parsed):
+    # Literal words of one alternative, in order (e.g. ["killed process", "due to"])
+    runs, current = [], []
+    for op, av in parsed:
+        if op == sre_parse.LITERAL:
+            current.append(chr(av))
+        else:
+            if current:
+                runs.append("".join(current))
+            current = []
+    if current:
+        runs.append("".join(current))
+    return [run.strip() for run in runs if run.strip()] or ["a"]
+
+def _alternatives(pattern):
+    # Top-level alternatives of a pattern ("x|y" -> [x, y])
+    parsed = sre_parse.parse(pattern)
+    if len(parsed) == 1 and parsed[0][0] == sre_parse.BRANCH:
+        return parsed[0][1][1]
+    return [parsed]
+
+def adversarial_inputs(pattern, size):
+    """
+    Builds near-miss inputs of roughly `size` characters for a pattern.
+
+    For each top-level alternative, every literal run but the last is
+    repeated, so each occurrence starts a partial match that never
+    completes. Generic filler (letters, spaces, digits) is added as well.
+
+    Args:
+        pattern (str): Regex source.
+        size (int): Target input length.
+
+    Returns:
+        List[str]: Inputs to time the pattern on.
+    """
+    inputs = ["a" * size, " " * size, "1" * size]
+    for alternative in _alternatives(pattern):
+        runs = _literal_runs(alternative)
+        unit = " ".join(runs[:-1] if len(runs) > 1 else runs) + " "
+        inputs.append((unit * (size // len(unit) + 1))[:size])
+    return inputs
+
+def _time_search(regex, text, repeats=3, limit=MAX_SEARCH_SECONDS):
+    # Best of `repeats` runs; a run over `limit` is final (no point repeating)
+    best = math.inf
+    for _ in range(repeats):
+        start = time.perf_counter()
+        regex.search(text)
+        best = min(best, time.perf_counter() - start)
+        if best > limit:
+            break
+    return best
+
+def _measure(conn, pattern, sizes, max_seconds):
+    # Child process: sends (size, None) before each size, then
+    # (size, seconds) for each input of that size
+    regex = re.compile(pattern)
+    for size in sizes:
+        conn.send((size, None))
+        worst = 0.0
+        for text in adversarial_inputs(pattern, size):
+            seconds = _time_search(regex, text, limit=max_seconds)
+            conn.send((size, seconds))
+            worst = max(worst, seconds)
+        if worst > max_seconds:
+            break
+    conn.close()
+
+def _run_measurement(pattern, sizes, max_seconds):
+    """
+    Runs _measure() in a child process, killing it if a search stalls.
+
+    Args:
+        pattern (str): Regex source (already known to compile).
+        sizes (Iterable[int]): Input lengths, ascending.
+        max_seconds (float): Slowest acceptable single search.
+
+    Returns:
+        tuple: ([(size, worst seconds)] for each completed size, the size
+        whose search was killed or None).
+    """
+    context = multiprocessing.get_context()
+    receiver, sender = context.Pipe(duplex=False)
+    worker = context.Process(target=_measure, args=(sender, pattern, tuple(sizes), max_seconds), daemon=True)
+    worker.start()
+    sender.close()
+
+    worst = {}
+    size = None
+    timeout = WORKER_START_SECONDS
+    try:
+        while True:
+            if not receiver.poll(timeout):
+                return [(n, worst[n]) for n in worst if n != size], size
+            try:
+                size, seconds = receiver.recv()
+            except EOFError:
+                return list(worst.items()), None
+            timeout = SEARCH_KILL_SECONDS
+            worst[size] = max(worst.get(size, 0.0), seconds or 0.0)
+    finally:
+        worker.kill()
+        worker.join()
+        receiver.close()
+
+def check_rule_cost(pattern, sizes=COST_SIZES, max_exponent=MAX_GROWTH_EXPONENT,
+                    max_seconds=MAX_SEARCH_SECONDS):
+    """
+    Checks whether a rule stays cheap on long, adversarial entries.
+
+    The pattern is timed on near-miss inputs of increasing length; the
+    slope of log(time) over log(length) estimates its growth (1 = linear,
+    2 = quadratic). Measurement stops early once a search exceeds
+    `max_seconds`. The searches run in a child process that is killed
+    when one of them runs past SEARCH_KILL_SECONDS, so a pathological
+    rule that slips past has_nested_quantifier() fails the check instead
+    of hanging it.
+
+    Args:
+        pattern (str): Regex source.
+        sizes (Iterable[int]): Input lengths, ascending.
+        max_exponent (float): Highest acceptable growth exponent.
+        max_seconds (float): Slowest acceptable single search.
+
+    Returns:
+        dict: pattern, ok, reason (None when ok), exponent and the slowest
+        (size, seconds) measured.
+    """
+    result = {"pattern": pattern, "ok": True, "reason": None, "exponent": None, "worst": None}
+    try:
+        regex = re.compile(pattern)
+    except re.error as e:
+        return dict(result, ok=False, reason=f"invalid regex: {e}")
+
+    if has_nested_quantifier(pattern):
+        return dict(result, ok=False, reason="nested quantifier or ambiguous alternation (exponential backtracking)")
+
+    # Worst input shape per size
+    timings, stalled = _run_measurement(regex.pattern, sizes, max_seconds)
+    if stalled is not None:
+        return dict(result, ok=False, worst=(stalled, math.inf),
+                    reason=f"search still running after {SEARCH_KILL_SECONDS * 1000:.0f} ms on a {stalled}-char input")
+    if not timings:
+        return dict(result, ok=False, reason="cost measurement failed")
+
+    result["worst"] = max(timings, key=lambda t: t[1])
+    if len(timings) >= 2:
+        (n0, t0), (n1, t1) = timings[0], timings[-1]
+        result["exponent"] = math.log(max(t1, 1e-9) / max(t0, 1e-9)) / math.log(n1 / n0)
+
+    if result["worst"][1] > max_seconds:
+        size, seconds = result["worst"]
+        return dict(result, ok=False, reason=f"{seconds * 1000:.1f} ms on a {size}-char input")
+    if result["exponent"] is not None and result["exponent"] > max_exponent \
+            and timings[-1][1] >= MIN_SIGNIFICANT_SECONDS:
+        return dict(result, ok=False, reason=f"super-linear growth (exponent {result['exponent']:.2f})")
+    return result
+
+def check_rules(rules, **kwargs):
+    """
+    Runs check_rule_cost() over a rules dict.
+
+    Args:
+        rules (dict): Label-pattern pairs as loaded from rules.yml.
+        **kwargs: Passed to check_rule_cost().
+
+    Returns:
+        dict: label → check result.
+    """
+    return {label: check_rule_cost(pattern, **kwargs) for label, pattern in rules.items()}
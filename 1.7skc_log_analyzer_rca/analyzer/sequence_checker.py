@@ -1,7 +1,10 @@
 # Check for expected log event sequences
 # analyzer/sequence_checker.py
 
+from analyzer.keyword_scanner import KeywordScanner
+
 # Define the expected order of critical steps in a process log
+# (default when no list is loaded from config/markers.yml)
 EXPECTED_SEQUENCE = [
     "Initialize",
     "Load Config",
@@ -10,29 +13,51 @@ EXPECTED_SEQUENCE = [
     "Complete"
 ]
 
-def check_sequence(log_lines):
+def check_sequence(log_lines, expected=None, scan=None):
     """
     Checks whether expected log steps occur in the defined sequence.
 
-    It evaluates if each required checkpoint appears in the logs.
+    It evaluates if each required checkpoint appears in the logs and
+    whether the steps first appear in the expected order.
     This helps identify:
     - Incomplete flows (missing steps)
-    - Abnormal startup sequences
+    - Abnormal startup sequences (steps out of order)
+    - Slow phases (time between consecutive steps)
 
     Args:
         log_lines (List[str]): Cleaned and parsed log lines
+        expected (List[str], optional): Ordered steps (defaults to EXPECTED_SEQUENCE).
+        scan (dict, optional): Precomputed scan_markers() result covering the
+            steps; avoids rescanning the log.
 
     Returns:
-        dict: Summary of observed steps, missing steps, and pass/fail status
+        dict: Summary of observed steps, missing steps, ordering, step
+        latencies (seconds, when timestamps are available) and pass/fail status
     """
+    expected = expected or EXPECTED_SEQUENCE
+    if scan is None:
+        scan = KeywordScanner(expected).scan(log_lines)
+
     # Collect which expected steps are observed in the actual log lines
-    observed = [step for step in EXPECTED_SEQUENCE if any(step in line for line in log_lines)]
+    observed = [step for step in expected if step in scan]
 
     # Determine which expected steps were not found
-    missing = [step for step in EXPECTED_SEQUENCE if step not in observed]
+    missing = [step for step in expected if step not in scan]
+
+    # A step is out of order if it first appears before the step preceding it
+    out_of_order = []
+    latencies = {}
+    for prev, step in zip(observed, observed[1:]):
+        if scan[step]["first_line"] < scan[prev]["first_line"]:
+            out_of_order.append(step)
+        start, end = scan[prev]["first_time"], scan[step]["first_time"]
+        if start is not None and end is not None:
+            latencies[f"{prev} -> {step}"] = end - start
 
     return {
         "observed": observed,
         "missing": missing,
-        "status": "PASS" if not missing else "FAIL"
+        "out_of_order": out_of_order,
+        "latencies": latencies,
+        "status": "PASS" if not missing and not out_of_order else "FAIL"
     }
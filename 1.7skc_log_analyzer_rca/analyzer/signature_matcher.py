@@ -2,8 +2,14 @@
 # analyzer/signature_matcher.py
 
 import re
+from functools import lru_cache
+
 import yaml
 
+# Numbered backreference (\1) or group conditional ((?(1)...)) outside an
+# escaped backslash; group numbers shift once rules are joined
+NUMBERED_GROUP_REF = re.compile(r"(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(\d+\))")
+
 def load_signature_rules(yaml_path="config/rules.yml"):
     """
     Loads signature matching rules from a YAML file.
@@ -23,6 +29,143 @@ def load_signature_rules(yaml_path="config/rules.yml"):
         return yaml.safe_load(f)
 
 
+class SignatureRuleSet:
+    """
+    Compiled, reusable form of the rules in rules.yml.
+
+    Every rule is compiled once. All rules are additionally OR-ed into a
+    single combined pattern, so the common case (a line matching no rule)
+    costs one regex scan instead of one scan per rule. Only lines that hit
+    the combined pattern are re-checked rule by rule to collect every label.
+
+    Rules with numbered backreferences would refer to another rule's group
+    once joined, so they are left out of the combined pattern and checked
+    on every line.
+
+    The same object serves the signature matcher, the text parser and the
+    unmatched collector, so a log only needs to be scanned once.
+    """
+
+    def __init__(self, rules):
+        """
+        Args:
+            rules (dict): Label-pattern pairs as loaded from rules.yml.
+        """
+        self.rules = dict(rules or {})
+        self.compiled = [(label, re.compile(pattern)) for label, pattern in self.rules.items()]
+
+        joinable = [pattern for pattern in self.rules.values() if not NUMBERED_GROUP_REF.search(pattern)]
+        self.standalone = [
+            (label, regex) for label, regex in self.compiled if NUMBERED_GROUP_REF.search(regex.pattern)
+        ]
+
+        # Non-capturing groups keep each rule's alternation self-contained
+        try:
+            self.combined = re.compile(
+                "|".join(f"(?:{pattern})" for pattern in joinable)
+            ) if joinable else None
+        except re.error:
+            # e.g. a rule carrying inline global flags; fall back to per-rule checks
+            self.combined = None
+        if self.combined is None:
+            self.standalone = self.compiled
+
+    @classmethod
+    def from_yaml(cls, yaml_path="config/rules.yml"):
+        """
+        Builds a rule set directly from a rules YAML file.
+
+        Args:
+            yaml_path (str): Path to the rules YAML file.
+
+        Returns:
+            SignatureRuleSet: Compiled rule set.
+        """
+        return cls(load_signature_rules(yaml_path))
+
+    def match_line(self, line):
+        """
+        Returns every rule label matching a single line.
+
+        Args:
+            line (str): A log line.
+
+        Returns:
+            List[str]: Matching labels in rules.yml order (empty if none).
+        """
+        compiled = self.compiled if self.combined is None or self.combined.search(line) else self.standalone
+        return [label for label, regex in compiled if regex.search(line)]
+
+    def iter_matches(self, log_lines):
+        """
+        Scans lines once, yielding the labels found on each.
+
+        Args:
+            log_lines (Iterable[str]): Log lines to scan.
+
+        Yields:
+            Tuple[int, str, List[str]]: 1-based line number, raw line, matching labels.
+        """
+        for idx, line in enumerate(log_lines):
+            yield idx + 1, line, self.match_line(line)
+
+    def scan(self, log_lines):
+        """
+        Single pass returning both signature matches and unmatched lines.
+
+        This is the scan shared by match_signatures(), parse_text_log() and
+        collect_unmatched_lines(); pass its result to the latter two via
+        `scan` to read a log once for all three.
+
+        Args:
+            log_lines (Iterable[str]): Cleaned and optionally redacted log lines.
+
+        Returns:
+            Tuple[List[dict], List[str]]:
+                - matches in the match_signatures() format
+                - stripped lines that matched no rule
+        """
+        matched = []
+        unmatched = []
+
+        for line_no, line, labels in self.iter_matches(log_lines):
+            if not labels:
+                unmatched.append(line.strip())
+                continue
+            content = line.strip()
+            for label in labels:
+                matched.append({
+                    "line": line_no,
+                    "pattern": label,
+                    "content": content
+                })
+
+        return matched, unmatched
+
+
+@lru_cache(maxsize=32)
+def _compile_rule_items(rule_items):
+    return SignatureRuleSet(dict(rule_items))
+
+
+def compile_rules(rules):
+    """
+    Returns a compiled SignatureRuleSet for a rules dict.
+
+    Rule sets are cached by content, so callers that keep passing the same
+    plain dict do not pay for recompilation on every call.
+
+    Args:
+        rules (dict or SignatureRuleSet): Rules as loaded from rules.yml.
+
+    Returns:
+        SignatureRuleSet: Compiled rule set.
+    """
+    if isinstance(rules, SignatureRuleSet):
+        return rules
+    return _compile_rule_items(tuple((rules or {}).items()))
+
+
 def match_signatures(log_lines, rules):
     """
     Matches log lines against known signature patterns.
@@ -32,20 +175,19 @@ def match_signatures(log_lines, rules):
 
     Args:
         log_lines (List[str]): Cleaned and optionally redacted log lines.
-        rules (dict): Signature rules with pattern labels as keys.
+        rules (dict or SignatureRuleSet): Signature rules with pattern labels as keys.
 
     Returns:
         List[dict]: List of matches with pattern label and line metadata.
     """
     matched = []
 
-    for idx, line in enumerate(log_lines):
-        for label, pattern in rules.items():
-            if re.search(pattern, line):
-                matched.append({
-                    "line": idx + 1,           # 1-based line number
-                    "pattern": label,          # Matched pattern name from rules.yml
-                    "content": line.strip()    # Trimmed log line
-                })
+    for line_no, line, labels in compile_rules(rules).iter_matches(log_lines):
+        for label in labels:
+            matched.append({
+                "line": line_no,           # 1-based line number
+                "pattern": label,          # Matched pattern name from rules.yml
+                "content": line.strip()    # Trimmed log line
+            })
 
     return matched
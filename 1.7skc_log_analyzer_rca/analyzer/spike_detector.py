@@ -1,10 +1,32 @@
 # Frequency-based anomaly detection
 # analyzer/spike_detector.py
 
-from collections import defaultdict
 from datetime import datetime
 import re
 
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from utils.timestamp_utils import days_from_civil
+
+# Match ISO-style timestamp (e.g., 2025-07-27 13:45:01)
+TIMESTAMP_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}", re.ASCII)
+
+# Bucket widths in seconds and the label format used for each
+RESOLUTIONS = {
+    "second": (1, 19),   # YYYY-MM-DD HH:MM:SS
+    "minute": (60, 16),  # YYYY-MM-DD HH:MM
+    "hour": (3600, 13),  # YYYY-MM-DD HH
+}
+
+# Above this many buckets between first and last event, counting switches
+# from a dense bincount to np.unique to avoid allocating empty buckets
+MAX_DENSE_BUCKETS = 10_000_000
+
+# Buckets scored per block by the "mad" baseline; each block materializes
+# block × window floats, so memory stays flat however long the series is
+MAD_BLOCK_BUCKETS = 65_536
+
 def parse_time(line):
     """
     Extracts a timestamp from a log line and converts it to a datetime object.
@@ -20,8 +42,7 @@ def parse_time(line):
         datetime or None: Parsed datetime object or None if parsing fails.
     """
     try:
-        # Match ISO-style timestamp (e.g., 2025-07-27 13:45:01)
-        ts_match = re.search(r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}", line)
+        ts_match = TIMESTAMP_PATTERN.search(line)
         if ts_match:
             # Convert to ISO format (replace space with 'T') and parse
             return datetime.fromisoformat(ts_match.group().replace(" ", "T"))
@@ -29,29 +50,311 @@ def parse_time(line):
     except Exception:
         return None
 
-def detect_spike(log_lines, threshold_per_min=10):
+def timestamps_to_epochs(timestamps):
+    """
+    Converts "YYYY-MM-DD HH:MM:SS" strings to epoch seconds in bulk.
+
+    Digits are decoded from one contiguous byte buffer with integer
+    arithmetic. Invalid calendar values (e.g. month 13) are dropped,
+    mirroring the datetime parse failures in parse_time().
+
+    Args:
+        timestamps (List[str]): 19-character timestamps ('T' or space separated).
+
+    Returns:
+        np.ndarray: int64 epoch seconds (naive timestamps treated as UTC).
+    """
+    if not timestamps:
+        return np.empty(0, dtype=np.int64)
+
+    raw = np.frombuffer("".join(timestamps).encode("ascii"), dtype=np.uint8)
+    digits = raw.reshape(-1, 19).astype(np.int64) - 48
+
+    def field(start, width):
+        value = digits[:, start]
+        for offset in range(1, width):
+            value = value * 10 + digits[:, start + offset]
+        return value
+
+    year, month, day = field(0, 4), field(5, 2), field(8, 2)
+    hour, minute, second = field(11, 2), field(14, 2), field(17, 2)
+
+    leap = ((year % 4 == 0) & (year % 100 != 0)) | (year % 400 == 0)
+    month_days = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+    valid = (month >= 1) & (month <= 12) & (year >= 1)
+    max_day = month_days[np.clip(month, 0, 12)] + (leap & (month == 2))
+    valid &= (day >= 1) & (day <= max_day) & (hour < 24) & (minute < 60) & (second < 60)
+
+    days = days_from_civil(year[valid], month[valid], day[valid])
+    return days * 86400 + hour[valid] * 3600 + minute[valid] * 60 + second[valid]
+
+def extract_epochs(log_lines, parser=None):
+    """
+    Extracts the first timestamp of every line as epoch seconds.
+
+    Without a parser, ISO timestamps are located by regex and decoded in
+    one NumPy batch. A TimestampParser handles any format it supports
+    (MSI, EVTX SystemTime, ISO with UTC offsets).
+
+    Args:
+        log_lines (Iterable[str]): Log lines (with timestamps).
+        parser (TimestampParser, optional): Sniffing parser for the source.
+
+    Returns:
+        np.ndarray: int64 epoch seconds, one per line with a valid timestamp.
+    """
+    if parser is not None:
+        return np.fromiter(parser.parse_many(log_lines), dtype=np.int64)
+    search = TIMESTAMP_PATTERN.search
+    return timestamps_to_epochs([m.group() for m in map(search, log_lines) if m])
+
+def bucket_counts(epochs, resolution="minute"):
+    """
+    Counts events per time bucket.
+
+    Args:
+        epochs (np.ndarray): int64 epoch seconds.
+        resolution (str): "second", "minute" or "hour".
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Sorted bucket start epochs and their
+        counts; only non-empty buckets are returned.
+    """
+    width = RESOLUTIONS[resolution][0]
+    if len(epochs) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    buckets = np.asarray(epochs, dtype=np.int64) // width
+    low = buckets.min()
+    span = int(buckets.max() - low) + 1
+
+    if span <= MAX_DENSE_BUCKETS:
+        counts = np.bincount(buckets - low, minlength=span)
+        present = np.flatnonzero(counts)
+        return (present + low) * width, counts[present]
+
+    starts, counts = np.unique(buckets, return_counts=True)
+    return starts * width, counts
+
+def format_buckets(starts, resolution="minute"):
+    """
+    Renders bucket start epochs as labels, e.g. "2025-07-27 13:45".
+
+    Args:
+        starts (np.ndarray): Bucket start epochs.
+        resolution (str): Resolution used to build the buckets.
+
+    Returns:
+        List[str]: One label per bucket.
+    """
+    width = RESOLUTIONS[resolution][1]
+    labels = np.datetime_as_string(np.asarray(starts, dtype="datetime64[s]"), unit="s")
+    return [label[:width].replace("T", " ") for label in labels]
+
+def _dense_series(epochs, resolution):
+    # Every bucket between first and last event, including empty ones
+    width = RESOLUTIONS[resolution][0]
+    buckets = np.asarray(epochs, dtype=np.int64) // width
+    low = buckets.min()
+    span = int(buckets.max() - low) + 1
+    if span > MAX_DENSE_BUCKETS:
+        raise ValueError(
+            f"{span} {resolution} buckets exceed MAX_DENSE_BUCKETS; use a coarser resolution"
+        )
+    counts = np.bincount(buckets - low, minlength=span)
+    return (np.arange(span, dtype=np.int64) + low) * width, counts
+
+def _rolling_mad(history, window, block=MAD_BLOCK_BUCKETS):
+    # Rolling median and scaled MAD over every `window`-long slice of
+    # history, computed `block` windows at a time
+    count = len(history) - window + 1
+    center = np.empty(count)
+    spread = np.empty(count)
+    for lo in range(0, count, block):
+        hi = min(lo + block, count)
+        windows = sliding_window_view(history[lo:hi + window - 1], window)
+        center[lo:hi] = np.median(windows, axis=1)
+        spread[lo:hi] = np.median(np.abs(windows - center[lo:hi, None]), axis=1)
+    return center, 1.4826 * spread
+
+def detect_spike(log_lines, threshold_per_min=10, resolution="minute", epochs=None):
     """
     Detects time-based spikes in log event frequency.
 
-    Aggregates events by minute and flags any time window with
-    more than `threshold_per_min` entries.
+    Aggregates events by time bucket (minute by default) and flags any
+    bucket with more than `threshold_per_min` entries.
+
+    Args:
+        log_lines (List[str]): List of log lines (with timestamps).
+        threshold_per_min (int): Threshold count of events per bucket to flag a spike.
+        resolution (str): "second", "minute" or "hour".
+        epochs (np.ndarray, optional): Pre-extracted epoch seconds; skips line parsing.
+
+    Returns:
+        dict: Time buckets (YYYY-MM-DD HH:MM for minutes) that exceed the threshold.
+    """
+    if epochs is None:
+        epochs = extract_epochs(log_lines)
+
+    starts, counts = bucket_counts(epochs, resolution)
+    flagged = counts > threshold_per_min
+
+    labels = format_buckets(starts[flagged], resolution)
+    return dict(zip(labels, counts[flagged].tolist()))
+
+def detect_spike_baseline(log_lines, resolution="minute", window=30, threshold=3.5,
+                          method="mad", min_count=1, epochs=None):
+    """
+    Flags buckets that stand out against a rolling baseline of preceding buckets.
+
+    Instead of a fixed threshold, each bucket is compared with the
+    `window` buckets before it (empty buckets count as zero):
+    - "mad": robust z-score from the rolling median and median absolute
+      deviation, computed in blocks of MAD_BLOCK_BUCKETS buckets
+    - "zscore": classic z-score from the rolling mean and standard deviation
 
     Args:
         log_lines (List[str]): List of log lines (with timestamps).
-        threshold_per_min (int): Threshold count of events per minute to flag a spike.
+        resolution (str): "second", "minute" or "hour".
+        window (int): Number of preceding buckets forming the baseline.
+        threshold (float): Score above which a bucket is flagged.
+        method (str): "mad" or "zscore".
+        min_count (int): Buckets with fewer events are never flagged.
+        epochs (np.ndarray, optional): Pre-extracted epoch seconds; skips line parsing.
 
     Returns:
-        dict: Time buckets (YYYY-MM-DD HH:MM) that exceed the threshold.
+        dict: Flagged time buckets mapped to their event counts.
+    """
+    if epochs is None:
+        epochs = extract_epochs(log_lines)
+    if len(epochs) == 0:
+        return {}
+
+    starts, counts = _dense_series(epochs, resolution)
+    values = counts.astype(np.float64)
+
+    # Seed the first window with the opening buckets' median so early spikes still score
+    seed = np.full(window, np.median(values[:window]))
+    history = np.concatenate([seed, values])[:-1]
+
+    if method == "mad":
+        center, spread = _rolling_mad(history, window)
+    elif method == "zscore":
+        sums = np.concatenate([[0.0], np.cumsum(history)])
+        squares = np.concatenate([[0.0], np.cumsum(history * history)])
+        center = (sums[window:] - sums[:-window]) / window
+        variance = (squares[window:] - squares[:-window]) / window - center * center
+        spread = np.sqrt(np.maximum(variance, 0.0))
+    else:
+        raise ValueError(f"Unknown baseline method: {method}")
+
+    # A flat baseline has zero spread; treat one event as the smallest deviation
+    scores = (values - center) / np.maximum(spread, 1.0)
+    flagged = (scores > threshold) & (counts >= min_count)
+
+    labels = format_buckets(starts[flagged], resolution)
+    return dict(zip(labels, counts[flagged].tolist()))
+
+class SpikeAccumulator:
+    """
+    Incremental bucket counts for streaming input.
+
+    Timestamps are buffered as strings and converted in NumPy batches of
+    `batch_size`, then folded into a dict of bucket start → count. Memory
+    is bounded by the batch plus the number of distinct buckets, not the
+    number of events.
+
+    With a TimestampParser, lines are parsed by it instead (any supported
+    format) and epoch seconds are buffered. Callers that already parsed a
+    line can pass its epoch to add_epoch() instead of add_line().
     """
-    time_buckets = defaultdict(int)
 
-    for line in log_lines:
-        ts = parse_time(line)
-        if ts:
-            # Bucket by minute: "2025-07-27 13:45"
-            bucket = ts.strftime("%Y-%m-%d %H:%M")
-            time_buckets[bucket] += 1
+    def __init__(self, resolution="minute", batch_size=100_000, parser=None):
+        self.resolution = resolution
+        self.batch_size = batch_size
+        self.parser = parser
+        self.counts = {}
+        self._pending = []
+
+    def add_line(self, line):
+        """
+        Buffers the first timestamp of a line, if any.
+
+        Args:
+            line (str): Log line or merged entry.
+        """
+        if self.parser is not None:
+            found = self.parser.parse(line)
+        else:
+            match = TIMESTAMP_PATTERN.search(line)
+            found = match.group() if match else None
+        if found is not None:
+            self._pending.append(found)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def add_epoch(self, epoch):
+        """
+        Buffers a timestamp already converted to epoch seconds.
+
+        Only valid with a parser (the buffer then holds epoch seconds).
+
+        Args:
+            epoch (int or None): Epoch seconds of a line, or None.
+        """
+        if epoch is not None:
+            self._pending.append(epoch)
+            if len(self._pending) >= self.batch_size:
+                self.flush()
+
+    def add_epochs(self, epochs):
+        """
+        Folds pre-extracted epoch seconds into the counts.
+
+        Args:
+            epochs (np.ndarray): int64 epoch seconds.
+        """
+        starts, counts = bucket_counts(epochs, self.resolution)
+        for start, count in zip(starts.tolist(), counts.tolist()):
+            self.counts[start] = self.counts.get(start, 0) + count
+
+    def flush(self):
+        """Converts buffered timestamps and merges them into the counts."""
+        if self._pending:
+            if self.parser is not None:
+                self.add_epochs(np.array(self._pending, dtype=np.int64))
+            else:
+                self.add_epochs(timestamps_to_epochs(self._pending))
+            self._pending = []
+
+    def state(self):
+        """Returns the bucket counts as a JSON-serializable dict."""
+        self.flush()
+        return {"resolution": self.resolution, "counts": sorted(self.counts.items())}
+
+    def restore(self, state):
+        """
+        Reloads counts saved by state(), e.g. when resuming a followed log.
+
+        Args:
+            state (dict): Output of state() for the same resolution.
+        """
+        if state["resolution"] != self.resolution:
+            raise ValueError(f"Saved resolution {state['resolution']!r} does not match {self.resolution!r}")
+        self.counts = {int(start): count for start, count in state["counts"]}
+        self._pending = []
+
+    def spikes(self, threshold=10):
+        """
+        Returns buckets above a static threshold in the detect_spike() shape.
+
+        Args:
+            threshold (int): Events per bucket above which a bucket is flagged.
 
-    # Filter buckets that exceed the spike threshold
-    spikes = {k: v for k, v in time_buckets.items() if v > threshold_per_min}
-    return spikes
+        Returns:
+            dict: Bucket label → count for flagged buckets, in time order.
+        """
+        self.flush()
+        flagged = sorted(start for start, count in self.counts.items() if count > threshold)
+        labels = format_buckets(np.array(flagged, dtype=np.int64), self.resolution)
+        return {label: self.counts[start] for label, start in zip(labels, flagged)}
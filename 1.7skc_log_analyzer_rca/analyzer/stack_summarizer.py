@@ -1,6 +1,124 @@
 # analyzer/stack_summarizer.py
+#
+# Stack traces are fingerprinted by their normalized exception type and top
+# frames. During an exception storm the same few fingerprints repeat, so a
+# bounded LRU of per-fingerprint groups turns them into a handful of counted
+# entries, each summarized once.
 
+import hashlib
+import heapq
 import re
+from collections import OrderedDict
+
+# Frames hashed into a fingerprint
+TOP_FRAMES = 5
+
+# Fingerprint groups kept; least recently seen groups are evicted first
+MAX_FINGERPRINTS = 10_000
+
+# Characters of the first occurrence kept as exemplar
+MAX_EXEMPLAR_CHARS = 4_000
+
+# Stack frame lines: Java/.NET "at ...", Python 'File "..."'
+FRAME_PREFIXES = ("at ", 'File "')
+
+# Qualified exception type on the summary line, e.g. java.io.IOException
+EXCEPTION_TYPE_PATTERN = re.compile(r"\b[A-Za-z_][\w.$]*(?:Exception|Error)\b")
+
+# Values that vary between occurrences of the same frame
+FRAME_MASKS = [
+    (re.compile(r":\d+\)"), ":<N>)"),                # Java/.NET line numbers
+    (re.compile(r"\bline \d+"), "line <N>"),         # Python line numbers
+    (re.compile(r"0x[0-9a-fA-F]+"), "<HEX>"),        # Addresses
+    (re.compile(r"\$\$?Lambda\$[\w$/]*"), "$Lambda"), # Generated lambda classes
+]
+
+def _iter_lines(entry):
+    # Lines of an entry, produced lazily so scans can stop early
+    start = 0
+    find = entry.find
+    while True:
+        end = find("\n", start)
+        if end == -1:
+            yield entry[start:]
+            return
+        yield entry[start:end]
+        start = end + 1
+
+def _scan(entry, depth):
+    """
+    Finds the summary line and up to `depth` frames, stopping once both are found.
+
+    Returns:
+        Tuple[str or None, List[str]]: Summary line and stripped frame lines.
+    """
+    summary = None
+    frames = []
+    for line in _iter_lines(entry):
+        if summary is None and ("Exception" in line or "Error" in line):
+            summary = line.strip()
+        if len(frames) < depth:
+            stripped = line.strip()
+            if stripped.startswith(FRAME_PREFIXES):
+                frames.append(stripped)
+        if summary is not None and len(frames) >= depth:
+            break
+    return summary, frames
+
+def normalize_frame(frame):
+    """
+    Masks line numbers, addresses and generated names in a stack frame.
+
+    Args:
+        frame (str): Stripped frame line.
+
+    Returns:
+        str: Frame that is stable across occurrences and rebuilds.
+    """
+    for pattern, token in FRAME_MASKS:
+        frame = pattern.sub(token, frame)
+    return frame
+
+def exception_type(summary):
+    """
+    Extracts the exception type from a summary line.
+
+    Args:
+        summary (str or None): Line naming the exception.
+
+    Returns:
+        str: Qualified type (e.g. "java.io.IOException"), or "Unknown Exception".
+    """
+    match = EXCEPTION_TYPE_PATTERN.search(summary) if summary else None
+    return match.group() if match else "Unknown Exception"
+
+def _fingerprint(exc_type, frames):
+    normalized = [normalize_frame(frame) for frame in frames]
+    digest = hashlib.blake2b("\n".join([exc_type] + normalized).encode("utf-8"), digest_size=8)
+    return digest.hexdigest(), normalized
+
+def stack_fingerprint(entry, depth=TOP_FRAMES):
+    """
+    Fingerprints a stack trace by exception type and normalized top frames.
+
+    Only as much of the entry is read as needed to find the summary line
+    and `depth` frames.
+
+    Args:
+        entry (str): Merged multi-line log entry.
+        depth (int): Frames included in the fingerprint.
+
+    Returns:
+        Tuple[str, str, List[str], str or None] or None: Fingerprint (hex),
+        exception type, normalized frames and summary line; None if the
+        entry has neither an exception line nor frames.
+    """
+    summary, frames = _scan(entry, depth)
+    if summary is None and not frames:
+        return None
+    exc_type = exception_type(summary)
+    fingerprint, normalized = _fingerprint(exc_type, frames)
+    return fingerprint, exc_type, normalized, summary
 
 def summarize_stack_trace(entry):
     """
@@ -8,7 +126,9 @@ def summarize_stack_trace(entry):
 
     This function is designed to help with RCA (root cause analysis) by:
     - Identifying the first 'Exception' or 'Error' line as the summary
-    - Extracting the topmost stack frame (first line starting with 'at ')
+    - Extracting the topmost stack frame (first "at ..." or Python 'File "..."' line)
+
+    Scanning stops as soon as both are found.
 
     Args:
         entry (str): A multi-line log string (e.g., a merged stack trace)
@@ -18,19 +138,150 @@ def summarize_stack_trace(entry):
             - 'summary': The first matching exception/error line
             - 'top_frame': The first stack frame line, if present
     """
-    lines = entry.split("\n")
-    summary = None
-
-    # Look for the first line that mentions an Exception or Error
-    for line in lines:
-        if "Exception" in line or "Error" in line:
-            summary = line.strip()
-            break
-
-    # Extract lines that look like stack frames (e.g., "at com.foo.Bar.method...")
-    top_frames = [line.strip() for line in lines if line.strip().startswith("at ")]
+    summary, frames = _scan(entry, 1)
 
     return {
         "summary": summary or "Unknown Exception",              # Fallback if no match
-        "top_frame": top_frames[0] if top_frames else "No frame detected"
+        "top_frame": frames[0] if frames else "No frame detected"
     }
+
+class StackTraceGrouper:
+    """
+    Groups stack traces by fingerprint with a bounded LRU of summaries.
+
+    Each group is summarized once, from its first occurrence, and then only
+    counted. Raw frames are mapped to their fingerprint through a bounded
+    dict, so exact repeats skip frame normalization and hashing. When more
+    than `capacity` fingerprints are live, the least recently seen group is
+    dropped (and tallied in `evicted`).
+
+    Args:
+        capacity (int): Maximum groups kept.
+        depth (int): Frames included in each fingerprint.
+    """
+
+    def __init__(self, capacity=MAX_FINGERPRINTS, depth=TOP_FRAMES):
+        self.capacity = capacity
+        self.depth = depth
+        self.groups = OrderedDict()
+        self.evicted = 0
+        self.evicted_occurrences = 0
+        self.total = 0
+        self._fingerprints = {}   # (type, raw frames) -> (fingerprint, normalized frames)
+
+    def add(self, entry, line_no=None, timestamp=None):
+        """
+        Counts one stack trace.
+
+        Args:
+            entry (str): Merged multi-line log entry.
+            line_no (int, optional): Line the entry starts on.
+            timestamp (optional): When the entry occurred (e.g. epoch seconds).
+
+        Returns:
+            dict or None: The entry's group, or None if it is not a stack trace.
+        """
+        summary, raw_frames = _scan(entry, self.depth)
+        if summary is None and not raw_frames:
+            return None
+        exc_type = exception_type(summary)
+        key = (exc_type, tuple(raw_frames))
+        known = self._fingerprints.get(key)
+        if known is None:
+            if len(self._fingerprints) >= self.capacity:
+                self._fingerprints.clear()
+            known = self._fingerprints[key] = _fingerprint(exc_type, raw_frames)
+        fingerprint, frames = known
+        self.total += 1
+
+        group = self.groups.get(fingerprint)
+        if group is not None:
+            group["count"] += 1
+            group["last_line"] = line_no
+            if group["exemplar"] is None:
+                # Dropped from a checkpoint (see state()); refill from this occurrence
+                group["exemplar"] = entry[:MAX_EXEMPLAR_CHARS]
+            if timestamp is not None:
+                group["last_seen"] = timestamp
+                if group["first_seen"] is None:
+                    group["first_seen"] = timestamp
+            self.groups.move_to_end(fingerprint)
+            return group
+
+        group = {
+            "fingerprint": fingerprint,
+            "exception": exc_type,
+            "summary": summary or "Unknown Exception",
+            "top_frame": frames[0] if frames else "No frame detected",
+            "frames": frames,
+            "count": 1,
+            "first_line": line_no,
+            "last_line": line_no,
+            "first_seen": timestamp,
+            "last_seen": timestamp,
+            "exemplar": entry[:MAX_EXEMPLAR_CHARS],
+        }
+        self.groups[fingerprint] = group
+        if len(self.groups) > self.capacity:
+            _, dropped = self.groups.popitem(last=False)
+            self.evicted += 1
+            self.evicted_occurrences += dropped["count"]
+        return group
+
+    def report(self, top=None):
+        """
+        Returns groups by occurrence count, most frequent first.
+
+        Args:
+            top (int, optional): Limit to the `top` largest groups.
+
+        Returns:
+            List[dict]: fingerprint, exception, summary, top_frame, frames,
+            count, first/last line, first/last seen and exemplar.
+        """
+        ranked = sorted(self.groups.values(), key=lambda group: group["count"], reverse=True)
+        return ranked[:top] if top else ranked
+
+    def state(self, max_groups=None, exemplars=None):
+        """
+        Returns the groups and counters as a JSON-serializable dict.
+
+        Args:
+            max_groups (int, optional): Save only the most recently seen
+                groups; the rest are tallied as evicted.
+            exemplars (int, optional): Save exemplars only for this many of
+                the largest groups; the others are refilled on their next
+                occurrence after restore().
+
+        Returns:
+            dict: "groups", "evicted", "evicted_occurrences" and "total".
+        """
+        groups = list(self.groups.values())
+        evicted, evicted_occurrences = self.evicted, self.evicted_occurrences
+        if max_groups is not None and len(groups) > max_groups:
+            dropped = groups[:len(groups) - max_groups]
+            groups = groups[len(dropped):]
+            evicted += len(dropped)
+            evicted_occurrences += sum(group["count"] for group in dropped)
+        if exemplars is not None and len(groups) > exemplars:
+            largest = heapq.nlargest(exemplars, groups, key=lambda group: group["count"])
+            keep = {group["fingerprint"] for group in largest}
+            groups = [group if group["fingerprint"] in keep else dict(group, exemplar=None) for group in groups]
+        return {
+            "groups": groups,
+            "evicted": evicted,
+            "evicted_occurrences": evicted_occurrences,
+            "total": self.total,
+        }
+
+    def restore(self, state):
+        """
+        Reloads groups saved by state().
+
+        Args:
+            state (dict): Output of state().
+        """
+        self.groups = OrderedDict((group["fingerprint"], group) for group in state["groups"])
+        self.evicted = state["evicted"]
+        self.evicted_occurrences = state["evicted_occurrences"]
+        self.total = state["total"]
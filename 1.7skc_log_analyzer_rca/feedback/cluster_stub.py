@@ -1,13 +1,262 @@
 # feedback/cluster_stub.py
+#
+# Online log-template mining for unmatched lines (Drain, via drain3).
+# Each line walks a fixed-depth prefix tree keyed on token count and leading
+# tokens, so cost per line does not grow with the number of lines seen.
 
-def suggest_new_patterns(unmatched_lines):
+import os
+import re
+import zlib
+
+import jsonpickle
+from drain3.drain import Drain
+
+# Clusters kept in memory; least recently used (i.e. rare) ones are evicted
+MAX_CLUSTERS = 5_000
+
+# Drain parameters: prefix tree depth, similarity threshold, fan-out per node
+DRAIN_DEPTH = 4
+SIM_THRESHOLD = 0.4
+MAX_CHILDREN = 100
+
+# Masked lines remembered with their cluster; repeats skip the tree search
+MATCH_CACHE_SIZE = 100_000
+
+PARAM_TOKEN = "<*>"
+
+# Dynamic values replaced before tokenizing: (name, pattern). The pattern
+# text is reused in generated rules, so it must stay valid in rules.yml.
+TEMPLATE_MASKS = [
+    ("TS", r"\d{4}[-/]\d{2}[-/]\d{2}[ T]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?"),
+    ("UUID", r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"),
+    ("IP", r"\b\d{1,3}(?:\.\d{1,3}){3}\b"),
+    ("HEX", r"\b0x[0-9a-fA-F]+\b|\b[0-9a-fA-F]{16,}\b"),
+    ("NUM", r"\b\d+(?:\.\d+)?\b"),
+]
+
+COMPILED_MASKS = [(re.compile(pattern), f"<{name}>") for name, pattern in TEMPLATE_MASKS]
+
+# Regex fragments substituted for placeholders when building rules
+PLACEHOLDER_REGEX = {f"<{name}>": f"(?:{pattern})" for name, pattern in TEMPLATE_MASKS}
+PLACEHOLDER_REGEX[PARAM_TOKEN] = r"\S+"
+PLACEHOLDER_PATTERN = re.compile("|".join(re.escape(p) for p in PLACEHOLDER_REGEX))
+
+def mask_template_line(line):
+    """
+    Replaces dynamic values with placeholders such as <NUM> or <IP>.
+
+    Only the first line of a merged entry is used; stack frames below it
+    would otherwise split one event type into many templates.
+
+    Args:
+        line (str): Log line or merged entry.
+
+    Returns:
+        str: Masked first line.
+    """
+    line = line.split("\n", 1)[0]
+    for pattern, token in COMPILED_MASKS:
+        line = pattern.sub(token, line)
+    return line
+
+def template_to_regex(template):
+    """
+    Converts a mined template into a regex suitable for rules.yml.
+
+    Literal text is escaped, placeholders become the matching mask pattern
+    and runs of whitespace match any whitespace. Leading and trailing
+    placeholder-only tokens (timestamps, ids) are dropped since they carry
+    no signal for a search-based rule.
+
+    Args:
+        template (str): Template such as "<TS> Disk <NUM> failed".
+
+    Returns:
+        str or None: Regex string, or None if the template has no literal text.
+    """
+    tokens = template.split()
+    while tokens and not PLACEHOLDER_PATTERN.sub("", tokens[0]):
+        tokens.pop(0)
+    while tokens and not PLACEHOLDER_PATTERN.sub("", tokens[-1]):
+        tokens.pop()
+    if not tokens:
+        return None
+
+    parts = []
+    for token in tokens:
+        pieces = []
+        pos = 0
+        for match in PLACEHOLDER_PATTERN.finditer(token):
+            pieces.append(re.escape(token[pos:match.start()]))
+            pieces.append(PLACEHOLDER_REGEX[match.group()])
+            pos = match.end()
+        pieces.append(re.escape(token[pos:]))
+        parts.append("".join(pieces))
+    return r"\s+".join(parts)
+
+def _rule_label(template, cluster_id):
+    words = re.findall(r"[A-Za-z]{3,}", PLACEHOLDER_PATTERN.sub(" ", template))
+    return "mined_" + "_".join(w.lower() for w in words[:3] + [str(cluster_id)])
+
+class TemplateMiner:
+    """
+    Streaming Drain template miner with bounded memory and persisted state.
+
+    Memory is capped at `max_clusters` clusters (LRU eviction drops rare
+    templates first) plus a bounded cache of recently seen masked lines.
+    State is saved only on demand, not on every cluster change.
+
+    Args:
+        state_path (str, optional): Snapshot file loaded now and written by save().
+        max_clusters (int): Cluster cap.
+        depth (int): Drain prefix tree depth.
+        sim_th (float): Similarity needed to join an existing cluster.
+        max_children (int): Max children per internal tree node.
+    """
+
+    def __init__(self, state_path=None, max_clusters=MAX_CLUSTERS, depth=DRAIN_DEPTH,
+                 sim_th=SIM_THRESHOLD, max_children=MAX_CHILDREN):
+        self.state_path = state_path
+        self.drain = Drain(
+            depth=depth,
+            sim_th=sim_th,
+            max_children=max_children,
+            max_clusters=max_clusters,
+            param_str=PARAM_TOKEN,
+        )
+        self.lines_seen = 0
+        self._match_cache = {}
+        if state_path and os.path.exists(state_path):
+            self.load(state_path)
+
+    def add(self, line):
+        """
+        Feeds one unmatched line.
+
+        Args:
+            line (str): Unmatched log line or merged entry.
+
+        Returns:
+            int: Id of the cluster the line joined.
+        """
+        self.lines_seen += 1
+        masked = mask_template_line(line)
+
+        # An identical masked line still fits the (only ever more general)
+        # template it joined, as long as that cluster hasn't been evicted
+        cluster = self._match_cache.get(masked)
+        if cluster is not None and self.drain.id_to_cluster.get(cluster.cluster_id) is cluster:
+            cluster.size += 1
+            self.drain.id_to_cluster[cluster.cluster_id]  # Refresh its LRU position
+            return cluster.cluster_id
+
+        cluster, _ = self.drain.add_log_message(masked)
+        if len(self._match_cache) >= MATCH_CACHE_SIZE:
+            self._match_cache.clear()
+        self._match_cache[masked] = cluster
+        return cluster.cluster_id
+
+    def add_lines(self, lines):
+        """
+        Feeds an iterable of unmatched lines.
+
+        Args:
+            lines (Iterable[str]): Unmatched log lines.
+
+        Returns:
+            TemplateMiner: self, for chaining.
+        """
+        add = self.add
+        for line in lines:
+            add(line)
+        return self
+
+    def candidates(self, min_count=3, top_n=None):
+        """
+        Lists mined templates as rule candidates, most frequent first.
+
+        Args:
+            min_count (int): Minimum cluster size to report.
+            top_n (int, optional): Maximum number of candidates.
+
+        Returns:
+            List[dict]: label, template, regex and occurrences per candidate.
+        """
+        clusters = sorted(
+            (c for c in self.drain.clusters if c.size >= min_count),
+            key=lambda c: c.size,
+            reverse=True,
+        )
+        suggestions = []
+        for cluster in clusters:
+            template = cluster.get_template()
+            regex = template_to_regex(template)
+            if regex is None:
+                continue
+            suggestions.append({
+                "label": _rule_label(template, cluster.cluster_id),
+                "template": template,
+                "regex": regex,
+                "occurrences": cluster.size,
+            })
+            if top_n is not None and len(suggestions) >= top_n:
+                break
+        return suggestions
+
+    def save(self, state_path=None):
+        """
+        Writes a compressed snapshot of the miner (atomically).
+
+        Args:
+            state_path (str, optional): Target file (defaults to the one given at init).
+        """
+        state_path = state_path or self.state_path
+        state = zlib.compress(jsonpickle.dumps(
+            {"drain": self.drain, "lines_seen": self.lines_seen}, keys=True
+        ).encode("utf-8"))
+        tmp_path = state_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(state)
+        os.replace(tmp_path, state_path)
+
+    def load(self, state_path):
+        """
+        Restores a snapshot written by save().
+
+        Args:
+            state_path (str): Snapshot file.
+        """
+        with open(state_path, "rb") as f:
+            state = jsonpickle.loads(zlib.decompress(f.read()).decode("utf-8"), keys=True)
+        self.drain = state["drain"]
+        self.lines_seen = state["lines_seen"]
+        self._match_cache = {}
+
+def format_rules_yaml(candidates):
+    """
+    Renders candidates as rules.yml entries for review.
+
+    Args:
+        candidates (List[dict]): Output of TemplateMiner.candidates().
+
+    Returns:
+        str: YAML lines, one commented template per rule.
+    """
+    lines = ["# === MINED CANDIDATES (review before adding) ==="]
+    for candidate in candidates:
+        lines.append(f"# {candidate['occurrences']}x: {candidate['template']}")
+        # Single-quoted YAML scalars keep backslashes literal
+        regex = candidate["regex"].replace("'", "''")
+        lines.append(f"{candidate['label']}: '{regex}'")
+    return "\n".join(lines) + "\n"
+
+def suggest_new_patterns(unmatched_lines, min_count=3, top_n=None, state_path=None):
     """
-    Placeholder for a future ML-based log clustering pipeline.
+    Mines recurring templates from unmatched lines and proposes rules.
 
-    Intended enhancements:
-    - Use clustering algorithms (e.g., Drain3, TF-IDF, DBSCAN)
-    - Identify recurring log templates from unmatched lines
-    - Suggest regex patterns suitable for use in rules.yml
+    Lines are clustered online with Drain (fixed-depth prefix tree), so
+    the full unmatched stream can be processed, not just a sample. With
+    `state_path`, templates accumulate across runs.
 
     This is part of a feedback loop to:
     - Continuously improve coverage of known log patterns
@@ -15,9 +264,15 @@ def suggest_new_patterns(unmatched_lines):
     - Prepare inputs for future LLM-assisted RCA systems
 
     Args:
-        unmatched_lines (List[str]): Log lines that were not matched by current rules.
+        unmatched_lines (Iterable[str]): Log lines that were not matched by current rules.
+        min_count (int): Minimum occurrences for a template to be suggested.
+        top_n (int, optional): Maximum number of suggestions.
+        state_path (str, optional): Miner snapshot to resume from and update.
 
     Returns:
-        List[str]: Suggestions or templates for new rule candidates.
+        List[dict]: label, template, regex (ready for rules.yml) and occurrences.
     """
-    return ["TODO: ML-based rule suggestion not implemented yet."]
+    miner = TemplateMiner(state_path).add_lines(unmatched_lines)
+    if state_path:
+        miner.save()
+    return miner.candidates(min_count, top_n)
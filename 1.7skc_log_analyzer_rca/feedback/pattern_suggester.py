@@ -1,8 +1,19 @@
 # Placeholder for future ML rule suggestor
 # feedback/template_suggester.py
 
+import heapq
 import re
-from collections import defaultdict
+
+# Templates tracked at once; memory is bounded by this many entries
+# (template, one exemplar, count) regardless of input size
+DEFAULT_CAPACITY = 10_000
+
+# Masks applied in order by mask_variables()
+VARIABLE_MASKS = [
+    (re.compile(r"\b\d+\b"), "<NUM>"),                  # Replace integers
+    (re.compile(r"[a-fA-F0-9]{8,}"), "<HEX>"),          # Replace long hex/GUIDs
+    (re.compile(r"[A-Z]:\\\\[^\s]+"), "<PATH>"),        # Replace Windows paths
+]
 
 def mask_variables(line):
     """
@@ -17,36 +28,213 @@ def mask_variables(line):
     Returns:
         str: Masked/generalized version of the line.
     """
-    line = re.sub(r"\b\d+\b", "<NUM>", line)                        # Replace integers
-    line = re.sub(r"[a-fA-F0-9]{8,}", "<HEX>", line)                # Replace long hex/GUIDs
-    line = re.sub(r"[A-Z]:\\\\[^\s]+", "<PATH>", line)              # Replace Windows paths
+    for pattern, token in VARIABLE_MASKS:
+        line = pattern.sub(token, line)
     return line
 
-def suggest_templates(unmatched_lines, min_count=3):
+class TemplateCounter:
+    """
+    Space-Saving heavy-hitter counter for masked templates.
+
+    Tracks at most `capacity` templates. When a new template arrives while
+    full, the template with the smallest count is replaced and the newcomer
+    inherits that count (+1). Any template occurring more than N/capacity
+    times is guaranteed to be kept, and each reported count overestimates
+    the true count by at most its `error`.
+
+    Counters built on separate workers can be combined with merge().
+
+    Args:
+        capacity (int): Maximum number of templates tracked.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.entries = {}   # template -> [count, error, exemplar]
+        self._heap = []     # (count, template); counts may lag behind entries
+        self.total = 0
+
+    def add(self, template, example, count=1):
+        """
+        Counts one occurrence of a template.
+
+        Args:
+            template (str): Masked template.
+            example (str): Raw line kept as exemplar if the template is new.
+            count (int): Occurrences to add.
+        """
+        self.total += count
+        entry = self.entries.get(template)
+        if entry is not None:
+            entry[0] += count
+            return
+
+        if len(self.entries) < self.capacity:
+            self.entries[template] = [count, 0, example]
+            heapq.heappush(self._heap, (count, template))
+            return
+
+        floor = self._evict_min()
+        self.entries[template] = [floor + count, floor, example]
+        heapq.heappush(self._heap, (floor + count, template))
+
+    def _evict_min(self):
+        # Heap counts only ever lag (counts grow), so a popped entry whose
+        # count is current is the true minimum; stale ones are refreshed
+        heap = self._heap
+        while True:
+            count, template = heapq.heappop(heap)
+            current = self.entries[template][0]
+            if current == count:
+                del self.entries[template]
+                return count
+            heapq.heappush(heap, (current, template))
+
+    def min_count(self):
+        """Smallest tracked count (0 until the counter is full)."""
+        if len(self.entries) < self.capacity:
+            return 0
+        return min(entry[0] for entry in self.entries.values())
+
+    def merge(self, other):
+        """
+        Combines another counter into this one (mergeable summaries).
+
+        A template missing from a full counter may still have occurred up
+        to that counter's minimum count, which is added to both its count
+        and error, so the overestimate guarantee holds after merging. Only
+        the `capacity` largest results are kept.
+
+        Args:
+            other (TemplateCounter): Counter built over another part of the stream.
+
+        Returns:
+            TemplateCounter: self, for chaining.
+        """
+        floor_self = self.min_count()
+        floor_other = other.min_count()
+
+        merged = {}
+        for template in self.entries.keys() | other.entries.keys():
+            mine = self.entries.get(template)
+            theirs = other.entries.get(template)
+            count = error = 0
+            for entry, floor in ((mine, floor_self), (theirs, floor_other)):
+                if entry is None:
+                    count += floor
+                    error += floor
+                else:
+                    count += entry[0]
+                    error += entry[1]
+            example = mine[2] if mine is not None else theirs[2]
+            merged[template] = [count, error, example]
+
+        if len(merged) > self.capacity:
+            keep = heapq.nlargest(self.capacity, merged.items(), key=lambda item: item[1][0])
+            merged = dict(keep)
+
+        self.entries = merged
+        self._heap = [(entry[0], template) for template, entry in merged.items()]
+        heapq.heapify(self._heap)
+        self.total += other.total
+        return self
+
+    def counts(self):
+        """
+        Returns the tracked templates and their (estimated) counts.
+
+        Returns:
+            dict: template → occurrences.
+        """
+        return {template: entry[0] for template, entry in self.entries.items()}
+
+    def state(self):
+        """Returns the tracked entries as a JSON-serializable dict."""
+        return {
+            "entries": [[template, *entry] for template, entry in self.entries.items()],
+            "total": self.total,
+        }
+
+    def restore(self, state):
+        """
+        Reloads entries saved by state().
+
+        Args:
+            state (dict): Output of state().
+        """
+        self.entries = {template: [count, error, example] for template, count, error, example in state["entries"]}
+        self._heap = [(entry[0], template) for template, entry in self.entries.items()]
+        heapq.heapify(self._heap)
+        self.total = state["total"]
+
+    def top(self, k=None, min_count=1):
+        """
+        Returns the most frequent templates.
+
+        Args:
+            k (int, optional): Maximum number of results (None = all).
+            min_count (int): Minimum (estimated) occurrences.
+
+        Returns:
+            List[dict]: template, occurrences, error and example, by count.
+        """
+        ranked = sorted(self.entries.items(), key=lambda item: item[1][0], reverse=True)
+        results = []
+        for template, (count, error, example) in ranked:
+            if count < min_count:
+                break
+            results.append({"template": template, "occurrences": count, "error": error, "example": example})
+            if k is not None and len(results) >= k:
+                break
+        return results
+
+def count_templates(lines, capacity=DEFAULT_CAPACITY):
+    """
+    Builds a TemplateCounter over a stream of raw lines.
+
+    Suitable as a per-worker step; combine the results with merge().
+
+    Args:
+        lines (Iterable[str]): Raw unmatched log lines.
+        capacity (int): Maximum number of templates tracked.
+
+    Returns:
+        TemplateCounter: Counts for this part of the stream.
+    """
+    counter = TemplateCounter(capacity)
+    add = counter.add
+    for line in lines:
+        add(mask_variables(line), line.strip())
+    return counter
+
+def suggest_templates(unmatched_lines, min_count=3, capacity=DEFAULT_CAPACITY):
     """
     Suggests log message templates by grouping generalized log lines.
 
+    Streams the lines through a bounded Space-Saving counter that keeps
+    one example per template. Counts are exact while there are at most
+    `capacity` distinct templates; beyond that they are upper bounds
+    (true count >= occurrences - error).
+
     Args:
-        unmatched_lines (List[str]): Raw unmatched log lines.
+        unmatched_lines (Iterable[str]): Raw unmatched log lines.
         min_count (int): Minimum number of occurrences for a template to be suggested.
+        capacity (int): Maximum number of templates tracked.
 
     Returns:
         List[dict]: Suggested templates with sample example and frequency.
     """
-    templates = defaultdict(list)
-
-    for line in unmatched_lines:
-        masked = mask_variables(line)
-        templates[masked].append(line.strip())
+    counter = count_templates(unmatched_lines, capacity)
 
     # Filter out infrequent templates and prepare result list
     suggestions = []
-    for template, examples in templates.items():
-        if len(examples) >= min_count:
+    for template, (count, error, example) in counter.entries.items():
+        if count >= min_count:
             suggestions.append({
                 "template": template,
-                "occurrences": len(examples),
-                "example": examples[0]
+                "occurrences": count,
+                "error": error,
+                "example": example
             })
 
     return suggestions
@@ -1,9 +1,38 @@
 # Capture unmatched logs for analysis
 # feedback/unmatched_collector.py
 
-import re
+import gzip
+import hashlib
+import heapq
+import json
+import os
+import time
+
 import yaml
 
+from analyzer.signature_matcher import compile_rules
+from feedback.pattern_suggester import mask_variables
+
+SINK_INDEX = "index.json"
+SINK_INDEX_VERSION = 2
+
+# Append-only journal of per-template counts, folded on load
+SINK_COUNTS = "counts.ndjson"
+
+# Templates remembered across runs; past this the least recently seen are
+# forgotten when the journal is compacted (and re-recorded if they recur)
+MAX_INDEX_TEMPLATES = 1_000_000
+
+# The journal is compacted once it holds this many records per template
+COMPACT_RATIO = 4
+
+# A segment is closed and a new one started past either limit
+SEGMENT_MAX_RECORDS = 100_000
+SEGMENT_MAX_BYTES = 64 * 1024 * 1024
+
+# Longest raw line stored as a template's example
+MAX_EXAMPLE_CHARS = 2000
+
 def load_signature_rules(yaml_path="config/rules.yml"):
     """
     Loads pattern-matching rules from a YAML file.
@@ -17,7 +46,22 @@ def load_signature_rules(yaml_path="config/rules.yml"):
     with open(yaml_path, 'r') as f:
         return yaml.safe_load(f)
 
-def collect_unmatched_lines(log_lines, rules):
+def iter_unmatched_lines(log_lines, rules):
+    """
+    Streams log lines that do not match any known signature rule.
+
+    Args:
+        log_lines (Iterable[str]): Cleaned, redacted log lines.
+        rules (dict or SignatureRuleSet): Dictionary of known regex patterns.
+
+    Yields:
+        str: Stripped lines that matched no pattern.
+    """
+    for _, line, labels in compile_rules(rules).iter_matches(log_lines):
+        if not labels:
+            yield line.strip()
+
+def collect_unmatched_lines(log_lines, rules, scan=None):
     """
     Identifies log lines that do not match any known signature rule.
 
@@ -27,19 +71,16 @@ def collect_unmatched_lines(log_lines, rules):
 
     Args:
         log_lines (List[str]): List of cleaned, redacted log lines.
-        rules (dict): Dictionary of known regex patterns.
+        rules (dict or SignatureRuleSet): Dictionary of known regex patterns.
+        scan (tuple, optional): Precomputed SignatureRuleSet.scan() result;
+            avoids rescanning the log.
 
     Returns:
         List[str]: Lines that didn’t match any known rule.
     """
-    unmatched = []
-
-    for line in log_lines:
-        # Check if line matches any pattern; if not, collect it
-        if not any(re.search(pattern, line) for pattern in rules.values()):
-            unmatched.append(line.strip())
-
-    return unmatched
+    if scan is None:
+        scan = compile_rules(rules).scan(log_lines)
+    return scan[1]
 
 def save_unmatched_lines(unmatched_lines, out_path="unmatched_logs.txt"):
     """
@@ -50,5 +91,299 @@ def save_unmatched_lines(unmatched_lines, out_path="unmatched_logs.txt"):
         out_path (str): Output path for saving unmatched entries.
     """
     with open(out_path, "w", encoding="utf-8") as f:
-        for line in unmatched_lines:
-            f.write(line + "\n")
+        f.writelines(line + "\n" for line in unmatched_lines)
+
+def template_hash(template):
+    """
+    Returns a stable short hash identifying a masked template.
+    """
+    return hashlib.blake2b(template.encode("utf-8"), digest_size=8).hexdigest()
+
+class UnmatchedSink:
+    """
+    Deduplicating, compressed store for unmatched lines across runs.
+
+    Lines are masked (mask_variables) and identified by template hash.
+    Only the first occurrence of a template ever is written, as one NDJSON
+    record in a gzip segment; later occurrences only bump its count. Segments
+    rotate by record count or size and are never modified after they are
+    closed, so readers can pick up just the new ones.
+
+    Each run appends the counts of just the templates it saw to the counts
+    journal. The journal is rewritten only when it holds COMPACT_RATIO
+    records per template, keeping the MAX_INDEX_TEMPLATES most recently
+    seen templates.
+
+    Layout of `directory`:
+    - segment-000001.ndjson.gz, ...: {"hash", "template", "example", "run", "time"}
+    - counts.ndjson: [hash, count, first_run, last_run, segment] per line
+    - index.json: run counter, next segment and reader cursors
+
+    Args:
+        directory (str): Sink directory (created if missing).
+        max_records (int): Records per segment before rotating.
+        max_bytes (int): Uncompressed bytes per segment before rotating.
+    """
+
+    def __init__(self, directory, max_records=SEGMENT_MAX_RECORDS, max_bytes=SEGMENT_MAX_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_records = max_records
+        self.max_bytes = max_bytes
+        self.index = load_sink_index(directory)
+        self.index["runs"] += 1
+        self.run = self.index["runs"]
+
+        self._templates = self.index["templates"]
+        self._touched = set()
+        self._segment = None
+        self._segment_records = 0
+        self._segment_bytes = 0
+        self.stats = {"lines": 0, "new_templates": 0}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, line):
+        """
+        Records one unmatched line.
+
+        Args:
+            line (str): Unmatched (already redacted) log line or entry.
+        """
+        self.stats["lines"] += 1
+        template = mask_variables(line)
+        key = template_hash(template)
+
+        known = self._templates.get(key)
+        if known is not None:
+            if key not in self._touched:
+                # Count this run's occurrences separately for the journal
+                self._touched.add(key)
+                known["run_count"] = 0
+            known["count"] += 1
+            known["run_count"] += 1
+            known["last_run"] = self.run
+            return
+
+        self.stats["new_templates"] += 1
+        segment = self._write({
+            "hash": key,
+            "template": template,
+            "example": line.strip()[:MAX_EXAMPLE_CHARS],
+            "run": self.run,
+            "time": time.time(),
+        })
+        self._templates[key] = {"count": 1, "run_count": 1, "first_run": self.run, "last_run": self.run,
+                                "segment": segment}
+        self._touched.add(key)
+
+    def add_lines(self, lines):
+        """
+        Records an iterable of unmatched lines.
+
+        Args:
+            lines (Iterable[str]): Unmatched log lines.
+        """
+        add = self.add
+        for line in lines:
+            add(line)
+
+    def _write(self, record):
+        if self._segment is not None and (
+                self._segment_records >= self.max_records or self._segment_bytes >= self.max_bytes):
+            self._close_segment()
+        if self._segment is None:
+            self._open_segment()
+
+        data = json.dumps(record, ensure_ascii=False) + "\n"
+        self._segment.write(data)
+        self._segment_records += 1
+        self._segment_bytes += len(data)
+        return self.index["next_segment"] - 1
+
+    def _open_segment(self):
+        number = self.index["next_segment"]
+        self.index["next_segment"] = number + 1
+        self._segment_path = segment_path(self.directory, number)
+        self._segment = gzip.open(self._segment_path + ".tmp", "wt", encoding="utf-8")
+        self._segment_records = 0
+        self._segment_bytes = 0
+
+    def _close_segment(self):
+        self._segment.close()
+        # Segments appear under their final name only once complete
+        os.replace(self._segment_path + ".tmp", self._segment_path)
+        self._segment = None
+
+    def close(self):
+        """Closes the open segment, records this run's counts and saves the index."""
+        if self._segment is not None:
+            self._close_segment()
+
+        journal = self.index["journal_records"]
+        if (journal is None or journal + len(self._touched) > COMPACT_RATIO * len(self._templates)
+                or len(self._templates) > MAX_INDEX_TEMPLATES):
+            compact_sink_counts(self.directory, self._templates)
+        else:
+            records = [_count_record(key, self._templates[key], "run_count") for key in self._touched]
+            with open(os.path.join(self.directory, SINK_COUNTS), "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(record) + "\n" for record in records))
+        self._touched = set()
+
+        # Keep cursors readers advanced while this sink was open
+        self.index["cursors"] = load_sink_index(self.directory, templates=False)["cursors"]
+        save_sink_index(self.directory, self.index)
+
+def segment_path(directory, number):
+    return os.path.join(directory, f"segment-{number:06d}.ndjson.gz")
+
+def _count_record(key, known, count_field="count"):
+    return [key, known[count_field], known["first_run"], known["last_run"], known["segment"]]
+
+def load_sink_counts(directory):
+    """
+    Folds the counts journal into per-template totals.
+
+    A torn last line (a sink killed mid-append) is skipped.
+
+    Args:
+        directory (str): Sink directory.
+
+    Returns:
+        Tuple[dict, int]: hash → {"count", "first_run", "last_run",
+        "segment"}, and the number of journal records read.
+    """
+    templates = {}
+    records = 0
+    path = os.path.join(directory, SINK_COUNTS)
+    if not os.path.exists(path):
+        return templates, records
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                key, count, first_run, last_run, segment = json.loads(line)
+            except ValueError:
+                continue
+            records += 1
+            known = templates.get(key)
+            if known is None:
+                templates[key] = {"count": count, "first_run": first_run, "last_run": last_run, "segment": segment}
+            else:
+                known["count"] += count
+                known["last_run"] = max(known["last_run"], last_run)
+    return templates, records
+
+def compact_sink_counts(directory, templates, max_templates=MAX_INDEX_TEMPLATES):
+    """
+    Atomically rewrites the counts journal with one record per template.
+
+    Beyond `max_templates`, the least recently seen (then least frequent)
+    templates are dropped from `templates` as well.
+
+    Args:
+        directory (str): Sink directory.
+        templates (dict): Folded counts (see load_sink_counts()).
+        max_templates (int): Templates kept.
+    """
+    if len(templates) > max_templates:
+        keep = heapq.nlargest(max_templates, templates.items(),
+                              key=lambda item: (item[1]["last_run"], item[1]["count"]))
+        templates.clear()
+        templates.update(keep)
+    path = os.path.join(directory, SINK_COUNTS)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        for key, known in templates.items():
+            f.write(json.dumps(_count_record(key, known)) + "\n")
+    os.replace(path + ".tmp", path)
+
+def load_sink_index(directory, templates=True):
+    """
+    Loads a sink's index, or a fresh one if the sink is new.
+
+    Args:
+        directory (str): Sink directory.
+        templates (bool): Also fold the counts journal.
+
+    Returns:
+        dict: "runs", "next_segment", "cursors" and, with `templates`,
+        "templates" (see load_sink_counts()) and "journal_records" (None
+        when the journal must be rewritten).
+    """
+    index = {"version": SINK_INDEX_VERSION, "runs": 0, "next_segment": 1, "cursors": {}}
+    path = os.path.join(directory, SINK_INDEX)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("version") in (1, SINK_INDEX_VERSION):
+            index = saved
+    if not templates:
+        index.pop("templates", None)
+        return index
+    if index["version"] == 1:
+        # Version 1 kept every count in index.json; they move to the journal on the next close
+        index["journal_records"] = None
+    else:
+        index["templates"], index["journal_records"] = load_sink_counts(directory)
+    return index
+
+def save_sink_index(directory, index):
+    """
+    Atomically writes a sink's index (without the template counts).
+
+    Args:
+        directory (str): Sink directory.
+        index (dict): Index as returned by load_sink_index().
+    """
+    path = os.path.join(directory, SINK_INDEX)
+    header = {
+        "version": SINK_INDEX_VERSION,
+        "runs": index["runs"],
+        "next_segment": index["next_segment"],
+        "cursors": index["cursors"],
+    }
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(header, f)
+    os.replace(path + ".tmp", path)
+
+def read_new_templates(directory, reader="default", advance=True):
+    """
+    Streams templates first seen since `reader` last read the sink.
+
+    Only segments after the reader's cursor are opened, so each run of the
+    feedback loop touches just the new templates. Each record carries the
+    template's current total count from the index.
+
+    Args:
+        directory (str): Sink directory.
+        reader (str): Name of the consumer whose cursor is used.
+        advance (bool): Move the cursor past the segments read once exhausted.
+
+    Yields:
+        dict: hash, template, example, run, time and count.
+    """
+    index = load_sink_index(directory)
+    start = index["cursors"].get(reader, 0) + 1
+    last = start - 1
+
+    for number in range(start, index["next_segment"]):
+        path = segment_path(directory, number)
+        if not os.path.exists(path):
+            # Still being written by an open sink
+            break
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                record = json.loads(line)
+                known = index["templates"].get(record["hash"])
+                record["count"] = known["count"] if known else 1
+                yield record
+        last = number
+
+    if advance and last >= start:
+        # Re-read so cursors and segments written meanwhile are not lost
+        latest = load_sink_index(directory, templates=False)
+        latest["cursors"][reader] = last
+        save_sink_index(directory, latest)
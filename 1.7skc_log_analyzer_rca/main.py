@@ -1 +1,678 @@
-# Entry point main script placeholder
+# Entry point for the SKC log analyzer
+# main.py
+#
+# Streams a log through every analysis stage in one pass:
+#   decode/cleanse → redact → merge multiline → match → classify → spike/markers/diff
+# Each entry flows through all stages before the next line is read; only
+# bounded aggregates (counters, capped findings) are kept until the end.
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from ai_integration.rule_augmentor import augment_rules
+from analyzer.anomaly_summary import summarize_anomalies
+from analyzer.diff_engine import mask_line
+from analyzer.event_expectations import EXPECTED_EVENTS, find_missing_events
+from analyzer.keyword_scanner import KeywordScanner, load_markers
+from analyzer.rca_classifier import RootCauseClassifier, classify_root_causes
+from analyzer.rule_profiler import ProfiledRuleSet, check_rules
+from analyzer.sequence_checker import EXPECTED_SEQUENCE, check_sequence
+from analyzer.signature_matcher import SignatureRuleSet
+from analyzer.spike_detector import SpikeAccumulator
+from analyzer.stack_summarizer import StackTraceGrouper
+from feedback.cluster_stub import TemplateMiner, format_rules_yaml
+from feedback.pattern_suggester import TemplateCounter
+from feedback.unmatched_collector import UnmatchedSink
+from parser.extractor import extract_fields
+from preprocessor.cleanser import CHUNK_SIZE, iter_cleansed_lines
+from preprocessor.multiline import MAX_ENTRY_CHARS, iter_merged_events
+from preprocessor.redactor import redact_line
+from reporting.report_generator import FindingPrinter, FindingsWriter, PatternAggregator, write_text_report
+from utils.event_cache import DEFAULT_MAX_BYTES, EventCache
+from utils.log_follower import POLL_INTERVAL, LogFollower
+from utils.timestamp_utils import TimestampParser, parse_epoch
+
+# Findings kept in memory for the report; later ones are only counted
+MAX_FINDINGS = 10_000
+
+# Findings classified per RCA batch (see StreamingAnalysis.flush())
+RCA_BATCH = 1_000
+
+# Largest stack-trace groups listed in the anomaly summary
+MAX_STACK_GROUPS = 20
+STACK_GROUP_FIELDS = ("fingerprint", "exception", "top_frame", "count",
+                      "first_line", "last_line", "first_seen", "last_seen", "exemplar")
+
+# Distinct templates counted per log for the --baseline diff; past this,
+# rare templates share Space-Saving slots and their counts are estimates
+MAX_TEMPLATES = 10_000
+
+# Follow mode: stack groups saved in a checkpoint, most recently seen
+# first; only the MAX_STACK_GROUPS largest keep their exemplars
+CHECKPOINT_STACK_GROUPS = 1_000
+
+# Follow mode: minimum seconds between checkpoint writes
+CHECKPOINT_INTERVAL = 5.0
+
+def memory_limits(max_memory_mb=None, chunk_size=CHUNK_SIZE):
+    """
+    Derives per-stage buffer sizes from an overall memory budget.
+
+    The budget is split between the decode chunk, the largest merged entry
+    and the timestamp batch. Aggregates (distinct spike buckets, diff
+    templates, capped findings) come on top and do not grow with input size.
+
+    Args:
+        max_memory_mb (int, optional): Approximate working-buffer budget in MB.
+        chunk_size (int): Requested bytes per decode step.
+
+    Returns:
+        dict: "chunk_size", "max_entry_chars" and "timestamp_batch".
+    """
+    if not max_memory_mb:
+        return {
+            "chunk_size": chunk_size,
+            "max_entry_chars": MAX_ENTRY_CHARS,
+            "timestamp_batch": 100_000,
+        }
+
+    budget = max_memory_mb * 1024 * 1024
+    return {
+        "chunk_size": max(4096, min(chunk_size, budget // 8)),
+        "max_entry_chars": max(4096, budget // 8),
+        # ~100 bytes per buffered timestamp string
+        "timestamp_batch": max(1000, budget // 4 // 100),
+    }
+
+class StreamingAnalysis:
+    """
+    Aggregates per-entry results while the pipeline streams.
+
+    Every stage works on one merged entry at a time; this class holds the
+    bounded state needed to produce the final report.
+
+    Only the first `max_findings` findings are kept for the report (the
+    rest are counted in `dropped_findings`), but every match is passed to
+    `report_sinks` (objects with a write(finding)
+    method, e.g. FindingsWriter or PatternAggregator) as it is produced.
+    A repeat of a grouped stack trace is passed as its own record with
+    `repeat_of` set to the line of the finding it was counted on.
+
+    Root causes are classified RCA_BATCH entries at a time: findings are
+    queued, then classified with one scan and passed to the sinks in order
+    by flush().
+
+    With `track_templates`, masked entries are counted in a TemplateCounter
+    of `template_capacity` slots for the baseline diff.
+    """
+
+    def __init__(self, ruleset, sequence, expected_events,
+                 track_templates=False, timestamp_batch=100_000, max_findings=MAX_FINDINGS,
+                 miner=None, sink=None, timestamp_parser=None, classifier=None,
+                 report_sinks=(), template_capacity=MAX_TEMPLATES):
+        self.ruleset = ruleset
+        self.sequence = sequence
+        self.expected_events = expected_events
+        self.markers = KeywordScanner(list(sequence) + list(expected_events), timestamp_parser=timestamp_parser)
+        self.marker_hits = {}
+        self.spikes = SpikeAccumulator(batch_size=timestamp_batch, parser=timestamp_parser)
+        self.timestamp_parser = timestamp_parser
+        self.stacks = StackTraceGrouper()
+        self._grouped_findings = {}
+        self.templates = TemplateCounter(template_capacity) if track_templates else None
+        self.max_findings = max_findings
+        self.miner = miner
+        self.sink = sink
+        self.classifier = classifier
+        self.report_sinks = list(report_sinks)
+        self._queued = []         # (record for sinks, finding, index into _rca_messages or parent finding)
+        self._rca_messages = []
+
+        self.findings = []
+        self.dropped_findings = 0
+        self.pattern_counts = Counter()
+        self.unmatched_count = 0
+        self.entry_count = 0
+
+    def observe(self, line_no, entry, timestamp_parser=None):
+        """
+        Runs the per-entry stages for one merged log entry.
+
+        The entry's timestamp is parsed once and shared by the spike,
+        stack-trace and marker stages.
+
+        Args:
+            line_no (int): Line number the entry starts on.
+            entry (str): Cleaned, redacted, merged log entry.
+            timestamp_parser (TimestampParser, optional): Parser for the
+                entry's source, when entries come from several logs.
+        """
+        self.entry_count += 1
+        parser = timestamp_parser or self.timestamp_parser
+        if parser is not None:
+            timestamp = parser.parse(entry)
+            self.spikes.add_epoch(timestamp)
+        else:
+            timestamp = None
+            self.spikes.add_line(entry)
+        stack = self.stacks.add(entry, line_no, timestamp) if "\n" in entry else None
+        self.markers.observe(self.marker_hits, line_no, entry, timestamp)
+        if self.templates is not None:
+            count_template(self.templates, entry)
+
+        labels = self.ruleset.match_line(entry)
+        if not labels:
+            self.unmatched_count += 1
+            if self.miner is not None:
+                self.miner.add(entry)
+            if self.sink is not None:
+                self.sink.add(entry)
+            return
+
+        self.pattern_counts.update(labels)
+
+        # Repeats of a stack trace already reported under a label are
+        # counted on that finding instead of adding a new one
+        if stack is not None:
+            new_labels = []
+            for label in labels:
+                finding = self._grouped_findings.get((label, stack["fingerprint"]))
+                if finding is None:
+                    new_labels.append(label)
+                else:
+                    finding["occurrences"] += 1
+                    finding["last_line"] = line_no
+                    if self.report_sinks:
+                        repeat = {
+                            "line": line_no, "pattern": label, "content": entry.split("\n", 1)[0],
+                            "rca": None, "stack_fingerprint": stack["fingerprint"],
+                            "repeat_of": finding["line"],
+                        }
+                        self._queued.append((repeat, repeat, finding))
+            labels = new_labels
+            if not labels:
+                return
+
+        keep = len(self.findings) < self.max_findings
+        if not keep:
+            self.dropped_findings += len(labels)
+            if not self.report_sinks:
+                return
+
+        self._rca_messages.append(entry)
+        source = len(self._rca_messages) - 1
+        if "\n" in entry:
+            summary = stack["summary"] if stack is not None else "Unknown Exception"
+        else:
+            summary = None
+        content = entry.split("\n", 1)[0]
+        for label in labels:
+            finding = {"line": line_no, "pattern": label, "content": content, "rca": None}
+            if summary:
+                finding["exception_summary"] = summary
+            if stack is not None:
+                finding.update(stack_fingerprint=stack["fingerprint"], occurrences=1, last_line=line_no)
+            # Sinks get the finding as produced; the kept one counts later repeats
+            record = dict(finding) if keep and self.report_sinks else finding
+            self._queued.append((record, finding, source))
+            if keep:
+                if stack is not None:
+                    self._grouped_findings[(label, stack["fingerprint"])] = finding
+                self.findings.append(finding)
+
+        if len(self._rca_messages) >= RCA_BATCH:
+            self.flush()
+
+    def flush(self):
+        """
+        Classifies queued findings with one batch scan and passes them, in
+        order, to the report sinks. Called automatically every RCA_BATCH
+        entries and by state() and results().
+        """
+        if not self._queued:
+            return
+        causes = classify_root_causes(self._rca_messages, self.classifier)
+        for record, finding, source in self._queued:
+            # Repeats take the cause of the finding they were counted on
+            finding["rca"] = record["rca"] = causes[source][0] if isinstance(source, int) else source["rca"]
+            for report_sink in self.report_sinks:
+                report_sink.write(record)
+        self._queued = []
+        self._rca_messages = []
+
+    def state(self):
+        """
+        Returns the aggregates as a JSON-serializable dict.
+
+        Used by follow mode to checkpoint analysis progress alongside the
+        file offsets, so a restart resumes without re-reading the logs.
+        Stack groups are capped at CHECKPOINT_STACK_GROUPS.
+        """
+        self.flush()
+        return {
+            "marker_hits": self.marker_hits,
+            "spikes": self.spikes.state(),
+            "stacks": self.stacks.state(CHECKPOINT_STACK_GROUPS, MAX_STACK_GROUPS),
+            "templates": self.templates.state() if self.templates is not None else None,
+            "findings": self.findings,
+            "dropped_findings": self.dropped_findings,
+            "pattern_counts": dict(self.pattern_counts),
+            "unmatched_count": self.unmatched_count,
+            "entry_count": self.entry_count,
+        }
+
+    def restore(self, state):
+        """
+        Reloads aggregates saved by state().
+
+        Args:
+            state (dict): Output of state().
+        """
+        # Checkpoints written before marker times were epoch seconds hold ISO strings
+        self.marker_hits = {
+            keyword: {
+                key: parse_epoch(value) if key.endswith("_time") and isinstance(value, str) else value
+                for key, value in hit.items()
+            }
+            for keyword, hit in state["marker_hits"].items()
+        }
+        self.spikes.restore(state["spikes"])
+        if self.templates is not None and state["templates"]:
+            self.templates.restore(state["templates"])
+        if state.get("stacks"):
+            self.stacks.restore(state["stacks"])
+        self.findings = state["findings"]
+        self._grouped_findings = {
+            (finding["pattern"], finding["stack_fingerprint"]): finding
+            for finding in self.findings if "stack_fingerprint" in finding
+        }
+        self.dropped_findings = state.get("dropped_findings", 0)
+        self.pattern_counts = Counter(state["pattern_counts"])
+        self.unmatched_count = state["unmatched_count"]
+        self.entry_count = state["entry_count"]
+
+    def results(self, spike_threshold=10, baseline_templates=None):
+        """
+        Builds the final analysis results.
+
+        Args:
+            spike_threshold (int): Events per minute that count as a spike.
+            baseline_templates (TemplateCounter, optional): Template counts of a baseline log.
+
+        Returns:
+            dict: rca_findings, anomaly_summary, unmatched_count and counters
+            (dropped_findings: findings past `max_findings`, not in rca_findings).
+        """
+        self.flush()
+        sequence_result = check_sequence(None, expected=self.sequence, scan=self.marker_hits)
+        missing_events = find_missing_events(None, expected=self.expected_events, scan=self.marker_hits)
+        spike_result = self.spikes.spikes(spike_threshold)
+
+        diff = []
+        if baseline_templates is not None and self.templates is not None:
+            delta = Counter(self.templates.counts())
+            delta.subtract(baseline_templates.counts())
+            diff = {template: count for template, count in delta.items() if count}
+
+        anomaly_summary = summarize_anomalies(sequence_result, spike_result, diff)
+        anomaly_summary["missing_events"] = missing_events
+        anomaly_summary["stack_groups"] = [
+            {key: group[key] for key in STACK_GROUP_FIELDS}
+            for group in self.stacks.report(MAX_STACK_GROUPS)
+        ]
+
+        return {
+            "rca_findings": self.findings,
+            "dropped_findings": self.dropped_findings,
+            "anomaly_summary": anomaly_summary,
+            "unmatched_count": self.unmatched_count,
+            "pattern_counts": dict(self.pattern_counts),
+            "entry_count": self.entry_count,
+        }
+
+def count_template(counter, entry):
+    """
+    Counts one entry's masked template (diff_engine.mask_line()).
+
+    The template doubles as its own exemplar, so no raw entry is kept.
+
+    Args:
+        counter (TemplateCounter): Template counts of one log.
+        entry (str): Merged log entry.
+    """
+    template = mask_line(entry)
+    counter.add(template, template)
+
+def iter_entries(path, chunk_size=CHUNK_SIZE, max_entry_chars=MAX_ENTRY_CHARS, workers=None):
+    """
+    Streams cleansed, redacted, merged entries from a log file.
+
+    Args:
+        path (str): Path to a text log.
+        chunk_size (int): Bytes decoded per read.
+        max_entry_chars (int): Cap on a single merged entry.
+        workers (int, optional): Threads for parallel BGZF decompression.
+
+    Yields:
+        Tuple[int, str]: Start line number and merged entry.
+    """
+    lines = iter_cleansed_lines(path, chunk_size=chunk_size, workers=workers)
+    redacted = map(redact_line, lines)
+    return iter_merged_events(redacted, max_chars=max_entry_chars, with_line_numbers=True)
+
+def iter_cached_entries(cache, path, chunk_size=CHUNK_SIZE, max_entry_chars=MAX_ENTRY_CHARS, workers=None):
+    """
+    iter_entries() backed by the parsed-event cache.
+
+    On a miss the entries are normalized with extract_fields() and stored as
+    they stream; on a hit decoding, redaction and merging are skipped.
+
+    Args:
+        cache (EventCache): Open event cache.
+        path (str): Path to a text log.
+        chunk_size (int): Bytes decoded per read.
+        max_entry_chars (int): Cap on a single merged entry.
+        workers (int, optional): Threads for parallel BGZF decompression.
+
+    Yields:
+        Tuple[int, str]: Start line number and merged entry.
+    """
+    def build():
+        for line_no, entry in iter_entries(path, chunk_size, max_entry_chars, workers):
+            event = extract_fields({"message": entry})
+            event["line"] = line_no
+            yield event
+
+    # The entry cap changes merged output, so it is part of the key
+    for event in cache.get_or_build(path, build, variant=f"text:{max_entry_chars}"):
+        yield event["line"], event["message"]
+
+def load_marker_lists(markers_path="config/markers.yml"):
+    """
+    Loads sequence and expected-event markers, falling back to module defaults.
+
+    Args:
+        markers_path (str): Path to the markers YAML file.
+
+    Returns:
+        Tuple[List[str], List[str]]: Sequence steps and expected events.
+    """
+    markers = load_markers(markers_path) if os.path.exists(markers_path) else {}
+    return (
+        markers.get("sequence") or EXPECTED_SEQUENCE,
+        markers.get("expected_events") or EXPECTED_EVENTS,
+    )
+
+def load_classifier(categories_path="config/rca_categories.yml"):
+    """
+    Builds the RCA classifier, falling back to the built-in categories.
+
+    Args:
+        categories_path (str): Path to the RCA categories YAML file.
+
+    Returns:
+        RootCauseClassifier: Compiled classifier.
+    """
+    if os.path.exists(categories_path):
+        return RootCauseClassifier.from_yaml(categories_path)
+    return RootCauseClassifier()
+
+def run_pipeline(log_path, rules_path="config/rules.yml", baseline_path=None,
+                 markers_path="config/markers.yml", spike_threshold=10,
+                 chunk_size=CHUNK_SIZE, max_memory_mb=None, cache=None, miner=None,
+                 sink=None, ruleset=None, categories_path="config/rca_categories.yml",
+                 report_sinks=(), workers=None):
+    """
+    Analyzes a log file end to end in a single streaming pass.
+
+    Args:
+        log_path (str): Log file to analyze.
+        rules_path (str): Signature rules YAML.
+        baseline_path (str, optional): Known-good log to diff against (template delta).
+        markers_path (str): Marker lists YAML.
+        spike_threshold (int): Events per minute that count as a spike.
+        chunk_size (int): Bytes decoded per read.
+        max_memory_mb (int, optional): Working-buffer budget in MB.
+        cache (EventCache, optional): Reuse parsed entries across runs.
+        miner (TemplateMiner, optional): Mines templates from unmatched entries.
+        sink (UnmatchedSink, optional): Stores unmatched entries, deduplicated.
+        ruleset (SignatureRuleSet, optional): Prebuilt rules (e.g. a
+            ProfiledRuleSet); overrides `rules_path`.
+        categories_path (str): RCA categories YAML.
+        report_sinks (Iterable, optional): Receive every finding as it is
+            produced (e.g. FindingsWriter, PatternAggregator).
+        workers (int, optional): Threads for parallel BGZF decompression
+            (defaults to one per CPU; 1 disables it).
+
+    Returns:
+        dict: Analysis results (see StreamingAnalysis.results()).
+    """
+    limits = memory_limits(max_memory_mb, chunk_size)
+    if cache is not None:
+        entries = lambda path: iter_cached_entries(cache, path, limits["chunk_size"], limits["max_entry_chars"], workers)
+    else:
+        entries = lambda path: iter_entries(path, limits["chunk_size"], limits["max_entry_chars"], workers)
+    sequence, expected_events = load_marker_lists(markers_path)
+
+    analysis = StreamingAnalysis(
+        ruleset if ruleset is not None else SignatureRuleSet.from_yaml(rules_path),
+        sequence,
+        expected_events,
+        track_templates=baseline_path is not None,
+        timestamp_batch=limits["timestamp_batch"],
+        miner=miner,
+        sink=sink,
+        timestamp_parser=TimestampParser(log_path),
+        classifier=load_classifier(categories_path),
+        report_sinks=report_sinks,
+    )
+    for line_no, entry in entries(log_path):
+        analysis.observe(line_no, entry)
+
+    baseline_templates = None
+    if baseline_path is not None:
+        baseline_templates = TemplateCounter(MAX_TEMPLATES)
+        for _, entry in entries(baseline_path):
+            count_template(baseline_templates, entry)
+
+    return analysis.results(spike_threshold, baseline_templates)
+
+def follow_pipeline(log_paths, rules_path="config/rules.yml", markers_path="config/markers.yml",
+                    spike_threshold=10, checkpoint_path=None, poll_interval=POLL_INTERVAL,
+                    checkpoint_interval=CHECKPOINT_INTERVAL, from_end=False, once=False, out=sys.stdout,
+                    categories_path="config/rca_categories.yml", report_sinks=()):
+    """
+    Follows growing logs and analyzes appended entries as they complete.
+
+    Each poll feeds only new bytes through cleansing, redaction, merging and
+    matching; spike, marker and pattern aggregates are updated in place.
+    New findings are printed as they appear. File positions and aggregates
+    are checkpointed together, so a restart resumes without re-reading.
+    Runs until interrupted (Ctrl+C) or, with `once`, until caught up.
+
+    Args:
+        log_paths (List[str]): Logs to follow.
+        rules_path (str): Signature rules YAML.
+        markers_path (str): Marker lists YAML.
+        spike_threshold (int): Events per minute that count as a spike.
+        checkpoint_path (str, optional): Checkpoint JSON to resume from and save to.
+        poll_interval (float): Seconds between polls while idle.
+        checkpoint_interval (float): Minimum seconds between checkpoint writes.
+        from_end (bool): Skip existing content of logs not in the checkpoint.
+        once (bool): Stop after the first poll that finds nothing new.
+        out (TextIO): Stream for live findings.
+        categories_path (str): RCA categories YAML.
+        report_sinks (Iterable, optional): Receive every finding observed in
+            this run (findings restored from a checkpoint are not replayed).
+
+    Returns:
+        dict: Analysis results (see StreamingAnalysis.results()).
+    """
+    sequence, expected_events = load_marker_lists(markers_path)
+    # Each followed log gets its own sniffing parser; the default one only
+    # sets the spike buckets to epoch seconds
+    # Live output comes from the finding stream, not the capped report list
+    printer = FindingPrinter(out)
+    analysis = StreamingAnalysis(SignatureRuleSet.from_yaml(rules_path), sequence, expected_events,
+                                 timestamp_parser=TimestampParser(),
+                                 classifier=load_classifier(categories_path),
+                                 report_sinks=[printer, *report_sinks])
+    parsers = {}
+    follower = LogFollower(log_paths, checkpoint_path, from_end=from_end)
+
+    state = follower.load_checkpoint()
+    if state:
+        analysis.restore(state)
+
+    saved_at = time.monotonic()
+    dirty = False
+    try:
+        for batch in follower.follow(poll_interval):
+            for path, line_no, entry in batch:
+                if path != printer.path:
+                    # Queued findings are printed under the log they came from
+                    analysis.flush()
+                    printer.path = path
+                parser = parsers.get(path)
+                if parser is None:
+                    parser = parsers[path] = TimestampParser(path)
+                analysis.observe(line_no, entry, parser)
+            analysis.flush()
+            dirty = dirty or bool(batch)
+
+            if dirty and time.monotonic() - saved_at >= checkpoint_interval:
+                follower.save_checkpoint(analysis.state())
+                saved_at = time.monotonic()
+                dirty = False
+            if once and not batch:
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        follower.save_checkpoint(analysis.state())
+
+    return analysis.results(spike_threshold)
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="SKC Log Analyzer - streaming RCA pipeline")
+    parser.add_argument("log", nargs="+", help="Log file to analyze (several with --follow)")
+    parser.add_argument("--rules", default="config/rules.yml", help="Signature rules YAML")
+    parser.add_argument("--markers", default="config/markers.yml", help="Sequence/expected-event markers YAML")
+    parser.add_argument("--categories", default="config/rca_categories.yml", help="RCA categories YAML")
+    parser.add_argument("--baseline", help="Known-good log to diff against")
+    parser.add_argument("--spike-threshold", type=int, default=10, help="Events per minute flagged as a spike")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Bytes decoded per read")
+    parser.add_argument("--workers", type=int,
+                        help="Threads for parallel decompression of BGZF logs (default: one per CPU)")
+    parser.add_argument("--max-memory", type=int, help="Working-buffer budget in MB")
+    parser.add_argument("--cache-dir", help="Cache parsed entries here and reuse them on later runs")
+    parser.add_argument("--cache-max-mb", type=int, default=DEFAULT_MAX_BYTES // 1024 // 1024,
+                        help="Size cap of the entry cache in MB (least recently used entries are evicted)")
+    parser.add_argument("--template-state", help="Mine templates from unmatched entries, accumulating in this file")
+    parser.add_argument("--suggest-rules", help="Write mined rule candidates (rules.yml format) to this path")
+    parser.add_argument("--profile-rules", action="store_true",
+                        help="Time every rule and print per-rule cost plus backtracking checks to stderr")
+    parser.add_argument("--unmatched-dir", help="Store deduplicated unmatched entries in this sink directory")
+    parser.add_argument("--follow", action="store_true", help="Keep following the logs as they grow")
+    parser.add_argument("--checkpoint", help="Follow-mode checkpoint file to resume from and update")
+    parser.add_argument("--from-end", action="store_true", help="Follow mode: skip content already in the logs")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL, help="Follow mode: seconds between polls")
+    parser.add_argument("--once", action="store_true", help="Follow mode: stop once caught up (for scheduled runs)")
+    parser.add_argument("--json", dest="json_path", help="Also write a JSON report to this path")
+    parser.add_argument("--ndjson", dest="ndjson_path", help="Also write an NDJSON report (one record per line) to this path")
+    parser.add_argument("--aggregate", action="store_true", help="Report one row per pattern instead of each finding")
+    parser.add_argument("--top", type=int, help="Findings (or patterns with --aggregate) listed in reports")
+    return parser
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    if not args.follow and len(args.log) > 1:
+        parser.error("multiple logs are only supported with --follow")
+
+    # Findings are streamed into the report files while the pipeline runs
+    with ExitStack() as report_files:
+        writers = []
+        for path, fmt in ((args.json_path, "json"), (args.ndjson_path, "ndjson")):
+            if path:
+                f = report_files.enter_context(open(path, "w", encoding="utf-8"))
+                writers.append(FindingsWriter(f, fmt, aggregate=args.aggregate, top=args.top))
+        aggregator = PatternAggregator() if args.aggregate else None
+        report_sinks = writers + ([aggregator] if aggregator is not None else [])
+
+        if args.follow:
+            results = follow_pipeline(
+                args.log,
+                rules_path=args.rules,
+                markers_path=args.markers,
+                categories_path=args.categories,
+                spike_threshold=args.spike_threshold,
+                checkpoint_path=args.checkpoint,
+                poll_interval=args.poll_interval,
+                from_end=args.from_end,
+                once=args.once,
+                report_sinks=report_sinks,
+            )
+        else:
+            cache = EventCache(args.cache_dir, args.cache_max_mb * 1024 * 1024) if args.cache_dir else None
+            mining = args.template_state or args.suggest_rules
+            miner = TemplateMiner(args.template_state) if mining else None
+            sink = UnmatchedSink(args.unmatched_dir) if args.unmatched_dir else None
+            ruleset = ProfiledRuleSet.from_yaml(args.rules) if args.profile_rules else None
+            try:
+                results = run_pipeline(
+                    args.log[0],
+                    rules_path=args.rules,
+                    baseline_path=args.baseline,
+                    markers_path=args.markers,
+                    categories_path=args.categories,
+                    spike_threshold=args.spike_threshold,
+                    chunk_size=args.chunk_size,
+                    max_memory_mb=args.max_memory,
+                    cache=cache,
+                    miner=miner,
+                    sink=sink,
+                    ruleset=ruleset,
+                    report_sinks=report_sinks,
+                    workers=args.workers,
+                )
+                if cache is not None:
+                    print(cache.report(), file=sys.stderr)
+                if ruleset is not None:
+                    print(ruleset.format_report(), file=sys.stderr)
+                    for label, check in check_rules(ruleset.rules).items():
+                        if not check["ok"]:
+                            print(f"  costly rule {label}: {check['reason']}", file=sys.stderr)
+            finally:
+                if cache is not None:
+                    cache.close()
+                if sink is not None:
+                    sink.close()
+
+            if miner is not None:
+                if args.template_state:
+                    miner.save()
+                if args.suggest_rules:
+                    # Candidates that duplicate a rule or fail the cost check are dropped
+                    accepted, rejected = augment_rules(miner.candidates(), args.rules, write=False)
+                    for candidate in rejected:
+                        print(f"Rejected mined rule {candidate['label']}: {candidate['reason']}", file=sys.stderr)
+                    with open(args.suggest_rules, "w", encoding="utf-8") as f:
+                        f.write(format_rules_yaml(accepted))
+
+        for writer in writers:
+            writer.close(results["anomaly_summary"], results["unmatched_count"], results["dropped_findings"])
+
+    write_text_report(sys.stdout, results["rca_findings"], results["anomaly_summary"], results["unmatched_count"],
+                      aggregate=args.aggregate, top=args.top, aggregator=aggregator,
+                      dropped=results["dropped_findings"])
+    print()
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,48 +1,276 @@
 # EVTX parser logic placeholder
 # parser/evtx_parser.py
 
+import re
 import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
 from Evtx.Evtx import Evtx
+from Evtx.Nodes import (
+    AttributeNode,
+    BXmlTypeNode,
+    ConditionalSubstitutionNode,
+    NormalSubstitutionNode,
+    OpenStartElementNode,
+    ValueNode,
+)
+
+# Fields a caller may request from iter_evtx()
+EVTX_FIELDS = ("record_num", "event_id", "timestamp", "provider", "level", "event_data", "message")
+
+# Fields returned by parse_evtx(), matching its original output
+DEFAULT_FIELDS = ("event_id", "timestamp", "message")
+
+# Fields returned by iter_evtx() by default; none of them renders XML
+SYSTEM_FIELDS = ("record_num", "event_id", "timestamp", "provider", "level")
+
+# Where each System field lives in the event template: (element, attribute),
+# with attribute None for the element's text
+SYSTEM_SLOTS = {
+    "event_id": ("EventID", None),
+    "provider": ("Provider", "Name"),
+    "level": ("Level", None),
+}
+
+# Fields that need the rendered XML
+XML_FIELDS = ("event_data", "message")
+
+# Chunks (64 KB each) handed to a worker per task
+CHUNKS_PER_TASK = 64
+
+# Files with fewer chunks than this are parsed in-process
+PARALLEL_MIN_CHUNKS = 256
+
+# Fallback extractors for System fields in the rendered XML, used when the
+# template does not hold a field as a single value or substitution
+EVENT_ID_PATTERN = re.compile(r"<EventID[^>]*>(\d+)</EventID>")
+PROVIDER_PATTERN = re.compile(r'<Provider Name="([^"]*)"')
+LEVEL_PATTERN = re.compile(r"<Level>(\d+)</Level>")
 
-def parse_evtx(file_path):
+def _search(pattern, text):
+    match = pattern.search(text)
+    return match.group(1) if match else None
+
+def _event_data(xml_str):
+    # EventData/UserData values keyed by their Name attribute, or by their
+    # position among the Data elements
+    root = ET.fromstring(xml_str)
+    data = {}
+    position = 0
+    for node in root.iter():
+        if node.tag.rsplit("}", 1)[-1] == "Data":
+            data[node.get("Name") or str(position)] = node.text
+            position += 1
+    return data
+
+def _slot(node):
+    # A template value: ("sub", substitution index) or ("value", literal text)
+    if isinstance(node, (NormalSubstitutionNode, ConditionalSubstitutionNode)):
+        return ("sub", node.index())
+    if isinstance(node, ValueNode):
+        return ("value", node.children()[0].string())
+    return None
+
+def _template_slots(template):
     """
-    Parses a Windows EVTX log file and extracts relevant event data.
+    Locates the System fields in an event template.
 
-    Each log entry is converted to a dictionary with:
-    - event_id: The numeric Event ID (e.g., 4624 for login)
-    - timestamp: The time the event occurred (raw from TimeCreated tag)
-    - message: Full XML string of the log record for downstream use
+    Args:
+        template (TemplateNode): Template referenced by a record.
+
+    Returns:
+        Dict[str, tuple]: SYSTEM_SLOTS field -> ("sub", index) or ("value", text),
+        for fields held as a single value or substitution.
+    """
+    slots = {}
+
+    def walk(node, in_system):
+        for child in node.children():
+            if not isinstance(child, OpenStartElementNode):
+                continue
+            tag = child.tag_name()
+            if in_system:
+                for field, (element, attribute) in SYSTEM_SLOTS.items():
+                    if tag != element:
+                        continue
+                    if attribute:
+                        values = [
+                            a.attribute_value() for a in child.children()
+                            if isinstance(a, AttributeNode) and a.attribute_name().string() == attribute
+                        ]
+                    else:
+                        values = [c for c in child.children() if _slot(c)]
+                    if len(values) == 1:
+                        slots[field] = _slot(values[0])
+            walk(child, in_system or tag == "System")
+
+    walk(template, False)
+    return slots
+
+def _system_fields(record, fields, templates):
+    """
+    Reads System fields from a record's substitution values.
+
+    Templates are walked once per chunk (`templates` caches them by their
+    chunk offset), so a record costs one pass over its substitutions
+    instead of a full XML render.
 
     Args:
-        file_path (str): Path to the .evtx log file
+        record (Record): EVTX record.
+        fields (Iterable[str]): Requested SYSTEM_SLOTS fields.
+        templates (dict): Per-chunk cache, template offset -> slots.
 
     Returns:
-        List[Dict[str, str]]: Parsed list of event records
+        Dict[str, str] or None: The fields, or None when one of them is
+        not a plain value in the template (callers fall back to the XML).
     """
-    events = []
+    root = record.root()
+    offset = root.template_instance().template_offset()
+    if offset not in templates:
+        try:
+            templates[offset] = _template_slots(root.template())
+        except Exception:
+            templates[offset] = {}
+    slots = templates[offset]
 
-    # Open the EVTX log file using the Evtx module
-    with Evtx(file_path) as log:
-        for record in log.records():
-            try:
-                # Parse the XML representation of each event
-                xml_str = record.xml()
-                root = ET.fromstring(xml_str)
-
-                # Extract key fields from the XML structure
-                event_id = root.findtext(".//EventID")
-                timestamp = root.findtext(".//TimeCreated")
-                message = ET.tostring(root, encoding='unicode')  # Full XML as string
-
-                # Append parsed event data to the results list
-                events.append({
-                    "event_id": event_id,
-                    "timestamp": timestamp,
-                    "message": message
-                })
+    entry = {}
+    subs = None
+    for field in fields:
+        slot = slots.get(field)
+        if slot is None:
+            return None
+        kind, value = slot
+        if kind == "sub":
+            subs = subs or root.substitutions()
+            if value >= len(subs) or isinstance(subs[value], BXmlTypeNode):
+                return None
+            value = subs[value].string()
+        entry[field] = value or None
+    return entry
+
+def _project_record(record, fields, templates):
+    """
+    Builds the requested subset of fields for a single EVTX record.
+
+    `record_num` and `timestamp` come straight from the binary record
+    header, and the System fields (event_id, provider, level) from the
+    record's substitution values, so the XML view is only rendered when
+    `event_data` or `message` is requested. The timestamp is rendered the
+    way python-evtx renders SystemTime ("YYYY-MM-DD HH:MM:SS.ffffff+00:00").
+    """
+    entry = {}
+    system = [f for f in SYSTEM_SLOTS if f in fields]
+    xml_str = record.xml() if any(f in fields for f in XML_FIELDS) else None
+
+    if "record_num" in fields:
+        entry["record_num"] = record.record_num()
+    if "timestamp" in fields:
+        entry["timestamp"] = record.timestamp().isoformat(" ")
 
+    if system:
+        values = _system_fields(record, system, templates)
+        if values is None:
+            xml_str = xml_str or record.xml()
+            values = {
+                "event_id": _search(EVENT_ID_PATTERN, xml_str),
+                "provider": _search(PROVIDER_PATTERN, xml_str),
+                "level": _search(LEVEL_PATTERN, xml_str),
+            }
+        entry.update((f, values[f]) for f in system)
+
+    if "event_data" in fields:
+        entry["event_data"] = _event_data(xml_str)
+    if "message" in fields:
+        entry["message"] = xml_str  # Full XML as rendered by python-evtx
+
+    return entry
+
+def _iter_header_records(header, fields, start=0, stop=None):
+    for chunk in islice(header.chunks(), start, stop):
+        templates = {}
+        for record in chunk.records():
+            try:
+                yield _project_record(record, fields, templates)
             except Exception:
                 # If a record is malformed or raises an error, skip it
                 continue
 
-    return events
+def _iter_chunk_range(file_path, fields, start=0, stop=None):
+    with Evtx(file_path) as log:
+        yield from _iter_header_records(log.get_file_header(), fields, start, stop)
+
+def _parse_chunk_range(args):
+    file_path, fields, start, stop = args
+    return list(_iter_chunk_range(file_path, fields, start, stop))
+
+def _chunk_count(file_path):
+    with Evtx(file_path) as log:
+        return log.get_file_header().chunk_count()
+
+def iter_evtx(file_path, fields=SYSTEM_FIELDS, workers=None, chunks_per_task=CHUNKS_PER_TASK):
+    """
+    Streams projected event records from a Windows EVTX log file.
+
+    Only the requested fields are extracted. The default projection reads
+    the record header and substitution values only; records are rendered
+    to XML only when `event_data` or `message` is requested. With `workers` > 1, large files are
+    split into chunk ranges parsed on a process pool. Results stream back
+    in record order with a bounded number of ranges in flight.
+
+    Args:
+        file_path (str): Path to the .evtx log file
+        fields (Iterable[str]): Subset of EVTX_FIELDS to return.
+        workers (int, optional): Process count for large files (None = in-process).
+        chunks_per_task (int): EVTX chunks parsed per worker task.
+
+    Yields:
+        dict: One entry per record holding the requested fields.
+    """
+    fields = frozenset(fields)
+    unknown = fields - set(EVTX_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown EVTX fields: {sorted(unknown)}")
+
+    total = _chunk_count(file_path) if workers and workers > 1 else 0
+    if total < PARALLEL_MIN_CHUNKS:
+        yield from _iter_chunk_range(file_path, fields)
+        return
+
+    tasks = (
+        (file_path, fields, start, min(start + chunks_per_task, total))
+        for start in range(0, total, chunks_per_task)
+    )
+
+    # Keep a sliding window of submitted ranges so memory stays bounded
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque(pool.submit(_parse_chunk_range, t) for t in islice(tasks, workers * 2))
+        while pending:
+            events = pending.popleft().result()
+            task = next(tasks, None)
+            if task is not None:
+                pending.append(pool.submit(_parse_chunk_range, task))
+            yield from events
+
+def parse_evtx(file_path, fields=DEFAULT_FIELDS, workers=None):
+    """
+    Parses a Windows EVTX log file and extracts relevant event data.
+
+    Each log entry is converted to a dictionary with:
+    - event_id: The numeric Event ID (e.g., 4624 for login)
+    - timestamp: The time the record was written (record header; equals
+      TimeCreated except for forwarded events), "YYYY-MM-DD HH:MM:SS.ffffff+00:00"
+    - message: Full XML string of the log record for downstream use
+
+    List form of iter_evtx(); pass `fields` to request other projections.
+
+    Args:
+        file_path (str): Path to the .evtx log file
+        fields (Iterable[str]): Subset of EVTX_FIELDS to return.
+        workers (int, optional): Process count for large files.
+
+    Returns:
+        List[Dict[str, str]]: Parsed list of event records
+    """
+    return list(iter_evtx(file_path, fields=fields, workers=workers))
@@ -1,13 +1,242 @@
 # parser/msi_parser.py
 
+import codecs
+import io
+import mmap
 import re
 
+from utils.compression import PrefixedStream, open_log
+
 # Regular expressions to extract structured error information
 TIMESTAMP_PATTERN = re.compile(r"\d{1,2}:\d{2}:\d{2}\s*(AM|PM)?")
 ERROR_CODE_PATTERN = re.compile(r"Error\s*(\d+)")
-ACTION_PATTERN = re.compile(r"Action\s+start\s+\d+:\d+:\d+\s+([^\r\n]+)")
+ACTION_PATTERN = re.compile(r"Action\s+start\s+\d+:\d+:\d+:?\s+([^\r\n]+)")
+ACTION_END_PATTERN = re.compile(r"Action\s+ended\s+\d+:\d+:\d+:?\s+([^\r\n.]+)")
 RETURN_3_PATTERN = re.compile(r"Return value 3")
 
+# Markers located with byte-level find; everything between them is skipped
+ERROR_MARKERS = ("Return value 3", "Error")
+ACTION_MARKERS = ("Action start", "Action ended")
+
+def _action_name(text):
+    # "InstallFiles." -> "InstallFiles"
+    return text.strip().rstrip(".").strip()
+
+def _detect_encoding(buf):
+    """
+    Returns (encoding, data offset, code unit size) for an MSI log buffer.
+
+    Verbose MSI logs are commonly UTF-16LE, with or without a BOM.
+    """
+    head = buf[:4]
+    if head.startswith(codecs.BOM_UTF16_LE):
+        return "utf-16-le", 2, 2
+    if head.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16-be", 2, 2
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8", 3, 1
+    if len(head) >= 4 and head[1] == 0 and head[3] == 0 and head[0] and head[2]:
+        return "utf-16-le", 0, 2
+    return "utf-8", 0, 1
+
+class _AlignedBuffer:
+    """
+    Byte-level find/rfind over a mapped log that respects code unit alignment,
+    so a UTF-16 needle never matches across two characters.
+    """
+
+    def __init__(self, buf, encoding, base, unit):
+        self.buf = buf
+        self.encoding = encoding
+        self.base = base
+        self.unit = unit
+        self.newline = "\n".encode(encoding)
+
+    def encode(self, text):
+        return text.encode(self.encoding)
+
+    def find(self, needle, start):
+        pos = self.buf.find(needle, start)
+        while pos != -1 and (pos - self.base) % self.unit:
+            pos = self.buf.find(needle, pos + 1)
+        return pos
+
+    def line_bounds(self, pos):
+        # Start and end (exclusive, before the newline) of the line holding pos
+        start = self.buf.rfind(self.newline, self.base, pos)
+        while start != -1 and (start - self.base) % self.unit:
+            start = self.buf.rfind(self.newline, self.base, start)
+        start = self.base if start == -1 else start + len(self.newline)
+
+        end = self.find(self.newline, pos)
+        if end == -1:
+            end = len(self.buf)
+        return start, end
+
+    def decode(self, start, end):
+        return self.buf[start:end].decode(self.encoding, errors="ignore")
+
+def _build_entry(line, current_action):
+    entry = {
+        "raw": line.strip(),
+        "timestamp": None,
+        "error_code": None,
+        "action": current_action,
+        "return_value_3": False
+    }
+
+    # Extract timestamp if available
+    ts_match = TIMESTAMP_PATTERN.search(line)
+    if ts_match:
+        entry["timestamp"] = ts_match.group()
+
+    # Extract error code (e.g., Error 1603)
+    error_match = ERROR_CODE_PATTERN.search(line)
+    if error_match:
+        entry["error_code"] = error_match.group(1)
+
+    # An action named on the line itself wins over the running context
+    action_match = ACTION_PATTERN.search(line) or ACTION_END_PATTERN.search(line)
+    if action_match:
+        entry["action"] = _action_name(action_match.group(1))
+
+    # Flag if line contains "Return value 3"
+    if RETURN_3_PATTERN.search(line):
+        entry["return_value_3"] = True
+
+    return entry
+
+def _feed_line(line, actions):
+    """
+    Processes one candidate line against the running action stack.
+
+    Args:
+        line (str): Decoded log line.
+        actions (List[str]): Stack of running actions (they nest in MSI logs),
+            updated in place.
+
+    Returns:
+        dict or None: Error entry if the line carries an error marker.
+    """
+    entry = None
+    if any(m in line for m in ERROR_MARKERS):
+        entry = _build_entry(line, actions[-1] if actions else None)
+
+    started = ACTION_PATTERN.search(line)
+    if started:
+        actions.append(_action_name(started.group(1)))
+    else:
+        ended = ACTION_END_PATTERN.search(line)
+        if ended:
+            name = _action_name(ended.group(1))
+            if name in actions:
+                # Drop the ended action and anything left open inside it
+                del actions[len(actions) - 1 - actions[::-1].index(name):]
+
+    return entry
+
+def iter_msi_stream(stream):
+    """
+    Streams structured error entries from a sequential binary stream.
+
+    Used for compressed logs, which cannot be memory-mapped: lines are
+    decoded incrementally and only those holding a marker are parsed.
+
+    Args:
+        stream (BinaryIO): Readable (already decompressed) binary stream.
+
+    Yields:
+        dict: Parsed error events in stream order
+    """
+    head = stream.read(4)
+    encoding, base, _ = _detect_encoding(head)
+    reader = io.TextIOWrapper(
+        io.BufferedReader(PrefixedStream(head[base:], stream)),
+        encoding=encoding, errors="ignore", newline=None,
+    )
+
+    markers = ERROR_MARKERS + ACTION_MARKERS
+    actions = []
+    for line in reader:
+        if any(m in line for m in markers):
+            entry = _feed_line(line, actions)
+            if entry is not None:
+                yield entry
+
+def iter_msi_buffer(buf):
+    """
+    Streams structured error entries from an in-memory or mapped MSI log.
+
+    Works on any buffer supporting find/rfind/slicing (bytes, mmap), which
+    lets archive members be parsed without extracting them to disk.
+
+    Args:
+        buf (bytes or mmap.mmap): Raw MSI log content.
+
+    Yields:
+        dict: Parsed error events in buffer order
+    """
+    text = _AlignedBuffer(buf, *_detect_encoding(buf))
+    error_needles = [text.encode(m) for m in ERROR_MARKERS]
+    action_needles = [text.encode(m) for m in ACTION_MARKERS]
+    needles = error_needles + action_needles
+
+    # Next hit per needle; only refreshed once the scan passes it
+    next_hits = [text.find(n, text.base) for n in needles]
+    actions = []
+    pos = text.base
+
+    while True:
+        live = [hit for hit in next_hits if hit != -1]
+        if not live:
+            break
+
+        start, end = text.line_bounds(min(live))
+        entry = _feed_line(text.decode(start, end), actions)
+        if entry is not None:
+            yield entry
+
+        pos = end + len(text.newline)
+        next_hits = [
+            hit if hit == -1 or hit >= pos else text.find(needle, pos)
+            for hit, needle in zip(next_hits, needles)
+        ]
+
+def iter_msi_log(path, workers=None):
+    """
+    Streams structured error entries from an MSI installer log.
+
+    The file is memory-mapped and scanned with byte-level find for the
+    error and action markers, so lines without them are never decoded.
+    "Action start"/"Action ended" lines maintain a stack of running
+    actions, and every error is attributed to the innermost active action.
+    UTF-8 and UTF-16 (with or without BOM) logs are handled directly.
+    Compressed logs (gzip/bz2/xz/zstd) are decompressed on the fly and
+    scanned line by line instead.
+
+    Args:
+        path (str): Path to the .msi log file
+        workers (int, optional): Threads for parallel BGZF decompression
+
+    Yields:
+        dict: Parsed error events in file order
+    """
+    with open_log(path, workers) as (f, compression):
+        if compression is not None:
+            yield from iter_msi_stream(f)
+            return
+
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files cannot be mapped
+            return
+
+        try:
+            yield from iter_msi_buffer(buf)
+        finally:
+            buf.close()
+
 def parse_msi_log(path):
     """
     Parses an MSI installer log file for structured error-related information.
@@ -19,7 +248,9 @@ def parse_msi_log(path):
     Also attempts to extract:
     - Timestamp (if present)
     - Error code (e.g., Error 1603)
-    - Action or component name (if found in context)
+    - Action or component name (the action running when the error occurred)
+
+    List form of iter_msi_log().
 
     Args:
         path (str): Path to the .msi log file
@@ -27,38 +258,4 @@ def parse_msi_log(path):
     Returns:
         List[dict]: Parsed and structured error events
     """
-    results = []
-
-    with open(path, 'r', errors='ignore') as f:
-        for line in f:
-            if "Return value 3" in line or "Error" in line:
-                entry = {
-                    "raw": line.strip(),
-                    "timestamp": None,
-                    "error_code": None,
-                    "action": None,
-                    "return_value_3": False
-                }
-
-                # Extract timestamp if available
-                ts_match = TIMESTAMP_PATTERN.search(line)
-                if ts_match:
-                    entry["timestamp"] = ts_match.group()
-
-                # Extract error code (e.g., Error 1603)
-                error_match = ERROR_CODE_PATTERN.search(line)
-                if error_match:
-                    entry["error_code"] = error_match.group(1)
-
-                # Try to extract an action/component name
-                action_match = ACTION_PATTERN.search(line)
-                if action_match:
-                    entry["action"] = action_match.group(1).strip()
-
-                # Flag if line contains "Return value 3"
-                if RETURN_3_PATTERN.search(line):
-                    entry["return_value_3"] = True
-
-                results.append(entry)
-
-    return results
+    return list(iter_msi_log(path))
@@ -1,9 +1,10 @@
 # Regex parser for generic logs
 # parser/regex_parser.py
 
-import re
 import yaml
 
+from analyzer.signature_matcher import compile_rules
+
 def load_patterns(yaml_file="config/rules.yml"):
     """
     Loads regex patterns from a YAML file.
@@ -14,7 +15,7 @@ def load_patterns(yaml_file="config/rules.yml"):
     Example:
     --------
     login_failure: "Failed login for user .*"
-    timeout_error: "Request timed out after \d+ ms"
+    timeout_error: "Request timed out after \\d+ ms"
 
     Args:
         yaml_file (str): Path to the rules YAML file.
@@ -26,7 +27,7 @@ def load_patterns(yaml_file="config/rules.yml"):
         return yaml.safe_load(f)
 
 
-def parse_text_log(lines, patterns):
+def parse_text_log(lines, patterns, scan=None):
     """
     Parses plain text logs using user-defined regex rules.
 
@@ -36,20 +37,20 @@ def parse_text_log(lines, patterns):
 
     Args:
         lines (List[str]): List of log lines (cleaned + redacted).
-        patterns (dict): Dictionary of named regex rules.
+        patterns (dict or SignatureRuleSet): Dictionary of named regex rules.
+        scan (tuple, optional): Precomputed SignatureRuleSet.scan() result
+            for `lines`; avoids rescanning the log.
 
     Returns:
-        List[dict]: List of matched results containing pattern name and matched line.
+        List[dict]: List of matched results containing pattern name and
+        matched line (as given, not trimmed).
     """
-    results = []
-
-    for line in lines:
-        for name, rule in patterns.items():
-            # Use re.search to find matches anywhere in the line
-            if re.search(rule, line):
-                results.append({
-                    "pattern": name,
-                    "matched": line
-                })
-
-    return results
+    if scan is None:
+        return [
+            {"pattern": label, "matched": line}
+            for _, line, labels in compile_rules(patterns).iter_matches(lines)
+            for label in labels
+        ]
+
+    # Scan records hold the trimmed line; report the line itself
+    return [{"pattern": match["pattern"], "matched": lines[match["line"] - 1]} for match in scan[0]]
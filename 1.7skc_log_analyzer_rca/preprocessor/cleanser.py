@@ -1,35 +1,150 @@
 # Cleanse log lines and normalize text
 # preprocessor/cleanser.py
 
+import codecs
+import io
+
 import chardet
 
+from utils.compression import decompress_stream, open_log
+
+# Bytes fed to chardet; detection cost stays fixed regardless of file size
+ENCODING_SAMPLE_SIZE = 64 * 1024
+
+# Bytes decoded per read while streaming
+CHUNK_SIZE = 1024 * 1024
+
+# Byte-order marks checked before falling back to chardet.
+# UTF-32 must be tested before UTF-16 since FF FE is a prefix of FF FE 00 00.
+BOM_ENCODINGS = [
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+]
+
+def detect_encoding(sample):
+    """
+    Detects the text encoding of a log from a bounded byte sample.
+
+    A byte-order mark short-circuits detection entirely. Otherwise chardet
+    runs on the sample only. ASCII results are widened to UTF-8, since a
+    sample that happens to be pure ASCII says nothing about the rest of the file.
+
+    Args:
+        sample (bytes): Leading bytes of the log.
+
+    Returns:
+        str: Codec name usable with codecs/bytes.decode.
+    """
+    for bom, encoding in BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+
+    detected = chardet.detect(sample)
+    encoding = detected['encoding'] or 'utf-8'
+    if encoding.lower() == 'ascii':
+        encoding = 'utf-8'
+    return encoding
+
+def _clean(line):
+    # Same per-line rules as the list API: strip and drop null characters
+    return line.strip().replace('\x00', '')
+
+def iter_text_lines(text):
+    """
+    Splits already-decoded text into cleaned, non-empty lines.
+
+    Applies the same rules as iter_cleansed_lines() to text decoded
+    elsewhere (e.g. bytes appended to a followed log).
+
+    Args:
+        text (str): Decoded text holding complete lines.
+
+    Yields:
+        str: Cleaned, non-empty log lines.
+    """
+    for line in text.splitlines():
+        if line.strip():
+            yield _clean(line)
+
+def iter_cleansed_lines(source, chunk_size=CHUNK_SIZE, sample_size=ENCODING_SAMPLE_SIZE,
+                        decompress=True, workers=None):
+    """
+    Streams cleaned log lines from a file path or binary stream.
+
+    gzip/bz2/xz/zstd input is detected by magic bytes and decompressed
+    on the fly (see utils.compression).
+
+    Only `sample_size` bytes are used for encoding detection and the rest
+    is decoded incrementally in `chunk_size` pieces, so peak memory is
+    bounded by the chunk size plus the longest line rather than the file size.
+
+    Args:
+        source (str or BinaryIO): Path to a log file or a binary file-like object
+            (plain or compressed).
+        chunk_size (int): Bytes read per decode step.
+        sample_size (int): Bytes inspected for encoding detection.
+        decompress (bool): Detect and undo compression on stream input
+            (disable for streams the caller already decompressed).
+        workers (int, optional): Threads for parallel BGZF decompression of
+            path input (see open_log()).
+
+    Yields:
+        str: Cleaned, non-empty log lines.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    if hasattr(source, "read"):
+        stream = decompress_stream(source)[0] if decompress else source
+        yield from _iter_stream_lines(stream, chunk_size, sample_size)
+    else:
+        with open_log(source, workers) as (stream, _):
+            yield from _iter_stream_lines(stream, chunk_size, sample_size)
+
+def _iter_stream_lines(stream, chunk_size, sample_size):
+    sample = stream.read(sample_size)
+    decoder = codecs.getincrementaldecoder(detect_encoding(sample))(errors='replace')
+
+    pending = ""
+    data = sample
+    while True:
+        final = not data
+        text = pending + decoder.decode(data, final=final)
+
+        lines = text.splitlines(keepends=True)
+        # Hold back a trailing partial line until more data arrives
+        if lines and not final and lines[-1] == lines[-1].splitlines()[0]:
+            pending = lines.pop()
+        else:
+            pending = ""
+
+        for line in lines:
+            if line.strip():  # Remove empty or whitespace-only lines
+                yield _clean(line)
+
+        if final:
+            break
+        data = stream.read(chunk_size)
+
 def cleanse_log_lines(raw_bytes):
     """
     Decodes raw log bytes into clean, structured lines.
 
     Steps:
-    1. Detect encoding using chardet.
-    2. Decode using detected encoding (fallback to UTF-8).
+    1. Detect encoding from a bounded sample (BOM first, then chardet).
+    2. Decode incrementally using the detected encoding (fallback to UTF-8).
     3. Strip lines, remove null bytes and discard empty/noisy lines.
 
+    This is the list form of iter_cleansed_lines(); prefer the generator
+    for large files.
+
     Args:
         raw_bytes (bytes): Raw content from log file.
 
     Returns:
         List[str]: Cleaned log lines.
     """
-    # Detect encoding (fallback to utf-8 if unknown)
-    detected = chardet.detect(raw_bytes)
-    encoding = detected['encoding'] or 'utf-8'
-
-    # Decode with replacement for bad bytes
-    text = raw_bytes.decode(encoding, errors='replace')
-
-    # Strip lines and remove null characters
-    lines = text.splitlines()
-    cleaned = [
-        line.strip().replace('\x00', '')
-        for line in lines
-        if line.strip()  # Remove empty or whitespace-only lines
-    ]
-    return cleaned
+    return list(iter_cleansed_lines(io.BytesIO(raw_bytes)))
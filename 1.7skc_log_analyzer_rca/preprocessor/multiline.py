@@ -13,7 +13,163 @@ import re
 # This helps separate distinct log entries from continuation lines like stack traces.
 TIMESTAMP_PATTERN = re.compile(r"^\[?\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}")
 
-def merge_multiline_events(lines):
+# Safety limits for a single merged entry. Continuation lines past either
+# limit are dropped and counted in a truncation marker instead.
+MAX_ENTRY_LINES = 10_000
+MAX_ENTRY_CHARS = 1_000_000
+TRUNCATION_MARKER = "... [TRUNCATED {count} lines]"
+
+def compile_start_patterns(start_patterns=None):
+    """
+    Normalizes start-of-event patterns into a list of compiled regexes.
+
+    Args:
+        start_patterns (Iterable[str or Pattern], optional): Patterns that mark
+            the first line of a new event. Defaults to TIMESTAMP_PATTERN.
+
+    Returns:
+        List[Pattern]: Compiled patterns, applied with .match().
+    """
+    if not start_patterns:
+        return [TIMESTAMP_PATTERN]
+    return [re.compile(p) if isinstance(p, str) else p for p in start_patterns]
+
+class MultilineMerger:
+    """
+    Incremental multiline merger that keeps the trailing entry open.
+
+    Lines are fed one at a time; a merged entry is returned only once the
+    next start-of-event line proves it complete. This lets appended data be
+    merged as it arrives (follow mode) without re-reading earlier lines.
+    state()/from_state() round-trip the open entry through JSON.
+
+    Args:
+        start_patterns (Iterable[str or Pattern], optional): Start-of-event patterns.
+        max_lines (int, optional): Max lines kept per entry (None = unlimited).
+        max_chars (int, optional): Max characters kept per entry (None = unlimited).
+    """
+
+    def __init__(self, start_patterns=None, max_lines=MAX_ENTRY_LINES, max_chars=MAX_ENTRY_CHARS):
+        self.patterns = compile_start_patterns(start_patterns)
+        self._single = self.patterns[0] if len(self.patterns) == 1 else None
+        self.max_lines = max_lines
+        self.max_chars = max_chars
+
+        self.line_no = 0    # Lines fed so far
+        self.parts = []     # Lines of the entry being built
+        self.size = 0       # Characters held in parts
+        self.dropped = 0    # Continuation lines discarded by the limits
+        self.start_no = 1   # Line number the current entry started on
+
+    def _is_start(self, line):
+        single = self._single
+        return single.match(line) if single else any(p.match(line) for p in self.patterns)
+
+    def add(self, line):
+        """
+        Feeds the next line.
+
+        Args:
+            line (str): Redacted and cleansed log line.
+
+        Returns:
+            Tuple[int, str] or None: (start line number, entry) when the line
+            completes the previous entry.
+        """
+        self.line_no += 1
+        if self._is_start(line):
+            # A new log line starts; finalize the previous entry
+            finished = self.flush()
+            self.parts = [line]
+            self.start_no = self.line_no
+            self.size = len(line)
+            return finished
+
+        parts = self.parts
+        if not parts:
+            # Leading continuation lines form their own entry
+            parts.append("")
+
+        if self.dropped or (self.max_lines is not None and len(parts) >= self.max_lines) \
+                or (self.max_chars is not None and self.size + len(line) > self.max_chars):
+            self.dropped += 1
+            return None
+
+        # Append continuation lines (like stack traces)
+        parts.append(line)
+        self.size += len(line) + 1
+        return None
+
+    def flush(self):
+        """
+        Closes the open entry (end of input, rotation or truncation).
+
+        Returns:
+            Tuple[int, str] or None: (start line number, entry) if one was open.
+        """
+        if not self.parts:
+            return None
+        if self.dropped:
+            self.parts.append(TRUNCATION_MARKER.format(count=self.dropped))
+        entry = "\n".join(self.parts).strip()
+        self.parts = []
+        self.size = 0
+        self.dropped = 0
+        return self.start_no, entry
+
+    def state(self):
+        """Returns the line counter and open entry as a JSON-serializable dict."""
+        return {
+            "line_no": self.line_no,
+            "parts": list(self.parts),
+            "size": self.size,
+            "dropped": self.dropped,
+            "start_no": self.start_no,
+        }
+
+    def restore(self, state):
+        """Reloads a dict produced by state()."""
+        self.line_no = state["line_no"]
+        self.parts = list(state["parts"])
+        self.size = state["size"]
+        self.dropped = state["dropped"]
+        self.start_no = state["start_no"]
+
+def iter_merged_events(lines, start_patterns=None,
+                       max_lines=MAX_ENTRY_LINES, max_chars=MAX_ENTRY_CHARS,
+                       with_line_numbers=False):
+    """
+    Streams merged log entries from any iterable of lines.
+
+    Continuation lines are collected in a list and joined once per entry,
+    so long stack traces cost linear rather than quadratic time. Entries
+    that exceed `max_lines` or `max_chars` stop accumulating and end with
+    a truncation marker, bounding memory for runaway entries.
+
+    Args:
+        lines (Iterable[str]): Redacted and cleansed log lines.
+        start_patterns (Iterable[str or Pattern], optional): Start-of-event patterns.
+        max_lines (int, optional): Max lines kept per entry (None = unlimited).
+        max_chars (int, optional): Max characters kept per entry (None = unlimited).
+        with_line_numbers (bool): Yield (first line number, entry) pairs instead.
+
+    Yields:
+        str or Tuple[int, str]: Merged log entries (1-based start line if requested).
+    """
+    merger = MultilineMerger(start_patterns, max_lines, max_chars)
+    add = merger.add
+    for line in lines:
+        finished = add(line)
+        if finished is not None:
+            yield finished if with_line_numbers else finished[1]
+
+    # Emit the last buffered entry if it exists
+    finished = merger.flush()
+    if finished is not None:
+        yield finished if with_line_numbers else finished[1]
+
+def merge_multiline_events(lines, start_patterns=None,
+                           max_lines=MAX_ENTRY_LINES, max_chars=MAX_ENTRY_CHARS):
     """
     Merges multi-line log entries into single strings.
 
@@ -21,27 +177,15 @@ def merge_multiline_events(lines):
     but only the first line starts with a timestamp.
     This function stitches related lines together.
 
+    List form of iter_merged_events(); see it for the limit arguments.
+
     Args:
         lines (List[str]): Redacted and cleansed log lines.
+        start_patterns (Iterable[str or Pattern], optional): Start-of-event patterns.
+        max_lines (int, optional): Max lines kept per entry.
+        max_chars (int, optional): Max characters kept per entry.
 
     Returns:
         List[str]: Log entries where multi-line messages have been merged.
     """
-    merged = []  # Final output list
-    buffer = ""  # Temporary accumulator for a single merged log entry
-
-    for line in lines:
-        if TIMESTAMP_PATTERN.match(line):
-            # If a new log line starts and buffer has data, finalize it
-            if buffer:
-                merged.append(buffer.strip())
-            buffer = line  # Start a new log entry
-        else:
-            # Append continuation lines (like stack traces)
-            buffer += "\n" + line
-
-    # Append the last buffered entry if it exists
-    if buffer:
-        merged.append(buffer.strip())
-
-    return merged
+    return list(iter_merged_events(lines, start_patterns, max_lines, max_chars))
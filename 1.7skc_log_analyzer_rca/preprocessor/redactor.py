@@ -1,5 +1,6 @@
 # Redact sensitive information from logs
 import re
+from concurrent.futures import ProcessPoolExecutor
 
 # Predefined regex patterns to detect and redact sensitive data
 REDACTION_PATTERNS = {
@@ -16,28 +17,82 @@ REDACTION_PATTERNS = {
     "TOOL": r"\b(?:internal_[a-zA-Z0-9_]+|tool_[a-zA-Z0-9_]+)\b",  # internal_toolX or tool_xyz
 }
 
+# Cheap presence checks run before each redaction regex. A category's
+# pattern is only applied when the line contains every character its
+# matches require, so most categories are skipped without a regex scan.
+_DIGIT = re.compile(r"\d")
+_CATEGORY_GUARDS = {
+    "IP": (".", True),          # (required literal, requires a digit)
+    "EMAIL": ("@", False),
+    "USERNAME": ("=", False),
+    "PII": (None, True),
+    "SERIAL": ("-", False),
+    "FOLDER": ("/", False),
+    "VERSION": (".", True),
+    "TOOL": ("_", False),
+}
+
+# Lines below this count are redacted in-process; the pool isn't worth starting
+POOL_MIN_LINES = 200_000
+POOL_CHUNK_LINES = 50_000
+
+# Compiled once, in REDACTION_PATTERNS order: (pattern, replacement, literal, needs_digit)
+COMPILED_PATTERNS = [
+    (re.compile(pattern), f"[REDACTED_{label}]") + _CATEGORY_GUARDS[label]
+    for label, pattern in REDACTION_PATTERNS.items()
+]
+
 def redact_line(line):
     """
     Redacts sensitive patterns in a single line.
-    
+
+    Categories are applied in REDACTION_PATTERNS order, since earlier
+    replacements shadow later patterns. A category whose required
+    characters (e.g. '@', '/', a digit) are absent from the line is
+    skipped without running its regex.
+
     Args:
         line (str): A log line.
 
     Returns:
         str: Redacted log line.
     """
-    for label, pattern in REDACTION_PATTERNS.items():
-        line = re.sub(pattern, f"[REDACTED_{label}]", line)
+    has_digit = None
+    for pattern, token, literal, needs_digit in COMPILED_PATTERNS:
+        if literal is not None and literal not in line:
+            continue
+        if needs_digit:
+            if has_digit is None:
+                has_digit = _DIGIT.search(line) is not None
+            if not has_digit:
+                continue
+        line = pattern.sub(token, line)
     return line
 
-def redact_log(lines):
+def _redact_chunk(lines):
+    return [redact_line(line) for line in lines]
+
+def redact_log(lines, workers=None, chunk_lines=POOL_CHUNK_LINES):
     """
     Applies redaction to a list of log lines.
 
+    With `workers` set and a large enough input, chunks of lines are
+    redacted on a process pool. Output order always matches input order.
+
     Args:
         lines (List[str]): Cleaned log lines.
+        workers (int, optional): Process count for large inputs (None = in-process).
+        chunk_lines (int): Lines sent to a worker per task.
 
     Returns:
         List[str]: Redacted log lines.
     """
-    return [redact_line(line) for line in lines]
+    if not workers or workers < 2 or len(lines) < POOL_MIN_LINES:
+        return _redact_chunk(lines)
+
+    chunks = [lines[i:i + chunk_lines] for i in range(0, len(lines), chunk_lines)]
+    redacted = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in pool.map(_redact_chunk, chunks):
+            redacted.extend(chunk)
+    return redacted
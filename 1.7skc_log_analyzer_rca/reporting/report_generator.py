@@ -1,51 +1,309 @@
 # Convert results to PDF or HTML reports
 # report/report_generator.py
+#
+# Reports are written to a file handle as they are produced; findings are
+# never joined into one string. Per-pattern aggregation and top-N
+# truncation keep report size bounded by the rule count, not the findings.
 
+import heapq
+import io
 import json
+from collections import Counter
 from datetime import datetime
 
-def generate_text_report(rca_results, anomaly_summary, unmatched_count):
+# Fields kept per pattern when aggregating findings
+PATTERN_FIELDS = ("pattern", "rca", "count", "findings", "first_line", "last_line", "content")
+
+class PatternAggregator:
     """
-    Generates a human-readable text report for CLI or export.
+    Folds findings into one row per pattern.
+
+    Memory is bounded by the number of distinct patterns. A finding that
+    stands for repeated stack traces counts its `occurrences`.
+    """
+
+    def __init__(self):
+        self.rows = {}
+        self._causes = {}
+
+    def add(self, finding):
+        """
+        Counts one finding.
+
+        Args:
+            finding (dict): RCA finding (line, pattern, content, rca, ...).
+        """
+        pattern = finding["pattern"]
+        occurrences = finding.get("occurrences", 1)
+        last_line = finding.get("last_line", finding["line"])
+        row = self.rows.get(pattern)
+        if row is None:
+            self.rows[pattern] = {
+                "pattern": pattern,
+                "rca": finding.get("rca"),
+                "count": occurrences,
+                "findings": 1,
+                "first_line": finding["line"],
+                "last_line": last_line,
+                "content": finding.get("content"),
+            }
+            self._causes[pattern] = Counter({finding.get("rca"): occurrences})
+            return
+        row["count"] += occurrences
+        row["findings"] += 1
+        row["first_line"] = min(row["first_line"], finding["line"])
+        row["last_line"] = max(row["last_line"], last_line)
+        self._causes[pattern][finding.get("rca")] += occurrences
+
+    # Lets the aggregator be used as a report sink next to FindingsWriter
+    write = add
+
+    def report(self, top=None):
+        """
+        Returns pattern rows, most frequent first.
+
+        Args:
+            top (int, optional): Limit to the `top` most frequent patterns.
+
+        Returns:
+            List[dict]: Rows with PATTERN_FIELDS; `rca` is the most common cause.
+        """
+        for pattern, row in self.rows.items():
+            row["rca"] = self._causes[pattern].most_common(1)[0][0]
+        key = lambda row: row["count"]
+        if top:
+            return heapq.nlargest(top, self.rows.values(), key=key)
+        return sorted(self.rows.values(), key=key, reverse=True)
+
+def _indent(text, prefix):
+    # Re-indents nested json.dumps(indent=2) output to its depth in the document
+    return text.replace("\n", "\n" + prefix)
+
+class FindingsWriter:
+    """
+    Streams RCA findings to a file handle as NDJSON or a JSON document.
+
+    Findings are written as they are passed to write(); nothing but the
+    optional pattern aggregate is held in memory. close() appends the
+    anomaly summary and counters.
+
+    NDJSON: one record per line, tagged by "record" ("finding", "pattern"
+    or "summary"); the summary record comes last.
+
+    JSON: the same document generate_json_report() produces, with the
+    findings array written incrementally.
 
     Args:
-        rca_results (List[dict]): List of RCA matches with line, pattern, and optional exception summary.
+        out (TextIO): Writable file handle.
+        fmt (str): "ndjson" or "json".
+        aggregate (bool): Write one row per pattern instead of each finding.
+        top (int, optional): Findings written (or, when aggregating,
+            patterns); the rest are only counted.
+    """
+
+    def __init__(self, out, fmt="ndjson", aggregate=False, top=None):
+        if fmt not in ("ndjson", "json"):
+            raise ValueError(f"Unknown report format: {fmt}")
+        self.out = out
+        self.fmt = fmt
+        self.top = top
+        self.aggregator = PatternAggregator() if aggregate else None
+        self.written = 0
+        self.truncated = 0
+        self.timestamp = datetime.now().isoformat()
+
+        if fmt == "json":
+            out.write('{\n  "timestamp": ' + json.dumps(self.timestamp))
+            out.write(',\n  "rca_patterns": ' if aggregate else ',\n  "rca_findings": ')
+
+    def _write_item(self, record, kind):
+        if self.fmt == "ndjson":
+            self.out.write(json.dumps({"record": kind, **record}) + "\n")
+        else:
+            self.out.write(",\n    " if self.written else "[\n    ")
+            self.out.write(_indent(json.dumps(record, indent=2), "    "))
+        self.written += 1
+
+    def write(self, finding):
+        """
+        Writes (or aggregates) one finding.
+
+        Args:
+            finding (dict): RCA finding.
+        """
+        if self.aggregator is not None:
+            self.aggregator.add(finding)
+        elif self.top is not None and self.written >= self.top:
+            self.truncated += 1
+        else:
+            self._write_item(finding, "finding")
+
+    def write_all(self, findings):
+        """
+        Writes findings from any iterable, e.g. a generator.
+
+        Args:
+            findings (Iterable[dict]): RCA findings.
+        """
+        for finding in findings:
+            self.write(finding)
+
+    def close(self, anomaly_summary, unmatched_count, dropped_findings=0):
+        """
+        Writes the pattern rows (if aggregating) and the closing summary.
+
+        The file handle itself is left open.
+
+        Args:
+            anomaly_summary (dict): Anomaly detection summary.
+            unmatched_count (int): Number of unmatched lines.
+            dropped_findings (int): Findings the analysis did not keep in
+                memory past its cap (still written here if passed to write()).
+        """
+        if self.aggregator is not None:
+            rows = self.aggregator.report(self.top)
+            self.truncated = len(self.aggregator.rows) - len(rows)
+            for row in rows:
+                self._write_item(row, "pattern")
+
+        summary = {"anomaly_summary": anomaly_summary, "unmatched_count": unmatched_count}
+        if self.truncated:
+            summary["truncated"] = self.truncated
+        if dropped_findings:
+            summary["dropped_findings"] = dropped_findings
+
+        if self.fmt == "ndjson":
+            self.out.write(json.dumps({"record": "summary", "timestamp": self.timestamp, **summary}) + "\n")
+            return
+        self.out.write("\n  ]" if self.written else "[]")
+        for key, value in summary.items():
+            self.out.write(",\n  " + json.dumps(key) + ": " + _indent(json.dumps(value, indent=2), "  "))
+        self.out.write("\n}")
+
+class FindingPrinter:
+    """
+    Report sink printing each new finding as one "path:line: [pattern] content" line.
+
+    Repeats of a grouped stack trace (records with `repeat_of`) are only
+    counted, not printed.
+
+    Args:
+        out (TextIO): Writable file handle.
+        path (str, optional): Log the findings come from; callers following
+            several logs set it before the findings of each are written.
+    """
+
+    def __init__(self, out, path=None):
+        self.out = out
+        self.path = path
+        self.repeats = 0
+
+    def write(self, finding):
+        """
+        Prints one finding.
+
+        Args:
+            finding (dict): RCA finding.
+        """
+        if "repeat_of" in finding:
+            self.repeats += 1
+            return
+        self.out.write(f"{self.path}:{finding['line']}: [{finding['pattern']}] {finding['content']}\n")
+
+def write_text_report(out, rca_results, anomaly_summary, unmatched_count, aggregate=False, top=None,
+                      aggregator=None, dropped=0):
+    """
+    Writes the human-readable report line by line.
+
+    Args:
+        out (TextIO): Writable file handle.
+        rca_results (Iterable[dict]): RCA findings, e.g. a generator.
         anomaly_summary (dict): Output from summarize_anomalies().
         unmatched_count (int): Number of unmatched lines (Phase 5 feedback).
-
-    Returns:
-        str: Full plaintext report.
+        aggregate (bool): List one line per pattern instead of each finding.
+        top (int, optional): Findings (or patterns) listed; the rest are counted.
+        aggregator (PatternAggregator, optional): Already fed with every
+            finding (e.g. as a pipeline report sink); used instead of
+            aggregating `rca_results`, which may be capped.
+        dropped (int): Findings left out of a capped `rca_results`; added to
+            the "more not shown" count when listing findings.
     """
-    report = []
+    write = lambda text: out.write(text + "\n")
 
     # Header
-    report.append(f"SKC Log Analyzer Report - {datetime.now().isoformat()}")
-    report.append("=" * 60)
+    write(f"SKC Log Analyzer Report - {datetime.now().isoformat()}")
+    write("=" * 60)
 
     # RCA Findings
-    report.append("\nRCA Findings:")
-    for issue in rca_results:
-        report.append(f"- Line {issue['line']} | Pattern: {issue['pattern']} | Cause: {issue['rca']}")
-        if issue.get("exception_summary"):
-            report.append(f"  → {issue['exception_summary']}")
+    if aggregate:
+        if aggregator is None:
+            aggregator = PatternAggregator()
+            for issue in rca_results:
+                aggregator.add(issue)
+        rows = aggregator.report(top)
+        write("\nRCA Patterns:")
+        for row in rows:
+            write(f"- {row['pattern']} | Cause: {row['rca']} | Count: {row['count']} "
+                  f"(lines {row['first_line']}-{row['last_line']})")
+        truncated = len(aggregator.rows) - len(rows)
+    else:
+        write("\nRCA Findings:")
+        listed, truncated = 0, dropped
+        for issue in rca_results:
+            if top is not None and listed >= top:
+                truncated += 1
+                continue
+            listed += 1
+            line = f"- Line {issue['line']} | Pattern: {issue['pattern']} | Cause: {issue['rca']}"
+            if issue.get("occurrences", 1) > 1:
+                line += f" | Repeated: {issue['occurrences']}x (last line {issue['last_line']})"
+            write(line)
+            if issue.get("exception_summary"):
+                write(f"  → {issue['exception_summary']}")
+    if truncated:
+        write(f"  ... {truncated} more not shown")
 
     # Anomaly Summary
-    report.append("\nAnomaly Summary:")
-    report.append(f"- Sequence Check: {anomaly_summary.get('sequence_status')}")
-    report.append(f"- Missing Steps: {anomaly_summary.get('missing_steps')}")
-    report.append(f"- Spikes: {', '.join(anomaly_summary.get('spike_times', []))}")
-    report.append(f"- Diff Count: {anomaly_summary['diff_summary']['line_count']}")
+    write("\nAnomaly Summary:")
+    write(f"- Sequence Check: {anomaly_summary.get('sequence_status')}")
+    write(f"- Missing Steps: {anomaly_summary.get('missing_steps')}")
+    write(f"- Spikes: {', '.join(anomaly_summary.get('spike_times', []))}")
+    write(f"- Diff Count: {anomaly_summary['diff_summary']['line_count']}")
+    if anomaly_summary.get("stack_groups"):
+        write("- Exception Groups:")
+        for group in anomaly_summary["stack_groups"]:
+            write(f"  {group['count']}x {group['exception']} @ {group['top_frame']}")
 
     # Feedback
-    report.append(f"\nUnmatched Logs: {unmatched_count}")
+    out.write(f"\nUnmatched Logs: {unmatched_count}")
 
-    return "\n".join(report)
+def generate_text_report(rca_results, anomaly_summary, unmatched_count):
+    """
+    Generates a human-readable text report for CLI or export.
+
+    Builds the whole report in memory; use write_text_report() to stream
+    large reports to a file.
+
+    Args:
+        rca_results (List[dict]): List of RCA matches with line, pattern, and optional exception summary.
+        anomaly_summary (dict): Output from summarize_anomalies().
+        unmatched_count (int): Number of unmatched lines (Phase 5 feedback).
+
+    Returns:
+        str: Full plaintext report.
+    """
+    out = io.StringIO()
+    write_text_report(out, rca_results, anomaly_summary, unmatched_count)
+    return out.getvalue()
 
 
 def generate_json_report(rca_results, anomaly_summary, unmatched_count):
     """
     Generates a JSON-formatted version of the RCA and anomaly results.
 
+    Builds the whole report in memory; use FindingsWriter to stream large
+    reports to a file.
+
     Args:
         rca_results (List[dict]): RCA match results.
         anomaly_summary (dict): Anomaly detection summary.
@@ -54,9 +312,8 @@ def generate_json_report(rca_results, anomaly_summary, unmatched_count):
     Returns:
         str: JSON-formatted string of the complete analysis results.
     """
-    return json.dumps({
-        "timestamp": datetime.now().isoformat(),
-        "rca_findings": rca_results,
-        "anomaly_summary": anomaly_summary,
-        "unmatched_count": unmatched_count
-    }, indent=2)
+    out = io.StringIO()
+    writer = FindingsWriter(out, fmt="json")
+    writer.write_all(rca_results)
+    writer.close(anomaly_summary, unmatched_count)
+    return out.getvalue()
@@ -0,0 +1,273 @@
+# Throughput and memory benchmarks for every pipeline stage
+# tests/benchmark.py
+#
+# Usage (from the project root):
+#   python -m tests.benchmark --scale 10k --out bench.json
+#   python -m tests.benchmark --scale 1m --baseline tests/benchmark_baseline.json
+#
+# Each stage runs once untraced for timing and once under tracemalloc for
+# peak memory, on seeded synthetic input. Results are plain JSON so runs can
+# be diffed or compared against a stored baseline.
+
+import argparse
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from analyzer.diff_engine import compare_logs
+from analyzer.rca_classifier import RootCauseClassifier
+from analyzer.signature_matcher import load_signature_rules, match_signatures
+from analyzer.spike_detector import detect_spike
+from feedback.pattern_suggester import suggest_templates
+from preprocessor.cleanser import cleanse_log_lines
+from preprocessor.multiline import merge_multiline_events
+from preprocessor.redactor import redact_log
+from tests.synthetic_logs import SCALES, generate_categories, generate_lines
+
+# Stages in pipeline order
+STAGES = (
+    "cleanse_log_lines",
+    "redact_log",
+    "merge_multiline_events",
+    "match_signatures",
+    "detect_spike",
+    "compare_logs",
+    "suggest_templates",
+    "classify_rca_5",
+    "classify_rca_500",
+)
+
+# Category counts for the classify_rca_* stages; throughput should not
+# depend on the count
+RCA_CATEGORY_COUNTS = (5, 500)
+
+# Allowed relative drop in throughput (or rise in peak memory) before a
+# stage counts as a regression
+REGRESSION_THRESHOLD = 0.20
+
+# Diff mode benchmarked; "unified" is quadratic and impractical past 10k lines
+DIFF_MODE = "fast"
+
+def _text_bytes(lines):
+    return sum(len(line) + 1 for line in lines)
+
+def build_stages(lines, baseline_lines, rules):
+    """
+    Prepares stage callables and their input sizes.
+
+    Each stage gets the input it sees in the pipeline: raw bytes for
+    cleansing, cleansed lines for the rest, and a second log (same
+    generator, other seed) as the diff baseline.
+
+    Args:
+        lines (List[str]): Generated log lines.
+        baseline_lines (List[str]): Second log for compare_logs.
+        rules (dict): Signature rules.
+
+    Returns:
+        dict: stage name → (callable, input lines, input bytes).
+    """
+    raw = ("\n".join(lines) + "\n").encode("utf-8")
+    size = _text_bytes(lines)
+    count = len(lines)
+    classifiers = {n: RootCauseClassifier(generate_categories(n)) for n in RCA_CATEGORY_COUNTS}
+    stages = {
+        "cleanse_log_lines": (lambda: cleanse_log_lines(raw), count, len(raw)),
+        "redact_log": (lambda: redact_log(lines), count, size),
+        "merge_multiline_events": (lambda: merge_multiline_events(lines), count, size),
+        "match_signatures": (lambda: match_signatures(lines, rules), count, size),
+        "detect_spike": (lambda: detect_spike(lines), count, size),
+        "compare_logs": (
+            lambda: compare_logs(baseline_lines, lines, mode=DIFF_MODE),
+            count + len(baseline_lines),
+            size + _text_bytes(baseline_lines),
+        ),
+        "suggest_templates": (lambda: suggest_templates(lines), count, size),
+    }
+    for n, classifier in classifiers.items():
+        stages[f"classify_rca_{n}"] = (lambda classifier=classifier: classifier.classify_batch(lines), count, size)
+    return stages
+
+def measure(func, track_memory=True):
+    """
+    Times one call and, optionally, its peak traced allocation.
+
+    Args:
+        func (Callable): Stage to run; its result is discarded.
+        track_memory (bool): Run a second time under tracemalloc.
+
+    Returns:
+        Tuple[float, float or None]: Seconds, and peak MB (None if untracked).
+    """
+    gc.collect()
+    start = time.perf_counter()
+    result = func()
+    seconds = time.perf_counter() - start
+    del result
+
+    peak_mb = None
+    if track_memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            result = func()
+            peak_mb = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            del result
+        finally:
+            tracemalloc.stop()
+    return seconds, peak_mb
+
+def run_benchmarks(scale="10k", dataset="app", seed=0, stages=STAGES, track_memory=True,
+                   rules_path="config/rules.yml", stack_density=None):
+    """
+    Benchmarks pipeline stages on a synthetic dataset.
+
+    Args:
+        scale (str or int): Key of SCALES or an explicit line count.
+        dataset (str): "app", "msi" or "evtx".
+        seed (int): Generator seed.
+        stages (Iterable[str]): Stage names to run.
+        track_memory (bool): Measure peak memory per stage.
+        rules_path (str): Signature rules YAML.
+        stack_density (float, optional): Stack-trace share for "app" logs.
+
+    Returns:
+        dict: Run metadata and, per stage, seconds, lines_per_sec,
+        mb_per_sec and peak_mb.
+    """
+    count = SCALES[scale] if isinstance(scale, str) else int(scale)
+    options = {"stack_density": stack_density} if dataset == "app" and stack_density is not None else {}
+    lines = generate_lines(dataset, count, seed, **options)
+    baseline_lines = generate_lines(dataset, count, seed + 1, **options)
+    prepared = build_stages(lines, baseline_lines, load_signature_rules(rules_path))
+
+    results = {}
+    for name in stages:
+        func, input_lines, input_bytes = prepared[name]
+        seconds, peak_mb = measure(func, track_memory)
+        results[name] = {
+            "seconds": round(seconds, 4),
+            "lines_per_sec": round(input_lines / seconds) if seconds else None,
+            "mb_per_sec": round(input_bytes / 1024 / 1024 / seconds, 2) if seconds else None,
+            "peak_mb": round(peak_mb, 2) if peak_mb is not None else None,
+        }
+
+    return {
+        "scale": scale,
+        "dataset": dataset,
+        "seed": seed,
+        "lines": count,
+        "bytes": _text_bytes(lines),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "stages": results,
+    }
+
+def compare_results(current, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Lists stages that regressed against a baseline run.
+
+    A stage regresses when its throughput drops, or its peak memory grows,
+    by more than `threshold` (relative). Stages missing from either run are
+    skipped. Both runs must use the same dataset and size.
+
+    Args:
+        current (dict): Output of run_benchmarks().
+        baseline (dict): Stored output of an earlier run.
+        threshold (float): Allowed relative change.
+
+    Returns:
+        List[str]: One message per regression (empty if none).
+
+    Raises:
+        ValueError: If the runs used different datasets or line counts.
+    """
+    for key in ("dataset", "lines", "seed"):
+        if current.get(key) != baseline.get(key):
+            raise ValueError(f"Baseline {key} differs: {baseline.get(key)} vs {current.get(key)}")
+
+    regressions = []
+    for name, now in current["stages"].items():
+        before = baseline.get("stages", {}).get(name)
+        if not before:
+            continue
+        if now["lines_per_sec"] and before.get("lines_per_sec"):
+            change = now["lines_per_sec"] / before["lines_per_sec"] - 1
+            if change < -threshold:
+                regressions.append(
+                    f"{name}: throughput {now['lines_per_sec']} lines/s vs {before['lines_per_sec']} ({change:+.0%})"
+                )
+        if now["peak_mb"] is not None and before.get("peak_mb"):
+            change = now["peak_mb"] / before["peak_mb"] - 1
+            if change > threshold:
+                regressions.append(
+                    f"{name}: peak memory {now['peak_mb']} MB vs {before['peak_mb']} MB ({change:+.0%})"
+                )
+    return regressions
+
+def format_results(results):
+    """
+    Renders benchmark results as a text table.
+
+    Args:
+        results (dict): Output of run_benchmarks().
+
+    Returns:
+        str: Header plus one line per stage.
+    """
+    lines = [f"{results['dataset']} x {results['lines']} lines ({results['bytes'] / 1024 / 1024:.1f} MB), seed {results['seed']}"]
+    for name, stage in results["stages"].items():
+        peak = f"{stage['peak_mb']:9.1f} MB" if stage["peak_mb"] is not None else "        - MB"
+        lines.append(
+            f"  {name:<24} {stage['seconds']:9.3f}s  {stage['lines_per_sec'] or 0:>11,} lines/s  "
+            f"{stage['mb_per_sec'] or 0:8.2f} MB/s  {peak}"
+        )
+    return "\n".join(lines)
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline stages on synthetic logs")
+    parser.add_argument("--scale", default="10k", help=f"One of {', '.join(SCALES)} or a line count")
+    parser.add_argument("--dataset", default="app", choices=("app", "msi", "evtx"))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stack-density", type=float, help="Share of app events followed by a stack trace")
+    parser.add_argument("--stage", action="append", choices=STAGES, help="Run only this stage (repeatable)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--rules", default="config/rules.yml")
+    parser.add_argument("--out", help="Write results JSON here")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                        help="Allowed relative regression (0.2 = 20%%)")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    scale = args.scale if args.scale in SCALES else int(args.scale)
+    results = run_benchmarks(
+        scale,
+        dataset=args.dataset,
+        seed=args.seed,
+        stages=args.stage or STAGES,
+        track_memory=not args.no_memory,
+        rules_path=args.rules,
+        stack_density=args.stack_density,
+    )
+    print(format_results(results))
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_results(results, json.load(f), args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
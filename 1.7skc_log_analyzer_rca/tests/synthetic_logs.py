@@ -0,0 +1,273 @@
+# Seeded synthetic log generators for tests and benchmarks
+# tests/synthetic_logs.py
+#
+# Output depends only on (count, seed, options), so benchmark runs on
+# different machines or commits process identical input.
+
+import random
+from datetime import datetime, timedelta
+
+from analyzer.rca_classifier import DEFAULT_CATEGORIES
+
+# Named dataset sizes (lines for text logs, events for EVTX)
+SCALES = {
+    "10k": 10_000,
+    "1m": 1_000_000,
+    "10m": 10_000_000,
+}
+
+# Fraction of app events followed by a multi-line stack trace
+STACK_DENSITY = 0.02
+
+START_TIME = datetime(2025, 7, 27, 8, 0, 0)
+
+LEVELS = ("INFO", "INFO", "INFO", "INFO", "DEBUG", "WARN", "ERROR")
+COMPONENTS = ("auth", "net", "disk", "scheduler", "updater", "installer", "api")
+
+# Message templates; a few match rules.yml, most are routine noise
+APP_MESSAGES = (
+    "Request {num} served in {ms} ms for user={user}",
+    "Connected to {ip}:{port}",
+    "Cache refresh completed ({num} entries)",
+    "Heartbeat from worker-{small} ok",
+    "Loaded config from /etc/app/{word}.conf version {ver}",
+    "Sent report to {user}@example.com",
+    "Job {hex} finished with status {small}",
+    "authentication failed for user={user} from {ip}",
+    "connection timed out after {ms} ms",
+    "request timed out after {ms} ms",
+    "disk read error on sector {num}",
+    "service {word} terminated unexpectedly",
+    "killed process {num} due to memory pressure",
+    "permission denied opening /var/lib/{word}/{num}.dat",
+    "system reboot initiated by {user}",
+)
+
+STACK_FRAMES = (
+    "  at com.example.{word}.Handler.process(Handler.java:{small})",
+    "  at com.example.{word}.Dispatcher.run(Dispatcher.java:{small})",
+    "  File \"/opt/app/{word}.py\", line {small}, in handle",
+    "    raise RuntimeError(\"{word} failed\")",
+)
+
+STACK_HEADERS = (
+    "java.lang.NullPointerException: {word} was null",
+    "Traceback (most recent call last):",
+    "System.IO.IOException: The device is not ready ({hex})",
+)
+
+WORDS = ("alpha", "bravo", "charlie", "delta", "echo", "foxtrot", "golf", "hotel")
+USERS = ("alice", "bob", "carol", "dave", "erin", "frank")
+
+MSI_ACTIONS = ("CostInitialize", "FileCost", "InstallValidate", "InstallFiles",
+               "WriteRegistryValues", "RegisterProduct", "PublishProduct", "InstallFinalize")
+
+MSI_MESSAGES = (
+    "MSI (s) ({pid}:{tid}) [{clock}:{msec}]: Doing action: {action}",
+    "MSI (s) ({pid}:{tid}) [{clock}:{msec}]: Note: 1: 2205 2:  3: Error",
+    "MSI (c) ({pid}:{tid}) [{clock}:{msec}]: PROPERTY CHANGE: Adding {word} property. Its value is '{num}'.",
+    "MSI (s) ({pid}:{tid}) [{clock}:{msec}]: Executing op: FileCopy(SourceName={word}.dll,DestName={word}.dll)",
+    "Property(S): {word} = {num}",
+)
+
+# EVTX System fields used by generate_evtx_events()
+EVTX_EVENTS = (
+    (7036, "Service Control Manager", 4, "The {word} service entered the running state."),
+    (7034, "Service Control Manager", 2, "The {word} service terminated unexpectedly."),
+    (1074, "User32", 4, "System reboot initiated by {user}."),
+    (6008, "EventLog", 2, "The previous system shutdown was unexpected."),
+    (4625, "Microsoft-Windows-Security-Auditing", 0, "An account failed to log on: {user}."),
+    (11707, "MsiInstaller", 4, "Product: {word} -- Installation completed successfully."),
+    (11708, "MsiInstaller", 2, "Product: {word} -- Installation failed."),
+)
+
+def _fields(rng):
+    # Values for every placeholder used by the templates above
+    return {
+        "num": rng.randrange(100_000),
+        "small": rng.randrange(1, 500),
+        "ms": rng.randrange(1, 30_000),
+        "port": rng.randrange(1024, 65535),
+        "ip": f"10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}",
+        "hex": f"{rng.getrandbits(64):016x}",
+        "ver": f"{rng.randrange(1, 5)}.{rng.randrange(10)}.{rng.randrange(20)}",
+        "word": rng.choice(WORDS),
+        "user": rng.choice(USERS),
+    }
+
+def generate_app_lines(count, seed=0, stack_density=STACK_DENSITY):
+    """
+    Generates timestamped application log lines.
+
+    Timestamps advance by a random 0-2 seconds per event. With probability
+    `stack_density`, an event is followed by a stack trace of 3-12
+    continuation lines (counted toward `count`).
+
+    Args:
+        count (int): Number of lines.
+        seed (int): Random seed.
+        stack_density (float): Share of events followed by a stack trace.
+
+    Yields:
+        str: Log lines without newlines.
+    """
+    rng = random.Random(seed)
+    now = START_TIME
+    produced = 0
+    while produced < count:
+        now += timedelta(seconds=rng.randrange(3))
+        values = _fields(rng)
+        message = rng.choice(APP_MESSAGES).format(**values)
+        yield (f"{now:%Y-%m-%d %H:%M:%S},{rng.randrange(1000):03d} "
+               f"{rng.choice(LEVELS)} [{rng.choice(COMPONENTS)}] {message}")
+        produced += 1
+
+        if rng.random() < stack_density:
+            frames = [rng.choice(STACK_HEADERS).format(**values)]
+            frames += [rng.choice(STACK_FRAMES).format(**_fields(rng)) for _ in range(rng.randrange(2, 12))]
+            for frame in frames[:count - produced]:
+                yield frame
+                produced += 1
+
+def generate_msi_lines(count, seed=0, failure_rate=0.001):
+    """
+    Generates verbose MSI installer log lines.
+
+    Actions are bracketed by "Action start"/"Action ended" lines; with
+    probability `failure_rate` an action ends with "Return value 3" after
+    an "Error 1603" line.
+
+    Args:
+        count (int): Number of lines.
+        seed (int): Random seed.
+        failure_rate (float): Share of actions that fail.
+
+    Yields:
+        str: Log lines without newlines.
+    """
+    rng = random.Random(seed)
+    now = START_TIME
+    produced = 0
+    while produced < count:
+        action = rng.choice(MSI_ACTIONS)
+        failed = rng.random() < failure_rate
+        block = [f"Action start {now:%H:%M:%S}: {action}."]
+        for _ in range(rng.randrange(2, 20)):
+            now += timedelta(milliseconds=rng.randrange(200))
+            block.append(rng.choice(MSI_MESSAGES).format(
+                pid="A4", tid=f"{rng.randrange(256):02X}", clock=f"{now:%H:%M:%S}",
+                msec=f"{now.microsecond // 1000:03d}", action=action, **_fields(rng),
+            ))
+        if failed:
+            block.append("Error 1603. A fatal error occurred during installation.")
+        block.append(f"Action ended {now:%H:%M:%S}: {action}. Return value {3 if failed else 1}.")
+        for line in block[:count - produced]:
+            yield line
+            produced += 1
+
+def generate_evtx_events(count, seed=0):
+    """
+    Generates EVTX-like event dicts shaped like iter_evtx() output.
+
+    Args:
+        count (int): Number of events.
+        seed (int): Random seed.
+
+    Yields:
+        dict: record_num, event_id, timestamp (SystemTime format), provider,
+        level, event_data and message (rendered XML).
+    """
+    rng = random.Random(seed)
+    now = START_TIME
+    for record_num in range(1, count + 1):
+        now += timedelta(microseconds=rng.randrange(2_000_000))
+        event_id, provider, level, text = rng.choice(EVTX_EVENTS)
+        text = text.format(**_fields(rng))
+        timestamp = f"{now:%Y-%m-%d %H:%M:%S.%f}+00:00"
+        yield {
+            "record_num": record_num,
+            "event_id": str(event_id),
+            "timestamp": timestamp,
+            "provider": provider,
+            "level": str(level),
+            "event_data": {"param1": text},
+            "message": (
+                f'<Event><System><Provider Name="{provider}"/><EventID>{event_id}</EventID>'
+                f'<Level>{level}</Level><TimeCreated SystemTime="{timestamp}"/></System>'
+                f'<EventData><Data Name="param1">{text}</Data></EventData></Event>'
+            ),
+        }
+
+def evtx_event_line(event):
+    """
+    Flattens an EVTX event dict into one text line for line-based stages.
+
+    Args:
+        event (dict): Output of generate_evtx_events() or iter_evtx().
+
+    Returns:
+        str: "timestamp EventID n provider: message text".
+    """
+    text = next(iter(event.get("event_data") or {"": ""}.values()), "") or ""
+    return f"{event['timestamp']} EventID {event['event_id']} {event.get('provider', '')}: {text}"
+
+def generate_lines(dataset, count, seed=0, **options):
+    """
+    Generates text lines for a named dataset.
+
+    Args:
+        dataset (str): "app", "msi" or "evtx" (events flattened to lines).
+        count (int): Number of lines.
+        seed (int): Random seed.
+        **options: Passed to the dataset generator.
+
+    Returns:
+        List[str]: Generated lines.
+    """
+    if dataset == "app":
+        return list(generate_app_lines(count, seed, **options))
+    if dataset == "msi":
+        return list(generate_msi_lines(count, seed, **options))
+    if dataset == "evtx":
+        return [evtx_event_line(event) for event in generate_evtx_events(count, seed)]
+    raise ValueError(f"Unknown dataset: {dataset}")
+
+def generate_categories(count, seed=0, keywords_per_category=3):
+    """
+    Generates RCA categories: the built-in ones plus random-keyword fillers.
+
+    Filler keywords are random lowercase words, so they rarely match and
+    only add scanner cost, the way a large real category file would.
+
+    Args:
+        count (int): Number of categories (at least the built-in ones).
+        seed (int): Random seed.
+        keywords_per_category (int): Keywords per filler category.
+
+    Returns:
+        List[dict]: Categories for RootCauseClassifier.
+    """
+    rng = random.Random(seed)
+    categories = list(DEFAULT_CATEGORIES[:count])
+    for idx in range(count - len(categories)):
+        keywords = [
+            "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(5, 10)))
+            for _ in range(keywords_per_category)
+        ]
+        categories.append({"label": f"Category {idx}", "priority": rng.randint(0, 100), "keywords": keywords})
+    return categories
+
+def write_sample(path, dataset, count, seed=0, **options):
+    """
+    Writes a generated text dataset to disk, one line per row.
+
+    Args:
+        path (str): Target file.
+        dataset (str): "app", "msi" or "evtx".
+        count (int): Number of lines.
+        seed (int): Random seed.
+        **options: Passed to the dataset generator.
+    """
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        for line in generate_lines(dataset, count, seed, **options):
+            f.write(line + "\n")
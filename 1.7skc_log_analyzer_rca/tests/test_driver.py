@@ -1 +1,290 @@
 # Test harness for parsers and analyzers
+# tests/test_driver.py
+#
+# Run from the project root: python -m pytest -q tests
+# Smoke tests for the synthetic generators and the benchmark harness (the
+# benchmarks themselves run via `python -m tests.benchmark`), plus the
+# parallel BGZF decompression path and regressions for the parsers,
+# redaction, diffing, rule checks, follow mode, source loading and reports.
+
+import io
+import json
+import os
+import random
+import re
+import struct
+import tarfile
+import zlib
+from collections import Counter
+
+from analyzer import rule_profiler
+from analyzer.diff_engine import compare_logs, template_delta
+from analyzer.keyword_scanner import scan_markers
+from analyzer.sequence_checker import check_sequence
+from analyzer.signature_matcher import SignatureRuleSet
+from feedback.unmatched_collector import SINK_COUNTS, UnmatchedSink, collect_unmatched_lines, read_new_templates
+from main import StreamingAnalysis
+from parser.regex_parser import parse_text_log
+from preprocessor.cleanser import iter_cleansed_lines
+from preprocessor import redactor
+from preprocessor.multiline import merge_multiline_events
+from reporting.report_generator import FindingsWriter, write_text_report
+from utils import compression
+from utils.file_io import load_sources
+from utils.log_follower import LogFollower
+from tests.benchmark import STAGES, compare_results, run_benchmarks
+from tests.synthetic_logs import generate_evtx_events, generate_lines
+from utils.timestamp_utils import TimestampParser
+
+def test_generators_are_seeded():
+    for dataset in ("app", "msi", "evtx"):
+        first = generate_lines(dataset, 500, seed=7)
+        assert len(first) == 500
+        assert first == generate_lines(dataset, 500, seed=7)
+        assert first != generate_lines(dataset, 500, seed=8)
+
+def test_stack_density_controls_multiline_entries():
+    flat = generate_lines("app", 2000, seed=1, stack_density=0.0)
+    traced = generate_lines("app", 2000, seed=1, stack_density=0.5)
+    assert len(merge_multiline_events(flat)) == len(flat)
+    assert len(merge_multiline_events(traced)) < len(traced)
+
+def test_evtx_events_have_parser_fields():
+    event = next(generate_evtx_events(1))
+    assert {"record_num", "event_id", "timestamp", "provider", "level", "event_data", "message"} <= event.keys()
+
+def test_benchmark_reports_every_stage():
+    results = run_benchmarks(1000, track_memory=True)
+    assert set(results["stages"]) == set(STAGES)
+    for stage in results["stages"].values():
+        assert stage["lines_per_sec"] > 0
+        assert stage["peak_mb"] is not None
+    assert compare_results(results, results) == []
+
+def test_compare_results_flags_regressions():
+    baseline = {"dataset": "app", "lines": 10, "seed": 0,
+                "stages": {"redact_log": {"lines_per_sec": 1000, "peak_mb": 10.0}}}
+    current = {"dataset": "app", "lines": 10, "seed": 0,
+               "stages": {"redact_log": {"lines_per_sec": 700, "peak_mb": 13.0}}}
+    regressions = compare_results(current, baseline, threshold=0.2)
+    assert len(regressions) == 2
+    assert compare_results(current, baseline, threshold=0.5) == []
+
+def _write_bgzf(path, data, block_size=4096):
+    # BGZF as written by bgzip: gzip members carrying a "BC" size subfield
+    with open(path, "wb") as f:
+        for start in range(0, len(data), block_size):
+            chunk = data[start:start + block_size]
+            deflater = zlib.compressobj(9, zlib.DEFLATED, -15)
+            body = deflater.compress(chunk) + deflater.flush()
+            header = struct.pack("<4sIBBHBBHH", compression.BGZF_PREFIX, 0, 0, 255, 6,
+                                 ord("B"), ord("C"), 2, 18 + len(body) + 8 - 1)
+            f.write(header + body + struct.pack("<II", zlib.crc32(chunk), len(chunk)))
+
+def test_bgzf_logs_decompress_in_parallel(tmp_path, monkeypatch):
+    lines = generate_lines("app", 2000, seed=3)
+    path = tmp_path / "app.log.gz"
+    _write_bgzf(path, "\n".join(lines).encode("utf-8"))
+    assert compression.is_bgzf(path)
+
+    chunks = list(compression.iter_bgzf_parallel(path, workers=4, blocks_per_task=2))
+    assert len(chunks) > 1
+    assert b"".join(chunks).decode("utf-8").split("\n") == lines
+
+    calls = []
+    parallel = compression.iter_bgzf_parallel
+    monkeypatch.setattr(compression.os, "cpu_count", lambda: 4)
+    monkeypatch.setattr(compression, "iter_bgzf_parallel",
+                        lambda *args, **kwargs: calls.append(args) or parallel(*args, **kwargs))
+    serial = list(iter_cleansed_lines(str(path), workers=1))
+    assert not calls
+    assert list(iter_cleansed_lines(str(path))) == serial
+    assert calls == [(str(path), 4)]
+
+def test_msi_step_latencies_span_midnight(tmp_path):
+    path = tmp_path / "install.log"
+    path.write_text(
+        "=== Verbose logging started: 7/28/2025  23:59:50  Build type: SHIP UNICODE 5.00.10011.00 ===\n"
+        "MSI (c) (A0:B4) [23:59:55:100]: Initialize engine\n"
+        "MSI (s) (A0:B4) [00:00:03:300]: Load Config from package\n"
+    )
+    lines = path.read_text().splitlines()
+    steps = ["Initialize", "Load Config"]
+    scan = scan_markers(lines, steps, timestamp_parser=TimestampParser(str(path)))
+    assert check_sequence(None, expected=steps, scan=scan)["latencies"] == {"Initialize -> Load Config": 8}
+
+def test_unmatched_sink_appends_counts_per_run(tmp_path):
+    for run in range(3):
+        with UnmatchedSink(str(tmp_path)) as sink:
+            sink.add_lines(["disk 7 offline", f"job {run}x started"])
+    with open(tmp_path / SINK_COUNTS) as f:
+        assert len(f.readlines()) == 6
+    counts = {record["template"]: record["count"] for record in read_new_templates(str(tmp_path))}
+    assert counts == {"disk <NUM> offline": 3, "job 0x started": 1, "job 1x started": 1, "job 2x started": 1}
+
+def test_backreference_rules_survive_joining():
+    ruleset = SignatureRuleSet({"first": r"(foo)", "repeated_word": r"\b(\w+) \1\b", "disk": "disk"})
+    lines = ["retry retry failed", "foo", "  disk offline\n", "all good"]
+    scan = ruleset.scan(lines)
+    parsed = [(match["pattern"], match["matched"]) for match in parse_text_log(lines, ruleset, scan)]
+    assert parsed == [("repeated_word", "retry retry failed"), ("first", "foo"), ("disk", "  disk offline\n")]
+    assert parse_text_log(lines, ruleset) == parse_text_log(iter(lines), ruleset.rules) == [
+        {"pattern": pattern, "matched": line} for pattern, line in parsed
+    ]
+    assert collect_unmatched_lines(lines, ruleset, scan) == ["all good"]
+
+def _append(path, text, mode="a"):
+    with open(path, mode, encoding="utf-8", newline="\n") as f:
+        f.write(text)
+
+def _entries(batch):
+    return [entry for _, _, entry in batch]
+
+def test_log_follower_append_rotate_truncate_resume(tmp_path):
+    path = str(tmp_path / "app.log")
+    checkpoint = str(tmp_path / "follow.json")
+    _append(path, "2025-07-28 10:00:00 INFO alpha\n2025-07-28 10:00:01 ERROR beta\n  at Frame.one\n", "w")
+
+    follower = LogFollower([path], checkpoint)
+    # The trailing entry stays open: a continuation line may still follow
+    assert _entries(follower.poll()) == ["2025-07-28 10:00:00 INFO alpha"]
+    # A partial line is left in the file until it is complete
+    _append(path, "  at Frame.two\n2025-07-28 10:00:02 INFO gam")
+    assert follower.poll() == []
+    _append(path, "ma\n2025-07-28 10:00:03 INFO delta\n")
+    assert _entries(follower.poll()) == [
+        "2025-07-28 10:00:01 ERROR beta\nat Frame.one\nat Frame.two",
+        "2025-07-28 10:00:02 INFO gamma",
+    ]
+    follower.save_checkpoint({"note": "kept"})
+    follower.close()
+
+    # Restart from the checkpoint: nothing is re-read, the open entry survives
+    _append(path, "2025-07-28 10:00:04 INFO epsilon\n")
+    follower = LogFollower([path], checkpoint)
+    assert follower.load_checkpoint() == {"note": "kept"}
+    assert _entries(follower.poll()) == ["2025-07-28 10:00:03 INFO delta"]
+
+    # Rotation: the old file is drained before the new one is read from byte 0
+    _append(path, "2025-07-28 10:00:05 INFO zeta\n")
+    os.rename(path, path + ".1")
+    _append(path, "2025-07-28 10:01:00 INFO new-file\n2025-07-28 10:01:01 INFO second\n", "w")
+    assert _entries(follower.poll()) == [
+        "2025-07-28 10:00:04 INFO epsilon",
+        "2025-07-28 10:00:05 INFO zeta",
+        "2025-07-28 10:01:00 INFO new-file",
+    ]
+    assert follower.files[path].rotations == 1
+
+    # Truncation: the open entry is completed and reading restarts at byte 0
+    _append(path, "2025-07-28 10:02:00 INFO after\n", "w")
+    assert _entries(follower.poll()) == ["2025-07-28 10:01:01 INFO second"]
+    assert follower.files[path].truncations == 1
+    _append(path, "2025-07-28 10:02:01 INFO next\n")
+    assert follower.poll() == [(path, 1, "2025-07-28 10:02:00 INFO after")]
+    follower.close()
+
+def test_log_follower_polls_are_bounded(tmp_path):
+    path = str(tmp_path / "big.log")
+    _append(path, "".join(f"2025-07-28 10:00:00 INFO line {i}\n" for i in range(5000)), "w")
+    follower = LogFollower([path])
+    sizes = []
+    while True:
+        batch = follower.poll(max_bytes=16 * 1024)
+        if not batch:
+            break
+        sizes.append(len(batch))
+    follower.close()
+    assert len(sizes) > 1
+    assert sum(sizes) == 4999
+
+def test_tar_members_are_separate_tasks(tmp_path):
+    bundle = str(tmp_path / "bundle.tar.gz")
+    with tarfile.open(bundle, "w:gz") as archive:
+        for idx in range(3):
+            member = tmp_path / f"app{idx}.log"
+            member.write_text("\n".join(generate_lines("app", 100 + idx, seed=idx)) + "\n")
+            archive.add(str(member), arcname=f"logs/app{idx}.log")
+    results = {name: result for name, _, result in load_sources([bundle], workers=2)}
+    assert {name: result["records"] for name, result in results.items()} == {
+        f"{bundle}!logs/app{idx}.log": 100 + idx for idx in range(3)
+    }
+
+def test_rule_cost_check_rejects_or_stops_backtracking(monkeypatch):
+    assert rule_profiler.has_nested_quantifier(r"(?:a|a)*b")
+    assert rule_profiler.has_nested_quantifier(r"(?:\w|\d)*x")
+    assert not rule_profiler.has_nested_quantifier(r"(?:foo|bar)*baz")
+    assert not rule_profiler.check_rule_cost(r"(?:a|a)*b")["ok"]
+
+    # A rule the static check misses is killed mid-search instead of hanging
+    monkeypatch.setattr(rule_profiler, "has_nested_quantifier", lambda pattern: False)
+    monkeypatch.setattr(rule_profiler, "SEARCH_KILL_SECONDS", 0.2)
+    result = rule_profiler.check_rule_cost(r"(?:a|a)*b")
+    assert not result["ok"] and result["worst"][1] == float("inf")
+
+def test_findings_past_the_cap_are_counted():
+    ruleset = SignatureRuleSet({"disk": "disk", "fail": "failed"})
+    analysis = StreamingAnalysis(ruleset, [], [], max_findings=2)
+    for line_no, line in enumerate(["disk failed", "disk ok", "ok", "disk gone"], 1):
+        analysis.observe(line_no, line)
+    results = analysis.results()
+    assert len(results["rca_findings"]) == 2 and results["dropped_findings"] == 2
+
+    text = io.StringIO()
+    write_text_report(text, results["rca_findings"], results["anomaly_summary"], results["unmatched_count"],
+                      dropped=results["dropped_findings"])
+    assert "... 2 more not shown" in text.getvalue()
+
+    report = io.StringIO()
+    FindingsWriter(report, "json").close(results["anomaly_summary"], results["unmatched_count"],
+                                         results["dropped_findings"])
+    assert json.loads(report.getvalue())["dropped_findings"] == 2
+
+# Fragments hitting every redaction category, including overlapping ones
+REDACTION_FRAGMENTS = [
+    "10.0.0.1", "host 192.168.1.254:8080", "mail alice.b+x@example.co.uk", "user=bob", "USER=root@10.1.1.1",
+    "ssn 123-45-6789", "call (555) 123-4567", "id 5551234567", "key ABCD-1234-EFGH", "AB12-CD34",
+    "/opt/app/tool_x/bin", "path /var/log/app-1.2.3.log", "v1.2.3", "version: 2.0-beta", "version=10.4",
+    "internal_toolX", "ran tool_abc_2", "disk ok", "retry 3 of 5", "plain words only", "a-b_c.d",
+]
+
+def _baseline_redact(line):
+    # The original redactor: every category's regex, applied in order
+    for label, pattern in redactor.REDACTION_PATTERNS.items():
+        line = re.sub(pattern, f"[REDACTED_{label}]", line)
+    return line
+
+def test_redaction_matches_sequential_substitutions(monkeypatch):
+    rng = random.Random(5)
+    lines = [" ".join(rng.choices(REDACTION_FRAGMENTS, k=rng.randint(1, 4))) for _ in range(2000)]
+    lines += REDACTION_FRAGMENTS
+    expected = [_baseline_redact(line) for line in lines]
+    assert redactor.redact_log(lines) == expected
+    for label in redactor.REDACTION_PATTERNS:
+        assert any(f"[REDACTED_{label}]" in line for line in expected)
+
+    monkeypatch.setattr(redactor, "POOL_MIN_LINES", 0)
+    assert redactor.redact_log(lines, workers=2, chunk_lines=300) == expected
+
+def test_fast_diff_reports_the_unified_changes():
+    baseline = generate_lines("app", 400, seed=11)
+    target = list(baseline)
+    for idx in sorted(random.Random(11).sample(range(len(target)), 12), reverse=True):
+        if idx % 3 == 0:
+            del target[idx]
+        elif idx % 3 == 1:
+            target.insert(idx, f"new event {idx} disk offline")
+        else:
+            target[idx] += " (retried)"
+    # Timestamps differ on every line but are masked out
+    target = [line.replace("2025-", "2026-") for line in target]
+
+    unified = [line for line in compare_logs(baseline, target)
+               if line[:1] in "+-" and not line.startswith(("---", "+++"))]
+    fast = compare_logs(baseline, target, mode="fast")
+    assert fast == unified and len(fast) == 14
+
+    net = Counter(line[1:] for line in fast if line[0] == "+")
+    net.subtract(line[1:] for line in fast if line[0] == "-")
+    assert {template: delta for template, delta in net.items() if delta} == template_delta(baseline, target)
+    assert compare_logs(baseline, target, mode="fast", max_lines=100) == template_delta(baseline, target)
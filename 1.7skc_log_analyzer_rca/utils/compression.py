@@ -0,0 +1,227 @@
+# Transparent streaming decompression for log inputs
+# utils/compression.py
+
+import bz2
+import gzip
+import io
+import lzma
+import os
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+# Leading bytes identifying each supported compression format
+MAGIC_BYTES = {
+    "gzip": b"\x1f\x8b",
+    "bz2": b"BZh",
+    "xz": b"\xfd7zXZ\x00",
+    "zstd": b"\x28\xb5\x2f\xfd",
+}
+
+# Bytes needed to recognize any format above
+MAGIC_SIZE = 6
+
+# BGZF (blocked gzip, as written by bgzip) stores each member's size in
+# its header, so members can be located and inflated independently
+BGZF_HEADER = struct.Struct("<4sIBBHBBHH")  # up to and including BSIZE
+BGZF_PREFIX = b"\x1f\x8b\x08\x04"
+BGZF_BLOCKS_PER_TASK = 64
+
+def detect_compression(head):
+    """
+    Identifies the compression format from leading bytes.
+
+    Args:
+        head (bytes): At least MAGIC_SIZE leading bytes, when available.
+
+    Returns:
+        str or None: "gzip", "bz2", "xz", "zstd" or None for uncompressed data.
+    """
+    for name, magic in MAGIC_BYTES.items():
+        if head.startswith(magic):
+            return name
+    return None
+
+class PrefixedStream(io.RawIOBase):
+    """
+    Replays bytes already read for sniffing ahead of the rest of a stream,
+    so non-seekable inputs (archive members, pipes) can still be sniffed.
+    """
+
+    def __init__(self, prefix, stream):
+        self._prefix = prefix
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        if self._prefix:
+            n = min(len(buffer), len(self._prefix))
+            buffer[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+def _zstd_reader(stream):
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "zstd-compressed input requires the 'zstandard' package (pip install zstandard)"
+        )
+    return zstandard.ZstdDecompressor().stream_reader(stream, read_across_frames=True)
+
+def _decompressing_reader(kind, stream):
+    if kind == "gzip":
+        # GzipFile handles multi-member files by reading members back to back
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    if kind == "bz2":
+        return bz2.BZ2File(stream, mode="rb")
+    if kind == "xz":
+        return lzma.LZMAFile(stream, mode="rb")
+    return _zstd_reader(stream)
+
+def decompress_stream(stream):
+    """
+    Wraps a binary stream so compressed content is decompressed on the fly.
+
+    The compression format is detected from magic bytes, not the file name.
+    Decompression happens chunk by chunk as the caller reads; nothing is
+    written to disk and the full payload is never held in memory.
+
+    Args:
+        stream (BinaryIO): Readable binary stream.
+
+    Returns:
+        Tuple[BinaryIO, str or None]: Readable (decompressed) stream and the
+        detected compression format.
+    """
+    head = stream.read(MAGIC_SIZE)
+    kind = detect_compression(head)
+    replay = io.BufferedReader(PrefixedStream(head, stream))
+    if kind is None:
+        return replay, None
+    return _decompressing_reader(kind, replay), kind
+
+def _read_bgzf_blocks(f, count):
+    # Raw members (header included) for up to `count` BGZF blocks
+    blocks = []
+    for _ in range(count):
+        header = f.read(BGZF_HEADER.size)
+        if len(header) < BGZF_HEADER.size:
+            break
+        if not header.startswith(BGZF_PREFIX) or header[12:14] != b"BC":
+            raise ValueError("not a BGZF block")
+        block_size = BGZF_HEADER.unpack(header)[-1] + 1
+        blocks.append(header + f.read(block_size - BGZF_HEADER.size))
+    return blocks
+
+def _inflate_blocks(blocks):
+    # wbits=31 decodes one complete gzip member; zlib releases the GIL here
+    return b"".join(zlib.decompress(block, 31) for block in blocks)
+
+def is_bgzf(path):
+    """
+    Checks whether a file is BGZF (independently decodable gzip blocks).
+
+    Args:
+        path (str): File path.
+
+    Returns:
+        bool: True if the first block carries a BGZF size field.
+    """
+    with open(path, "rb") as f:
+        header = f.read(BGZF_HEADER.size)
+    return len(header) == BGZF_HEADER.size and header.startswith(BGZF_PREFIX) and header[12:14] == b"BC"
+
+def iter_bgzf_parallel(path, workers=None, blocks_per_task=BGZF_BLOCKS_PER_TASK):
+    """
+    Decompresses a BGZF file with several threads, yielding data in order.
+
+    Block boundaries come from each member's header, so batches of blocks
+    are inflated concurrently. At most two batches per worker are in flight.
+
+    Args:
+        path (str): Path to a BGZF-compressed file.
+        workers (int, optional): Thread count (defaults to os.cpu_count()).
+        blocks_per_task (int): Blocks inflated per task (~64 KB each).
+
+    Yields:
+        bytes: Decompressed data, in file order.
+    """
+    workers = workers or os.cpu_count() or 1
+    with open(path, "rb") as f, ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        while True:
+            while len(pending) < workers * 2:
+                blocks = _read_bgzf_blocks(f, blocks_per_task)
+                if not blocks:
+                    break
+                pending.append(pool.submit(_inflate_blocks, blocks))
+            if not pending:
+                break
+            yield pending.popleft().result()
+
+class _ChunkStream(io.RawIOBase):
+    # Readable stream over an iterator of byte chunks
+
+    def __init__(self, chunks):
+        self._chunks = chunks
+        self._current = b""
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        while not self._current:
+            self._current = next(self._chunks, b"")
+            if not self._current:
+                return 0
+        n = min(len(buffer), len(self._current))
+        buffer[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
+
+@contextmanager
+def open_log(path, workers=None):
+    """
+    Opens a log file for binary reading, decompressing it transparently.
+
+    gzip, bz2, xz and zstd are detected by magic bytes. BGZF gzip files are
+    inflated in parallel, on one thread per CPU unless `workers` says
+    otherwise (1 forces serial decompression). Uncompressed files are
+    handed back as the real file object, so callers can still seek or mmap
+    them.
+
+    Args:
+        path (str): Path to a plain or compressed log.
+        workers (int, optional): Threads for parallel BGZF decompression
+            (defaults to os.cpu_count()).
+
+    Yields:
+        Tuple[BinaryIO, str or None]: Readable stream and the detected
+        compression format.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers > 1 and is_bgzf(path):
+        chunks = iter_bgzf_parallel(path, workers)
+        try:
+            yield io.BufferedReader(_ChunkStream(chunks)), "gzip"
+        finally:
+            chunks.close()
+        return
+
+    with open(path, "rb") as f:
+        kind = detect_compression(f.read(MAGIC_SIZE))
+        f.seek(0)
+        if kind is None:
+            yield f, None
+            return
+        with _decompressing_reader(kind, f) as stream:
+            yield stream, kind
@@ -0,0 +1,274 @@
+# Content-addressed cache of parsed log events
+# utils/event_cache.py
+#
+# Decoding, redaction and multiline merging dominate a run, yet their output
+# only changes when the log or the preprocessor changes. Events are cached in
+# SQLite keyed by file content hash + preprocessor version, so re-analysis
+# with updated rules starts straight from the parsed events.
+
+import hashlib
+import importlib.util
+import os
+import sqlite3
+import time
+
+# Bump whenever cleansing, redaction, merging or parsing output changes;
+# entries written by other versions are never read back
+PREPROCESSOR_VERSION = "2"
+
+# Modules whose source is hashed into the version as well, so an edit that
+# forgets the bump still invalidates the cache
+PREPROCESSOR_MODULES = (
+    "utils.compression",
+    "preprocessor.cleanser",
+    "preprocessor.redactor",
+    "preprocessor.multiline",
+    "parser.extractor",
+)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "skc_log_analyzer")
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+# Columns stored per event (the extract_fields() keys plus the start line)
+EVENT_COLUMNS = ("line", "timestamp", "event_id", "message")
+
+# Rows buffered per INSERT batch while a miss is being filled
+WRITE_BATCH = 10_000
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    source TEXT,
+    size INTEGER NOT NULL,
+    events INTEGER NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS events (
+    entry_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    line INTEGER,
+    timestamp TEXT,
+    event_id TEXT,
+    message TEXT,
+    PRIMARY KEY (entry_id, seq)
+) WITHOUT ROWID;
+"""
+
+def file_digest(path, chunk_size=HASH_CHUNK_SIZE):
+    """
+    Returns the SHA-256 hex digest of a file's content.
+
+    Args:
+        path (str): File path.
+        chunk_size (int): Bytes hashed per read.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+_preprocessor_version = None
+
+def preprocessor_version():
+    """
+    Returns PREPROCESSOR_VERSION plus a hash of the PREPROCESSOR_MODULES sources.
+
+    Returns:
+        str: "<PREPROCESSOR_VERSION>+<12 hex digits>".
+    """
+    global _preprocessor_version
+    if _preprocessor_version is None:
+        digest = hashlib.sha256()
+        for name in PREPROCESSOR_MODULES:
+            with open(importlib.util.find_spec(name).origin, "rb") as f:
+                digest.update(f.read())
+        _preprocessor_version = f"{PREPROCESSOR_VERSION}+{digest.hexdigest()[:12]}"
+    return _preprocessor_version
+
+def _row_size(row):
+    # Approximate stored bytes of one event row
+    return sum(len(value) if isinstance(value, str) else 8 for value in row)
+
+class EventCache:
+    """
+    Size-bounded, LRU-evicted store of parsed events.
+
+    Each cached log is one entry; its events are rows of a single SQLite
+    table, streamed back in their original order on a hit. When the total
+    stored size exceeds `max_bytes`, least recently used entries are evicted.
+
+    Args:
+        cache_dir (str): Directory holding the cache database.
+        max_bytes (int): Approximate size cap for cached event data.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, "events.sqlite")
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "events_read": 0, "events_written": 0}
+
+        self.conn = sqlite3.connect(self.path, isolation_level=None)
+        self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript(SCHEMA)
+        # The cap may have shrunk since the cache was last written
+        self.evict()
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def cache_key(self, path, variant=""):
+        """
+        Builds the key for a log file.
+
+        Args:
+            path (str): Log file path.
+            variant (str): Extra parameters that change the cached output
+                (e.g. parser kind or entry size cap).
+
+        Returns:
+            str: "<version>:<variant>:<sha256>".
+        """
+        return f"{preprocessor_version()}:{variant}:{file_digest(path)}"
+
+    def _lookup(self, key):
+        row = self.conn.execute("SELECT id FROM entries WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _read(self, entry_id):
+        self.conn.execute("UPDATE entries SET last_used = ? WHERE id = ?", (time.time(), entry_id))
+        # A separate cursor so rows stream while other statements run
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "SELECT line, timestamp, event_id, message FROM events WHERE entry_id = ? ORDER BY seq",
+            (entry_id,),
+        )
+        for row in cursor:
+            self.stats["events_read"] += 1
+            yield dict(zip(EVENT_COLUMNS, row))
+
+    def _write(self, key, source, events):
+        # Events are passed through while being stored; the entry only
+        # becomes visible once the source is fully consumed
+        conn = self.conn
+        conn.execute("BEGIN")
+        committed = False
+        try:
+            now = time.time()
+            entry_id = conn.execute(
+                "INSERT INTO entries (key, source, size, events, created, last_used) VALUES (?, ?, 0, 0, ?, ?)",
+                (key, source, now, now),
+            ).lastrowid
+
+            batch = []
+            size = count = 0
+            for event in events:
+                row = tuple(event.get(column) for column in EVENT_COLUMNS)
+                batch.append((entry_id, count) + row)
+                size += _row_size(row)
+                count += 1
+                if len(batch) >= WRITE_BATCH:
+                    conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", batch)
+                    batch.clear()
+                yield event
+
+            conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?, ?, ?)", batch)
+            conn.execute("UPDATE entries SET size = ?, events = ? WHERE id = ?", (size, count, entry_id))
+            conn.execute("COMMIT")
+            committed = True
+            self.stats["events_written"] += count
+        finally:
+            if not committed:
+                # Abandoned or failed runs leave no partial entry behind
+                conn.execute("ROLLBACK")
+        self.evict()
+
+    def get_or_build(self, path, build, variant=""):
+        """
+        Streams cached events for a log, building and storing them on a miss.
+
+        Args:
+            path (str): Log file path (hashed to form the key).
+            build (Callable[[], Iterable[dict]]): Produces the events on a miss;
+                each event carries keys from EVENT_COLUMNS.
+            variant (str): Parameters that change the output (see cache_key()).
+
+        Yields:
+            dict: Events with EVENT_COLUMNS keys, in original order.
+        """
+        key = self.cache_key(path, variant)
+        entry_id = self._lookup(key)
+        if entry_id is not None:
+            self.stats["hits"] += 1
+            yield from self._read(entry_id)
+            return
+
+        self.stats["misses"] += 1
+        yield from self._write(key, os.path.abspath(path), build())
+
+    def total_size(self):
+        return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def evict(self, max_bytes=None):
+        """
+        Drops least recently used entries until the cache fits its size cap.
+
+        Args:
+            max_bytes (int, optional): Cap to enforce (defaults to self.max_bytes).
+
+        Returns:
+            int: Number of entries evicted.
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        total = self.total_size()
+        if total <= max_bytes:
+            return 0
+
+        evicted = 0
+        rows = self.conn.execute("SELECT id, size FROM entries ORDER BY last_used").fetchall()
+        for entry_id, size in rows:
+            if total <= max_bytes:
+                break
+            self.conn.execute("BEGIN")
+            self.conn.execute("DELETE FROM events WHERE entry_id = ?", (entry_id,))
+            self.conn.execute("DELETE FROM entries WHERE id = ?", (entry_id,))
+            self.conn.execute("COMMIT")
+            total -= size
+            evicted += 1
+
+        # Return freed pages to the filesystem
+        self.conn.executescript("PRAGMA incremental_vacuum;")
+        self.stats["evictions"] += evicted
+        return evicted
+
+    def report(self):
+        """
+        Summarizes cache activity for this session.
+
+        Returns:
+            str: Hit/miss/eviction counts and current cache size.
+        """
+        lookups = self.stats["hits"] + self.stats["misses"]
+        ratio = self.stats["hits"] / lookups if lookups else 0.0
+        entries = self.conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return (
+            f"Event cache: {self.stats['hits']} hits, {self.stats['misses']} misses "
+            f"({ratio:.0%} hit rate), {self.stats['evictions']} evicted; "
+            f"{entries} entries, {self.total_size() / 1024 / 1024:.1f} MB of {self.max_bytes / 1024 / 1024:.0f} MB "
+            f"[{self.path}]"
+        )
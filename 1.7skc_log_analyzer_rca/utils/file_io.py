@@ -1 +1,340 @@
 # File loader and zip extractor
+# utils/file_io.py
+
+import io
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import ExitStack
+
+from parser.evtx_parser import iter_evtx
+from parser.msi_parser import iter_msi_log, iter_msi_stream
+from preprocessor.cleanser import iter_cleansed_lines
+from utils.compression import PrefixedStream, decompress_stream
+
+# Bytes read from each file to decide how to parse it
+SNIFF_SIZE = 4096
+
+EVTX_MAGIC = b"ElfFile\x00"
+
+# Text markers that identify a Windows Installer (msiexec /l*v) log
+MSI_MARKERS = ("=== Verbose logging started", "=== Logging started", "MSI (s)", "MSI (c)", "Action start")
+
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz")
+
+# Results buffered per worker before the producer waits for the consumer
+QUEUE_DEPTH_PER_WORKER = 2
+
+# Records kept per source by the default handler
+SAMPLE_RECORDS = 5
+
+def sniff_type(head):
+    """
+    Classifies log content from its first bytes.
+
+    Args:
+        head (bytes): Leading bytes of a file or archive member.
+
+    Returns:
+        str: "evtx", "msi", "text" or "binary".
+    """
+    if head.startswith(EVTX_MAGIC):
+        return "evtx"
+
+    # MSI logs are often UTF-16LE; decode accordingly before looking for markers
+    if head[:2] in (b"\xff\xfe", b"\xfe\xff") or (len(head) >= 4 and head[1] == 0 and head[3] == 0):
+        text = head.decode("utf-16", errors="ignore")
+    elif b"\x00" in head:
+        return "binary"
+    else:
+        text = head.decode("utf-8", errors="ignore")
+
+    if any(marker in text for marker in MSI_MARKERS):
+        return "msi"
+    return "text"
+
+def _is_tar(path):
+    return path.lower().endswith(TAR_SUFFIXES) and tarfile.is_tarfile(path)
+
+def iter_sources(paths):
+    """
+    Enumerates log sources under files, directories and archives.
+
+    Zip archives are listed, not extracted; each member becomes its own
+    source. A tar archive is one source (member None): compressed tars can
+    only be read front to back, so its members are split out in a single
+    streaming pass (see iter_tasks() and iter_tar_results()).
+
+    Args:
+        paths (Iterable[str]): Files, directories, .zip or tar archives.
+
+    Yields:
+        Tuple[str, str or None]: (container path, member name) where member
+        is None for plain files and tar archives.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    yield from iter_sources([os.path.join(root, name)])
+        elif zipfile.is_zipfile(path):
+            with zipfile.ZipFile(path) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        yield path, info.filename
+        else:
+            yield path, None
+
+def source_name(source):
+    """
+    Returns a display name for a source, e.g. "bundle.zip!logs/app.log".
+    """
+    container, member = source
+    return container if member is None else f"{container}!{member}"
+
+def open_source(source, stack):
+    """
+    Opens a source as a binary stream, registering cleanup on `stack`.
+
+    Args:
+        source (Tuple[str, str or None]): A plain file or zip member from
+            iter_sources() (tar members are read by iter_tasks()).
+        stack (contextlib.ExitStack): Owns the opened handles.
+
+    Returns:
+        BinaryIO: Readable binary stream of the file or archive member.
+    """
+    container, member = source
+    if member is None:
+        return stack.enter_context(open(container, "rb"))
+    archive = stack.enter_context(zipfile.ZipFile(container))
+    return stack.enter_context(archive.open(member))
+
+def _spool(stream, suffix=""):
+    # Copies a stream to a named temp file, returning its path (caller deletes)
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+        shutil.copyfileobj(stream, tmp)
+    return tmp.name
+
+def _iter_spooled_evtx(stream):
+    # EVTX needs random access: spool the member to a temp file and parse
+    # that, so archived logs are never held in memory as a whole
+    path = _spool(stream, ".evtx")
+    try:
+        yield from iter_evtx(path)
+    finally:
+        os.remove(path)
+
+def iter_records(path, kind, stream):
+    """
+    Routes a source to the parser for its type.
+
+    Uncompressed files on disk (`path` given) go to the path-based parsers,
+    which memory-map them. Zip members and compressed files are parsed from
+    the decompressed stream, except EVTX: it needs random access, so that
+    content is spooled to a temporary file, deleted after parsing.
+
+    Args:
+        path (str or None): Uncompressed file holding exactly the source.
+        kind (str): Sniffed type.
+        stream (BinaryIO): Decompressed content.
+
+    Yields:
+        dict or str: EVTX/MSI event dicts or cleaned text lines.
+    """
+    if kind == "evtx":
+        if path is not None:
+            yield from iter_evtx(path)
+        else:
+            yield from _iter_spooled_evtx(stream)
+    elif kind == "msi":
+        if path is not None:
+            yield from iter_msi_log(path)
+        else:
+            yield from iter_msi_stream(stream)
+    elif kind == "text":
+        yield from iter_cleansed_lines(stream, decompress=False)
+
+def summarize_records(name, kind, records):
+    """
+    Default per-source handler: counts the parsed records and keeps a few.
+
+    Its result is bounded whatever the source size, so it can cross the
+    process boundary cheaply. Handlers with the same signature can reduce
+    records to other summaries inside the worker.
+
+    Args:
+        name (str): Display name of the source.
+        kind (str): Sniffed type.
+        records (Iterator): Parsed records from iter_records().
+
+    Returns:
+        dict: "records" (count) and "sample" (the first SAMPLE_RECORDS).
+    """
+    sample = []
+    count = 0
+    for record in records:
+        if count < SAMPLE_RECORDS:
+            sample.append(record)
+        count += 1
+    return {"records": count, "sample": sample}
+
+def collect_records(name, kind, records):
+    """
+    Per-source handler that materializes every parsed record.
+
+    For small inputs only: the whole source is held in the worker and
+    pickled back as one object, so in-flight limits no longer bound memory.
+
+    Args:
+        name (str): Display name of the source.
+        kind (str): Sniffed type.
+        records (Iterator): Parsed records from iter_records().
+
+    Returns:
+        List: All records of the source.
+    """
+    return list(records)
+
+def process_source(source, handler=summarize_records):
+    """
+    Decompresses, sniffs, parses and handles a single source. Runs inside
+    pool workers.
+
+    Args:
+        source (Tuple[str, str or None]): A plain file or zip member from
+            iter_sources() (tar members go through process_spooled()).
+        handler (Callable): Picklable (name, kind, records) → result function.
+
+    Returns:
+        Tuple[str, str, object]: (display name, kind, handler result).
+        Binary sources are returned with a None result.
+    """
+    with ExitStack() as stack:
+        path = source[0] if source[1] is None else None
+        return _process_stream(source_name(source), open_source(source, stack), handler, path)
+
+def process_spooled(name, path, handler=summarize_records):
+    """
+    Handles a tar member spooled to a temp file, then deletes the file.
+    Runs inside pool workers.
+
+    Args:
+        name (str): Display name, e.g. "bundle.tar.gz!logs/app.log".
+        path (str): Temp file holding the member.
+        handler (Callable): Picklable (name, kind, records) → result function.
+
+    Returns:
+        Tuple[str, str, object]: (display name, kind, handler result).
+    """
+    try:
+        with open(path, "rb") as raw:
+            return _process_stream(name, raw, handler, path)
+    finally:
+        os.remove(path)
+
+def _process_stream(name, raw, handler, path=None):
+    # gzip/bz2/xz/zstd files and members are decompressed on the fly
+    stream, compression = decompress_stream(raw)
+    head = stream.read(SNIFF_SIZE)
+    kind = sniff_type(head)
+    if kind == "binary":
+        return name, kind, None
+
+    stream = io.BufferedReader(PrefixedStream(head, stream))
+    direct = path if compression is None else None
+    return name, kind, handler(name, kind, iter_records(direct, kind, stream))
+
+def iter_tar_results(path, handler=summarize_records):
+    """
+    Processes every file in a tar archive during one streaming read.
+
+    The archive is opened in stream mode ("r|*"), so a .tar.gz is
+    decompressed once, front to back, and each member is handled as it is
+    reached instead of reopening (and re-decompressing) the archive per
+    member. Used for serial runs; load_sources() spools members instead so
+    they can be parsed in parallel.
+
+    Args:
+        path (str): Tar archive, optionally gzip/bz2/xz compressed.
+        handler (Callable): Picklable (name, kind, records) → result function.
+
+    Yields:
+        Tuple[str, str, object]: (display name, kind, handler result), in
+        archive order.
+    """
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            if member.isfile():
+                yield _process_stream(source_name((path, member.name)), archive.extractfile(member), handler)
+
+def iter_tasks(sources):
+    """
+    Turns sources into pool tasks, reading each tar archive only once.
+
+    Tar members are spooled to temp files as the archive streams past, so
+    every member becomes its own task; the worker deletes the file. The
+    generator is consumed in step with the pool's in-flight window, so at
+    most that many spooled members exist at a time.
+
+    Args:
+        sources (Iterable[Tuple[str, str or None]]): Output of iter_sources().
+
+    Yields:
+        Tuple[Callable, tuple]: Task function and its leading arguments.
+    """
+    for source in sources:
+        if source[1] is not None or not _is_tar(source[0]):
+            yield process_source, (source,)
+            continue
+        with tarfile.open(source[0], "r|*") as archive:
+            for member in archive:
+                if member.isfile():
+                    spooled = _spool(archive.extractfile(member))
+                    yield process_spooled, (source_name((source[0], member.name)), spooled)
+
+def load_sources(paths, handler=summarize_records, workers=None):
+    """
+    Parses every log under the given paths concurrently.
+
+    Sources are processed on a process pool (one task per file, zip member
+    or tar member) sized to the host's cores by default. At most
+    QUEUE_DEPTH_PER_WORKER tasks per worker are in flight, so a fast pool
+    can't outrun a slow consumer; with a bounded handler result (the
+    default) that also bounds memory. Results arrive in completion order.
+
+    Args:
+        paths (Iterable[str]): Files, directories, .zip or tar archives.
+        handler (Callable): Picklable (name, kind, records) → result function.
+        workers (int, optional): Pool size (defaults to os.cpu_count()).
+
+    Yields:
+        Tuple[str, str, object]: (display name, kind, handler result).
+    """
+    workers = workers or os.cpu_count() or 1
+    sources = iter_sources(paths)
+
+    if workers == 1:
+        for source in sources:
+            if source[1] is None and _is_tar(source[0]):
+                yield from iter_tar_results(source[0], handler)
+            else:
+                yield process_source(source, handler)
+        return
+
+    max_pending = workers * QUEUE_DEPTH_PER_WORKER
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for func, args in iter_tasks(sources):
+            pending.add(pool.submit(func, *args, handler))
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
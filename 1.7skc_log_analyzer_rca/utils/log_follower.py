@@ -0,0 +1,329 @@
+# Incremental tail/follow reader with persisted checkpoints
+# utils/log_follower.py
+#
+# Follows growing logs like `tail -F`: only bytes appended since the last
+# poll are decoded, cleansed, redacted and merged. Per-file byte offset,
+# device/inode and the open (unfinished) multiline entry are checkpointed
+# to disk, so a restart picks up exactly where the previous run stopped.
+
+import codecs
+import json
+import os
+import time
+
+from preprocessor.cleanser import ENCODING_SAMPLE_SIZE, detect_encoding, iter_text_lines
+from preprocessor.multiline import MAX_ENTRY_CHARS, MAX_ENTRY_LINES, MultilineMerger
+from preprocessor.redactor import redact_line
+
+CHECKPOINT_VERSION = 1
+
+# Bytes read per call while catching up on a file
+READ_SIZE = 1024 * 1024
+
+# Bytes consumed per file per poll; a large backlog is caught up over
+# several polls instead of being read into one batch
+POLL_MAX_BYTES = 4 * READ_SIZE
+
+# Seconds between polls when no file has grown
+POLL_INTERVAL = 1.0
+
+# BOMs mapped to codecs that decode from any line boundary; the plain
+# "utf-16"/"utf-32" codecs expect a BOM at the start of every read
+BOM_CODECS = [
+    (codecs.BOM_UTF32_LE, "utf-32-le"),
+    (codecs.BOM_UTF32_BE, "utf-32-be"),
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+]
+
+def stream_encoding(sample):
+    """
+    Picks a codec for decoding a log from arbitrary line offsets.
+
+    Args:
+        sample (bytes): Leading bytes of the file.
+
+    Returns:
+        Tuple[str, int]: Codec name and BOM length to skip at offset 0.
+    """
+    for bom, encoding in BOM_CODECS:
+        if sample.startswith(bom):
+            return encoding, len(bom)
+
+    encoding = detect_encoding(sample)
+    if codecs.lookup(encoding).name in ("utf-16", "utf-32"):
+        # BOM-less wide encodings: Windows writes little-endian
+        encoding = codecs.lookup(encoding).name + "-le"
+    return encoding, 0
+
+class FollowedFile:
+    """
+    Read position and merge state for one followed log.
+
+    `offset` always points just past the last complete line consumed; a
+    trailing partial line is left in the file and re-read on the next poll.
+    Merged entries stay open in `merger` until a following start line (or a
+    rotation/truncation) completes them.
+
+    Args:
+        path (str): Log file path.
+        merger (MultilineMerger): Merger for this file's lines.
+        from_end (bool): Start at the current end of a file not yet seen.
+    """
+
+    def __init__(self, path, merger, from_end=False):
+        self.path = path
+        self.merger = merger
+        self.from_end = from_end
+        self.file = None
+        self.file_id = None
+        self.offset = 0
+        self.encoding = None
+        self.rotations = 0
+        self.truncations = 0
+
+    def state(self):
+        """Returns the checkpoint record for this file."""
+        return {
+            "file_id": self.file_id,
+            "offset": self.offset,
+            "encoding": self.encoding,
+            "merger": self.merger.state(),
+        }
+
+    def restore(self, state):
+        """Reloads a record produced by state()."""
+        self.file_id = state["file_id"]
+        self.offset = state["offset"]
+        self.encoding = state["encoding"]
+        self.merger.restore(state["merger"])
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def _restart(self):
+        # Reading starts over from byte 0 of a new (or truncated) file; the
+        # open entry belongs to the old content, so it is completed first
+        finished = self.merger.flush()
+        self.merger.line_no = 0
+        self.offset = 0
+        self.encoding = None
+        return [finished] if finished else []
+
+    def _open(self):
+        self.file = open(self.path, "rb")
+        # fstat the handle itself so identity and content can't disagree
+        st = os.fstat(self.file.fileno())
+        file_id = [st.st_dev, st.st_ino]
+        if self.file_id is None:
+            # First sight of this file
+            self.offset = st.st_size if self.from_end else 0
+            self.file_id = file_id
+            return []
+
+        if self.file_id != file_id:
+            # Rotated while we were not running; the old file is out of reach
+            self.rotations += 1
+            self.file_id = file_id
+            return self._restart()
+
+        if st.st_size < self.offset:
+            self.truncations += 1
+            return self._restart()
+        return []
+
+    def poll(self, max_bytes=POLL_MAX_BYTES):
+        """
+        Reads what was appended since the last poll, up to about `max_bytes`.
+
+        Rotation (path now names a different inode) drains the old handle
+        first and then starts on the new file from byte 0. Truncation (file
+        shorter than the saved offset) restarts from byte 0. A file with more
+        new data than `max_bytes` is caught up over several polls, so a large
+        existing log is never held in memory at once.
+
+        Args:
+            max_bytes (int): Bytes consumed per poll (a line in progress
+                is always finished).
+
+        Returns:
+            List[Tuple[int, str]]: Completed (start line number, entry) pairs.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Mid-rotation: keep draining the old handle, if any
+            return self._read_new(self.file, max_bytes)[0] if self.file is not None else []
+
+        if self.file is None:
+            entries = self._open()
+        elif [st.st_dev, st.st_ino] != self.file_id:
+            # Finish the rotated-away file, then read the new one from byte 0
+            entries, drained = self._read_new(self.file, max_bytes)
+            if not drained:
+                return entries
+            self.close()
+            self.rotations += 1
+            entries += self._restart()
+            self.file_id = None
+            self.from_end = False
+            self._open()
+        elif st.st_size < self.offset:
+            self.truncations += 1
+            entries = self._restart()
+        else:
+            entries = []
+
+        return entries + self._read_new(self.file, max_bytes)[0]
+
+    def _read_new(self, f, max_bytes):
+        # Returns (entries, reached EOF); stops once max_bytes were consumed
+        entries = []
+        f.seek(self.offset)
+        start = self.offset
+        data = bytearray()
+        read_size = min(READ_SIZE, max_bytes)
+        while self.offset - start < max_bytes:
+            block = f.read(read_size)
+            if not block:
+                return entries, True
+            data += block
+            self._consume(data, entries)
+        return entries, False
+
+    def _consume(self, data, entries):
+        # Processes complete lines in data, removing them from the buffer
+        if self.encoding is None:
+            if self.offset == 0 and len(data) < ENCODING_SAMPLE_SIZE and b"\n" not in data:
+                # Too little to sniff; wait for the first full line
+                return
+            self.encoding, bom = stream_encoding(bytes(data[:ENCODING_SAMPLE_SIZE]))
+            if self.offset == 0:
+                del data[:bom]
+                self.offset = bom
+
+        newline = "\n".encode(self.encoding)
+        end = data.rfind(newline)
+        while end > 0 and end % len(newline):
+            # Keep wide encodings aligned to whole code units
+            end = data.rfind(newline, 0, end)
+        if end == -1:
+            return
+
+        end += len(newline)
+        text = data[:end].decode(self.encoding, errors="replace")
+        del data[:end]
+        self.offset += end
+
+        merger = self.merger
+        for line in iter_text_lines(text):
+            finished = merger.add(redact_line(line))
+            if finished is not None:
+                entries.append(finished)
+
+class LogFollower:
+    """
+    Follows a set of growing logs and streams newly completed entries.
+
+    Args:
+        paths (Iterable[str]): Log files to follow (they may not exist yet).
+        checkpoint_path (str, optional): JSON checkpoint file; resumed if present.
+        start_patterns (Iterable[str or Pattern], optional): Start-of-event patterns.
+        max_entry_chars (int): Cap on a single merged entry.
+        from_end (bool): Skip existing content of files not in the checkpoint.
+    """
+
+    def __init__(self, paths, checkpoint_path=None, start_patterns=None,
+                 max_entry_chars=MAX_ENTRY_CHARS, from_end=False):
+        self.checkpoint_path = checkpoint_path
+        self.files = {
+            path: FollowedFile(path, MultilineMerger(start_patterns, MAX_ENTRY_LINES, max_entry_chars), from_end)
+            for path in paths
+        }
+
+    def load_checkpoint(self):
+        """
+        Restores file positions from the checkpoint, if one exists.
+
+        Returns:
+            dict or None: Caller state saved alongside the positions.
+        """
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return None
+        with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        if checkpoint.get("version") != CHECKPOINT_VERSION:
+            return None
+
+        for path, state in checkpoint["files"].items():
+            if path in self.files:
+                self.files[path].restore(state)
+        return checkpoint.get("state")
+
+    def save_checkpoint(self, state=None):
+        """
+        Atomically writes file positions plus caller state to the checkpoint.
+
+        Positions and analysis state are saved together so they can never
+        disagree after a crash.
+
+        Args:
+            state (dict, optional): JSON-serializable caller state.
+        """
+        if not self.checkpoint_path:
+            return
+        checkpoint = {
+            "version": CHECKPOINT_VERSION,
+            "saved_at": time.time(),
+            "files": {path: followed.state() for path, followed in self.files.items()},
+            "state": state,
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def poll(self, max_bytes=POLL_MAX_BYTES):
+        """
+        Polls every file once.
+
+        Args:
+            max_bytes (int): Bytes consumed per file (see FollowedFile.poll()).
+
+        Returns:
+            List[Tuple[str, int, str]]: (path, start line number, entry) for
+            entries completed since the last poll.
+        """
+        batch = []
+        for path, followed in self.files.items():
+            batch.extend((path, line_no, entry) for line_no, entry in followed.poll(max_bytes))
+        return batch
+
+    def follow(self, poll_interval=POLL_INTERVAL):
+        """
+        Polls forever, yielding one batch per poll.
+
+        Empty batches are yielded too, so callers can checkpoint or report
+        while the logs are idle. Stop by closing the generator.
+
+        Args:
+            poll_interval (float): Seconds to sleep after a poll found nothing.
+
+        Yields:
+            List[Tuple[str, int, str]]: Entries completed during the poll.
+        """
+        try:
+            while True:
+                batch = self.poll()
+                yield batch
+                if not batch:
+                    time.sleep(poll_interval)
+        finally:
+            self.close()
+
+    def close(self):
+        for followed in self.files.values():
+            followed.close()
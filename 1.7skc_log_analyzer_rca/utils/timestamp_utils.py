@@ -1,8 +1,349 @@
 # Timestamp normalizer and converter
 # utils/timestamp_utils.py
+#
+# One timestamp engine for every analyzer. A TimestampParser sniffs which
+# format a source uses (and where on the line it sits) from its first lines,
+# then parses each line by slicing digits at fixed offsets and converting
+# them with integer arithmetic. The sniffed layout is cached per source, so
+# a file is only sniffed once per process.
 
+import os
 import re
-from datetime import datetime
+from collections import Counter
+
+# Lines examined before a parser settles on a format
+SNIFF_LINES = 50
+
+# Sources whose sniffed layout is remembered
+MAX_CACHED_SOURCES = 1024
+
+# Fractional seconds and UTC offset after an ISO core, e.g. ".0123456Z" or ",123+02:00"
+ISO_TAIL = r"(?:[.,]\d+)?(?P<tz>Z|[+-]\d{2}:?\d{2})?"
+
+# Optional 12-hour marker after a clock time
+CLOCK_TAIL = r"(?:\s*(?P<ampm>[AP]M))?"
+
+# Supported formats in detection order: name → (core regex, core width,
+# tail regex, dated). The core has a fixed width: dated cores are
+# "YYYY?MM?DD?HH:MM:SS", the others start with "HH:MM:SS". The tail is optional.
+#   iso:       2025-07-28 13:45:02, 2025-07-28T13:45:02.123+02:00,
+#              EVTX SystemTime 2025-07-28 13:45:02.123456 / ...T13:45:02.1234567Z
+#   iso_slash: 2025/07/28 13:45:02
+#   msi:       [13:45:02:123] (verbose MSI log prefix)
+#   clock:     13:45:02 or 01:45:02 PM (MSI "Action start" lines)
+TIMESTAMP_FORMATS = {
+    "iso": (r"\d{4}-\d{2}-\d{2}[ T]\d{2}:\d{2}:\d{2}", 19, ISO_TAIL, True),
+    "iso_slash": (r"\d{4}/\d{2}/\d{2}[ T]\d{2}:\d{2}:\d{2}", 19, ISO_TAIL, True),
+    "msi": (r"\d{2}:\d{2}:\d{2}:\d{3}", 12, None, False),
+    "clock": (r"\d{2}:\d{2}:\d{2}", 8, CLOCK_TAIL, False),
+}
+
+# Formats tried when a line does not match its source's sniffed layout
+FORMAT_FAMILIES = {
+    "iso": ("iso", "iso_slash"),
+    "iso_slash": ("iso_slash", "iso"),
+    "msi": ("msi", "clock"),
+    "clock": ("clock", "msi"),
+}
+
+# Compiled once: name → (core, tail, search, width, dated)
+COMPILED_FORMATS = {
+    name: (
+        re.compile(core, re.ASCII),
+        re.compile(tail, re.ASCII) if tail else None,
+        re.compile(r"(?<!\d)" + core, re.ASCII),
+        width,
+        dated,
+    )
+    for name, (core, width, tail, dated) in TIMESTAMP_FORMATS.items()
+}
+
+# Any dated or MSI timestamp, for masking. The shared leading digits are
+# factored out so each position costs one cheap test (3-4x faster than a
+# plain alternation of the format patterns).
+TIMESTAMP_MASK_PATTERN = re.compile(
+    r"\d\d(?:\d\d[-/]\d\d[-/]\d\d[ T]\d\d:\d\d:\d\d(?:[.,]\d+)?(?:Z|[+-]\d\d:?\d\d)?"
+    r"|:\d\d:\d\d:\d{3})",
+    re.ASCII,
+)
+
+# Date of a verbose MSI log, used as the base for its time-only stamps:
+# "=== Verbose logging started: 7/28/2025  13:45:02 ..."
+MSI_HEADER_PATTERN = re.compile(r"logging started: (\d{1,2})/(\d{1,2})/(\d{4})")
+
+MONTH_DAYS = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# Distinct dates whose day numbers are memoized
+MAX_CACHED_DAYS = 4096
+
+_SNIFFED = {}
+_DAY_CACHE = {}
+
+def days_from_civil(year, month, day):
+    """
+    Days since 1970-01-01 for a proleptic Gregorian date.
+
+    Pure integer arithmetic; works on ints and on NumPy integer arrays.
+
+    Args:
+        year (int or np.ndarray): Year.
+        month (int or np.ndarray): Month (1-12).
+        day (int or np.ndarray): Day of month.
+
+    Returns:
+        int or np.ndarray: Day number (negative before 1970).
+    """
+    year = year - (month <= 2)
+    era = year // 400
+    yoe = year - era * 400
+    mp = (month + 9) % 12
+    doy = (153 * mp + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+def _valid_date(year, month, day):
+    if not 1 <= month <= 12 or day < 1 or day > MONTH_DAYS[month]:
+        return False
+    if month == 2 and day == 29:
+        return year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    return year >= 1
+
+def _day_number(text):
+    # "YYYY?MM?DD" → days since epoch (None if invalid), memoized: a log
+    # spans few distinct dates
+    days = _DAY_CACHE.get(text)
+    if days is None and text not in _DAY_CACHE:
+        year, month, day = int(text[0:4]), int(text[5:7]), int(text[8:10])
+        days = days_from_civil(year, month, day) if _valid_date(year, month, day) else None
+        if len(_DAY_CACHE) >= MAX_CACHED_DAYS:
+            _DAY_CACHE.clear()
+        _DAY_CACHE[text] = days
+    return days
+
+def _fields_at(line, name, pos):
+    """
+    Decodes the timestamp of format `name` starting at `pos`.
+
+    Returns (day number or None, seconds of day, UTC offset seconds, end
+    position), or None if the text there is not a valid timestamp of that
+    format. The day number is None for time-only formats.
+    """
+    core, tail, _, width, dated = COMPILED_FORMATS[name]
+    if not core.match(line, pos, pos + width):
+        return None
+
+    days = None
+    if dated:
+        days = _day_number(line[pos:pos + 10])
+        if days is None:
+            return None
+        clock = pos + 11
+    else:
+        clock = pos
+    hour = int(line[clock:clock + 2])
+    minute = int(line[clock + 3:clock + 5])
+    second = int(line[clock + 6:clock + 8])
+
+    offset = 0
+    end = pos + width
+    if tail is not None:
+        extra = tail.match(line, end)
+        end = extra.end()
+        if extra.lastgroup == "ampm":
+            if hour > 12:
+                return None
+            hour = hour % 12 + (12 if extra.group("ampm") == "PM" else 0)
+        elif extra.lastgroup == "tz":
+            tz = extra.group("tz")
+            if tz != "Z":
+                digits = tz[1:].replace(":", "")
+                offset = (int(digits[:2]) * 3600 + int(digits[2:]) * 60) * (-1 if tz[0] == "-" else 1)
+
+    if hour > 23 or minute > 59 or second > 59:
+        return None
+    return days, hour * 3600 + minute * 60 + second, offset, end
+
+def find_timestamp(line, formats=TIMESTAMP_FORMATS):
+    """
+    Locates the first timestamp on a line, trying formats in order.
+
+    Args:
+        line (str): Log line.
+        formats (Iterable[str]): Format names to try.
+
+    Returns:
+        Tuple[str, int] or None: Format name and start position.
+    """
+    for name in formats:
+        search = COMPILED_FORMATS[name][2].search
+        match = search(line)
+        while match:
+            if _fields_at(line, name, match.start()) is not None:
+                return name, match.start()
+            match = search(line, match.start() + 1)
+    return None
+
+def parse_epoch(text, formats=TIMESTAMP_FORMATS):
+    """
+    Converts the first timestamp in `text` to epoch seconds, without sniffing.
+
+    Suited to single values such as EVTX SystemTime attributes. Naive
+    timestamps are treated as UTC; time-only formats count from 1970-01-01.
+
+    Args:
+        text (str): Text containing a timestamp.
+        formats (Iterable[str]): Format names to try, in order.
+
+    Returns:
+        int or None: Epoch seconds, or None if no timestamp was found.
+    """
+    found = find_timestamp(text, formats)
+    if found is None:
+        return None
+    days, seconds, offset, _ = _fields_at(text, *found)
+    return (days or 0) * 86400 + seconds - offset
+
+class TimestampParser:
+    """
+    Per-source timestamp parser that sniffs its format once.
+
+    Until `sample_size` lines have been seen, every format is searched and
+    the (format, position) pairs found are tallied; the most common pair is
+    then fixed. After that, a line costs one anchored core match plus a few
+    integer conversions; lines that don't fit the fixed layout are searched
+    for the same format family only, so continuation lines (stack frames,
+    properties) aren't misread as another format.
+
+    Time-only formats (MSI) are anchored on the date from an MSI header
+    when one is seen, else 1970-01-01, and roll over to the next day when
+    the clock jumps back by more than twelve hours.
+
+    Args:
+        source (str, optional): Source name (e.g. path); the sniffed layout
+            is cached under it and reused by later parsers for the same source.
+        sample_size (int): Lines examined before the format is fixed.
+        base_epoch (int): Midnight epoch for time-only formats.
+    """
+
+    def __init__(self, source=None, sample_size=SNIFF_LINES, base_epoch=0):
+        self.source = os.path.abspath(source) if isinstance(source, str) else source
+        self.sample_size = sample_size
+        self.base_epoch = base_epoch
+        self.format = None
+        self.offset = None
+        self.family = tuple(TIMESTAMP_FORMATS)
+        self.sniffed = False
+        self._votes = Counter()
+        self._seen = 0
+        self._last_clock = None
+
+        cached = _SNIFFED.get(self.source) if self.source is not None else None
+        if cached is not None:
+            self._apply(*cached)
+
+    def _apply(self, name, offset, base_epoch):
+        self.format = name
+        self.offset = offset
+        if name is not None:
+            self.family = FORMAT_FAMILIES[name]
+        if base_epoch is not None:
+            self.base_epoch = base_epoch
+        self.sniffed = True
+
+    def _observe(self, line):
+        # One sniffing step; returns what find_timestamp() found on the line
+        self._seen += 1
+        header = MSI_HEADER_PATTERN.search(line)
+        if header:
+            month, day, year = (int(g) for g in header.groups())
+            if _valid_date(year, month, day):
+                self.base_epoch = days_from_civil(year, month, day) * 86400
+        found = find_timestamp(line)
+        if found is not None:
+            self._votes[found] += 1
+        if self._seen >= self.sample_size:
+            self.lock()
+        return found
+
+    def lock(self):
+        """
+        Fixes the most common layout seen so far and caches it for the source.
+
+        Returns:
+            Tuple[str, int] or None: Chosen format and position.
+        """
+        layout = self._votes.most_common(1)[0][0] if self._votes else (None, None)
+        self._apply(*layout, self.base_epoch)
+        if self.source is not None:
+            if len(_SNIFFED) >= MAX_CACHED_SOURCES:
+                _SNIFFED.clear()
+            _SNIFFED[self.source] = (self.format, self.offset, self.base_epoch)
+        return layout if self.format is not None else None
+
+    def sniff(self, lines):
+        """
+        Sniffs the format from up to `sample_size` lines and fixes it.
+
+        Args:
+            lines (Iterable[str]): First lines of the source.
+
+        Returns:
+            Tuple[str, int] or None: Chosen format and position.
+        """
+        for line in lines:
+            if self.sniffed:
+                break
+            self._observe(line)
+        if not self.sniffed:
+            self.lock()
+        return (self.format, self.offset) if self.format is not None else None
+
+    def _to_epoch(self, fields):
+        days, seconds, offset, _ = fields
+        if days is not None:
+            return days * 86400 + seconds - offset
+        if self._last_clock is not None and seconds < self._last_clock - 43_200:
+            self.base_epoch += 86_400
+        self._last_clock = seconds
+        return self.base_epoch + seconds - offset
+
+    def parse(self, line):
+        """
+        Returns the epoch seconds of a line's timestamp.
+
+        Args:
+            line (str): Log line or merged entry.
+
+        Returns:
+            int or None: Epoch seconds (naive timestamps as UTC), or None.
+        """
+        if not self.sniffed:
+            found = self._observe(line)
+            return self._to_epoch(_fields_at(line, *found)) if found else None
+
+        if self.format is not None:
+            fields = _fields_at(line, self.format, self.offset)
+            if fields is not None:
+                return self._to_epoch(fields)
+
+        found = find_timestamp(line, self.family)
+        return self._to_epoch(_fields_at(line, *found)) if found else None
+
+    def parse_many(self, lines):
+        """
+        Yields the epoch seconds of every line that has a timestamp.
+
+        Args:
+            lines (Iterable[str]): Log lines.
+
+        Yields:
+            int: Epoch seconds, in line order.
+        """
+        parse = self.parse
+        for line in lines:
+            epoch = parse(line)
+            if epoch is not None:
+                yield epoch
 
 def normalize_timestamp(line):
     """
@@ -11,7 +352,7 @@ def normalize_timestamp(line):
     Supported formats (examples):
     - "2025/07/28 13:45:02"
     - "2025-07-28 13:45:02"
-    
+
     After normalization:
     - "2025-07-28T13:45:02" (ISO 8601 format)
 
@@ -21,25 +362,13 @@ def normalize_timestamp(line):
     Returns:
         str: Log line with the timestamp normalized if found and parsable.
     """
-    
-    # Pattern to match common timestamp formats like YYYY-MM-DD HH:MM:SS or YYYY/MM/DD HH:MM:SS
-    ts_pattern = r"\d{4}[-/]\d{2}[-/]\d{2}[ T]\d{2}:\d{2}:\d{2}"
-    match = re.search(ts_pattern, line)
+    found = find_timestamp(line, ("iso", "iso_slash"))
 
-    # If no timestamp is found, return the original line
-    if not match:
+    # If no valid timestamp is found, return the original line
+    if found is None:
         return line
 
-    raw_ts = match.group()
-
-    # Try parsing with supported formats
-    for fmt in ["%Y-%m-%d %H:%M:%S", "%Y/%m/%d %H:%M:%S"]:
-        try:
-            dt = datetime.strptime(raw_ts, fmt)
-            iso_ts = dt.isoformat()  # Format as ISO 8601
-            return line.replace(raw_ts, iso_ts)
-        except ValueError:
-            continue  # Try the next format if parsing fails
-
-    # If all formats fail, return the original line
-    return line
+    pos = found[1]
+    raw_ts = line[pos:pos + 19]
+    iso_ts = f"{raw_ts[0:4]}-{raw_ts[5:7]}-{raw_ts[8:10]}T{raw_ts[11:19]}"
+    return line.replace(raw_ts, iso_ts)